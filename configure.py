@@ -107,7 +107,7 @@ model_and_size_to_revision_map = {
     (SIMULATED_MODEL, SIZE_8_8_INCH): 'SIMU',
 }
 hw_lib_map = {"AUTO": "Automatic", "LHM": "LibreHardwareMonitor (admin.)", "PYTHON": "Python libraries",
-              "STUB": "Fake random data", "STATIC": "Fake static data"}
+              "LINUX_NATIVE": "Linux native (procfs/sysfs)", "STUB": "Fake random data", "STATIC": "Fake static data"}
 reverse_map = {False: "classic", True: "reverse"}
 weather_unit_map = {"metric": "metric - °C", "imperial": "imperial - °F", "standard": "standard - °K"}
 weather_lang_map = {"sq": "Albanian", "af": "Afrikaans", "ar": "Arabic", "az": "Azerbaijani", "eu": "Basque",
@@ -254,6 +254,8 @@ class TuringConfigWindow:
         self.hwlib_label.place(x=370, y=340)
         if sys.platform != "win32":
             del hw_lib_map["LHM"]  # LHM is for Windows platforms only
+        if not sys.platform.startswith("linux"):
+            del hw_lib_map["LINUX_NATIVE"]  # Linux native sensors are for Linux platforms only
         self.hwlib_cb = ttk.Combobox(self.window, values=list(hw_lib_map.values()), state='readonly')
         self.hwlib_cb.place(x=550, y=335, width=250)
         self.hwlib_cb.bind('<<ComboboxSelected>>', self.on_hwlib_change)
@@ -536,7 +538,7 @@ class TuringConfigWindow:
                 self.lhm_admin_warning.place_forget()
                 self.save_run_btn.state(["!disabled"])
         else:
-            if hwlib == "PYTHON" or hwlib == "AUTO":
+            if hwlib == "PYTHON" or hwlib == "LINUX_NATIVE" or hwlib == "AUTO":
                 self.cpu_fan_label.place(x=370, y=460)
                 self.cpu_fan_cb.place(x=550, y=455, width=250)
             else:
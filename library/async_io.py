@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file does the network requests of some stats (ping, weather) with asyncio, for the asyncio runtime: the event
+# loop waits for the answers instead of a thread. Only the standard library is used
+# Ping uses unprivileged ICMP sockets (Linux, macOS). Where they are not allowed, ping3 is used in a worker thread
+
+import asyncio
+import json
+import os
+import socket
+import ssl
+import struct
+import time
+from typing import Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from ping3 import ping as blocking_ping
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_HEADER = struct.Struct("!BBHHH")  # Type, code, checksum, identifier, sequence number
+
+_sequence = 0
+
+
+def icmp_checksum(data: bytes) -> int:
+    # Internet checksum (RFC 1071)
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack("!%dH" % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def echo_request(identifier: int, sequence: int, payload: bytes) -> bytes:
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = icmp_checksum(header + payload)
+    return ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence) + payload
+
+
+def is_echo_reply(packet: bytes, sequence: int) -> bool:
+    # Linux gives the ICMP message alone, macOS gives it after the IP header. The identifier is set by the OS
+    if len(packet) >= 20 and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0f) * 4:]
+    if len(packet) < ICMP_HEADER.size:
+        return False
+    icmp_type, _, _, _, reply_sequence = ICMP_HEADER.unpack_from(packet)
+    return icmp_type == ICMP_ECHO_REPLY and reply_sequence == sequence
+
+
+async def _receive_reply(sock: socket.socket, sequence: int):
+    loop = asyncio.get_running_loop()
+    while not is_echo_reply(await loop.sock_recv(sock, 1024), sequence):
+        pass
+
+
+async def ping(host: str, timeout: float = 4) -> Union[float, None, bool]:
+    # Round trip time to host (ms), like ping3.ping(host, unit="ms"): None on timeout, False if host is unknown
+    global _sequence
+    loop = asyncio.get_running_loop()
+    try:
+        address = (await loop.getaddrinfo(host, None, family=socket.AF_INET))[0][4][0]
+    except socket.gaierror:
+        return False
+
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    except OSError:
+        # Unprivileged ICMP sockets not allowed (e.g. Windows, or net.ipv4.ping_group_range on Linux)
+        return await loop.run_in_executor(None, lambda: blocking_ping(address, timeout=timeout, unit="ms"))
+
+    with sock:
+        sock.setblocking(False)
+        _sequence = (_sequence + 1) & 0xffff
+        sequence = _sequence
+        try:
+            await loop.sock_connect(sock, (address, 0))
+            start = time.perf_counter()
+            await loop.sock_sendall(sock, echo_request(os.getpid() & 0xffff, sequence, b"turing-smart-screen"))
+            await asyncio.wait_for(_receive_reply(sock, sequence), timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        return (time.perf_counter() - start) * 1000
+
+
+async def get_json(url: str, timeout: float = 10) -> Tuple[int, Optional[dict]]:
+    # HTTP status and JSON content of a GET request. HTTP/1.0 is used: the response is never chunked, it is read until
+    # the server closes the connection
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+
+    async def request() -> bytes:
+        reader, writer = await asyncio.open_connection(parts.hostname, port,
+                                                       ssl=ssl.create_default_context() if https else None)
+        try:
+            writer.write(f"GET {path} HTTP/1.0\r\nHost: {parts.hostname}\r\nAccept: application/json\r\n"
+                         f"User-Agent: turing-smart-screen-python\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            return await reader.read()
+        finally:
+            writer.close()
+
+    response = await asyncio.wait_for(request(), timeout)
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b"\r\n", 1)[0].split()[1])
+    try:
+        return status, json.loads(body)
+    except ValueError:
+        return status, None
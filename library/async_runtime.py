@@ -0,0 +1,141 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file runs the periodic tasks and the display transport on a single asyncio event loop, as an alternative to
+# the scheduler thread of periodic.py (see RUNTIME in config.yaml).
+# Each periodic task is a coroutine sleeping until its next deadline. Blocking work (sensors read with psutil,
+# drawing, serial writes) is run by a few worker threads, network requests of some tasks use async I/O (see
+# async_io.py) and do not hold a thread while waiting for the answer
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from library.lcd.update_queue import UpdateQueue
+from library.log import logger
+from library.periodic import STAGGER_WINDOW, WORKERS, Job, jobs_summary, stagger
+
+
+class AsyncRuntime:
+    def __init__(self, workers: int = WORKERS, stagger_window: float = STAGGER_WINDOW):
+        self.workers = workers
+        self.stagger_window = stagger_window
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Blocking")
+        self.loop.set_default_executor(self.executor)
+
+        self.jobs: Dict[str, Job] = {}
+        self.tasks: List[Tuple[Job, asyncio.Task]] = []  # Only used from the event loop
+        self.writer: Optional[asyncio.Task] = None
+        self.ready: Optional[asyncio.Event] = None  # Set when requests are queued for the writer
+        self.stopping = False
+        self.draining = False  # Set once the periodic tasks are stopped: the writer stops when the queue is empty
+        self.thread: Optional[threading.Thread] = None
+
+        # Mutex to protect jobs, added from other threads
+        self.mutex = threading.Lock()
+
+    def add(self, name: str, interval: float, action: Callable, fetch: Optional[Callable[[], Awaitable]] = None,
+            max_interval: float = 0) -> Job:
+        # Run action every interval seconds, from now on (once the runtime is started).
+        # If fetch is set, it is awaited in the event loop before each run, and its result is given to action.
+        # If max_interval is set, the job is adaptive (see PeriodicScheduler.add)
+        with self.mutex:
+            job = Job(name, interval, action, self.loop.time() + stagger(len(self.jobs), interval, self.stagger_window),
+                      max_interval)
+            self.jobs[name] = job
+        self.loop.call_soon_threadsafe(self._start_job, job, fetch)
+        return job
+
+    def serve(self, update_queue: UpdateQueue):
+        # Send the requests of the update queue to the display, from a task of the event loop
+        self.loop.call_soon_threadsafe(self._start_writer, update_queue)
+
+    def start(self):
+        # Start the event loop thread, if not started yet
+        with self.mutex:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="Event_Loop")
+                self.thread.start()
+
+    def stop(self):
+        # Stop periodic tasks, then stop the event loop once the update queue is empty
+        self.stopping = True
+        self.loop.call_soon_threadsafe(self._stop)
+
+    def wait(self):
+        # Wait for the event loop to stop
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.executor.shutdown(wait=False)
+
+    # Internal methods below are called from the event loop
+
+    def _start_job(self, job: Job, fetch: Optional[Callable[[], Awaitable]]):
+        if not self.stopping:
+            self.tasks.append((job, self.loop.create_task(self._run_job(job, fetch))))
+
+    def _start_writer(self, update_queue: UpdateQueue):
+        self.ready = asyncio.Event()
+        self.writer = self.loop.create_task(self._write(update_queue))
+
+    def _stop(self):
+        self.loop.create_task(self._shutdown())
+
+    async def _shutdown(self):
+        # Tasks waiting for their deadline are cancelled, runs in progress are finished: their requests are sent
+        for job, task in self.tasks:
+            if not job.running:
+                task.cancel()
+        await asyncio.gather(*(task for _, task in self.tasks), return_exceptions=True)
+        if self.writer is not None:
+            # The writer stops once it has sent the last requests
+            self.draining = True
+            self.ready.set()
+            await asyncio.gather(self.writer, return_exceptions=True)
+        self.loop.stop()
+
+    async def _run_job(self, job: Job, fetch: Optional[Callable[[], Awaitable]]):
+        while not self.stopping:
+            await asyncio.sleep(job.deadline - self.loop.time())
+            start = self.loop.time()
+            changed = None
+            try:
+                if fetch is None:
+                    job.running = True
+                    changed = await self.loop.run_in_executor(self.executor, job.action)
+                else:
+                    data = await fetch()
+                    job.running = True
+                    changed = await self.loop.run_in_executor(self.executor, job.action, data)
+            except Exception:
+                # The task is run again at its next deadline, like if this run was skipped
+                logger.exception("Task %s failed" % job.name)
+            job.finished(self.loop.time() - start, changed)
+            # A run longer than the interval has made the task miss deadlines: they are skipped
+            job.advance(self.loop.time())
+
+    async def _write(self, update_queue: UpdateQueue):
+        # Requests are sent by this task only, so that they stay in order. It sleeps until requests are queued
+        update_queue.wakeup = lambda: self.loop.call_soon_threadsafe(self.ready.set)
+        try:
+            while not (self.draining and update_queue.empty()):
+                self.ready.clear()
+                batch = update_queue.get_batch(timeout=0)
+                if batch:
+                    await self.loop.run_in_executor(self.executor, update_queue.run_batch, batch)
+                elif not self.draining:
+                    await self.ready.wait()
+        finally:
+            update_queue.wakeup = None
+
+    def __str__(self):
+        with self.mutex:
+            return f"{len(self.jobs)} tasks on an event loop with {self.workers} threads, " \
+                   f"{jobs_summary(self.jobs.values())}"
@@ -121,6 +121,9 @@ class Display:
         # Turn screen on in case it was turned off previously
         self.lcd.ScreenOn()
 
+        # Some models do not display back the previous bitmap after being turned off/on: screen content is unknown
+        self.lcd.invalidate_shadow()
+
         # Set brightness
         self.lcd.SetBrightness(config.CONFIG_DATA["display"]["BRIGHTNESS"])
 
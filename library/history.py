@@ -0,0 +1,331 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file stores the last values of the metrics displayed in line graphs, in fixed-size NumPy ring buffers:
+# adding a value costs the same whatever the history size, and graphs read the history without copying it.
+# Values are also downsampled into buckets of 1 and 15 minutes, to display trends over time windows longer than the
+# raw history.
+# Histories can be stored in files mapped in memory, so that graphs are not emptied when the program restarts
+
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from library.log import logger
+
+# Downsampled histories: (duration of a bucket (s), number of buckets kept). 6 hours by minute, 7 days by 15 minutes
+TIERS = [(60, 6 * 60), (15 * 60, 7 * 24 * 4)]
+
+# History files: header, then the downsampled histories and the raw values of a metric, as float64 values.
+# The header holds the layout of the file, a file with another layout (e.g. written by another version) is reset
+FILE_MAGIC = b"TSSH"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sIII")  # Magic, version, CRC32 of the downsampled histories layout, raw history size
+FILE_EXTENSION = ".history"
+
+
+class Cells:
+    # Consecutive slices of an array of float64 values, used to store histories in a single array (e.g. mapped to a
+    # file). Slices are filled with their initial value, unless they hold values loaded from a file
+    def __init__(self, array: np.ndarray, initialize: bool = True):
+        self.array = array
+        self.offset = 0
+        self.initialize = initialize
+
+    def take(self, count: int, initial: Union[float, Sequence[float]]) -> np.ndarray:
+        cells = self.array[self.offset:self.offset + count]
+        self.offset += count
+        if self.initialize:
+            cells[:] = initial
+        return cells
+
+
+class RingBuffer:
+    def __init__(self, size: int, cells: Optional[Cells] = None):
+        self.size = size
+
+        # Values are stored twice, so that the last `size` values are always contiguous in memory, oldest first.
+        # Missing values (history not full yet) are NaN
+        if cells is None:
+            self.position = np.zeros(1)
+            self.data = np.full(2 * size, np.nan)
+        else:
+            self.position = cells.take(1, 0)
+            self.data = cells.take(2 * size, np.nan)
+
+    @staticmethod
+    def cell_count(size: int) -> int:
+        return 1 + 2 * size
+
+    @property
+    def index(self) -> int:
+        # Position of the oldest value
+        return int(self.position[0])
+
+    def append(self, value: float):
+        index = self.index
+        self.data[index] = self.data[index + self.size] = value
+        # Position is updated last: if the program stops in between, the value is simply not part of the history
+        self.position[0] = (index + 1) % self.size
+
+    def values(self) -> np.ndarray:
+        # Read-only view of the values, oldest first, without copying them. It is only valid until the next append:
+        # values are then rotated in the view
+        index = self.index
+        view = self.data[index:index + self.size]
+        view.flags.writeable = False
+        return view
+
+    def resized(self, size: int, cells: Optional[Cells] = None) -> "RingBuffer":
+        # Copy of the buffer with another size, keeping the most recent values
+        buffer = RingBuffer(size, cells)
+        for value in self.values()[-size:]:
+            buffer.append(value)
+        return buffer
+
+
+class DownsampledHistory:
+    # Min, max and mean of the values over consecutive buckets of fixed duration
+    def __init__(self, resolution: float, size: int, cells: Optional[Cells] = None):
+        self.resolution = resolution
+        self.size = size
+
+        # Bucket being filled: index (time / resolution, NaN before the first value) and values added so far
+        initial = (math.nan, 0, 0.0, math.inf, -math.inf)
+        self.state = np.array(initial) if cells is None else cells.take(len(initial), initial)
+
+        self.min = RingBuffer(size, cells)
+        self.max = RingBuffer(size, cells)
+        self.mean = RingBuffer(size, cells)
+
+    @staticmethod
+    def cell_count(size: int) -> int:
+        return 5 + 3 * RingBuffer.cell_count(size)
+
+    @property
+    def bucket(self) -> Optional[int]:
+        bucket = self.state[0]
+        return None if math.isnan(bucket) else int(bucket)
+
+    @property
+    def count(self) -> int:
+        return int(self.state[1])
+
+    @property
+    def total(self) -> float:
+        return float(self.state[2])
+
+    @property
+    def bucket_min(self) -> float:
+        return float(self.state[3])
+
+    @property
+    def bucket_max(self) -> float:
+        return float(self.state[4])
+
+    def add(self, value: float, now: float):
+        bucket = int(now // self.resolution)
+        current = self.bucket
+        if current is not None and bucket != current:
+            self._close_bucket()
+            # Buckets without any value (e.g. computer was sleeping, or program was stopped) are NaN
+            for _ in range(min(bucket - current - 1, self.size)):
+                self._push(math.nan, math.nan, math.nan)
+        self.state[0] = bucket
+
+        if not math.isnan(value):
+            self.state[1:] = (self.count + 1, self.total + value, min(self.bucket_min, value),
+                              max(self.bucket_max, value))
+
+    def values(self, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Min, max and mean of the last `count` buckets, oldest first. The last one is the bucket being filled
+        count = min(count, self.size + 1)
+        if self.count:
+            current = (self.bucket_min, self.bucket_max, self.total / self.count)
+        else:
+            current = (math.nan, math.nan, math.nan)
+        return tuple(np.append(buffer.values()[self.size - count + 1:], value)
+                     for buffer, value in zip((self.min, self.max, self.mean), current))
+
+    def _close_bucket(self):
+        if self.count:
+            self._push(self.bucket_min, self.bucket_max, self.total / self.count)
+        else:
+            self._push(math.nan, math.nan, math.nan)
+        self.state[1:] = (0, 0.0, math.inf, -math.inf)
+
+    def _push(self, min_value: float, max_value: float, mean_value: float):
+        self.min.append(min_value)
+        self.max.append(max_value)
+        self.mean.append(mean_value)
+
+
+def decimate(min_values: np.ndarray, max_values: np.ndarray, mean_values: np.ndarray, max_points: int) -> np.ndarray:
+    # Get at most max_points values to plot: mean values if there are few enough of them, otherwise the min and max
+    # of groups of buckets, so that peaks are still visible
+    if mean_values.size <= max_points:
+        return mean_values
+    groups = max(max_points // 2, 1)
+    starts = np.arange(groups) * mean_values.size // groups
+    # fmin/fmax ignore NaN values, unless all values of a group are NaN
+    return np.column_stack((np.fmin.reduceat(min_values, starts), np.fmax.reduceat(max_values, starts))).ravel()
+
+
+def _tiers_layout() -> Tuple[int, int]:
+    # CRC32 and number of cells of the downsampled histories, stored before the raw values in history files
+    return zlib.crc32(repr(TIERS).encode()), sum(DownsampledHistory.cell_count(buckets) for _, buckets in TIERS)
+
+
+def _read_history_size(path: str) -> Optional[int]:
+    # Size of the raw history stored in a history file, None if the file does not exist or is not valid
+    try:
+        with open(path, "rb") as file:
+            header = file.read(FILE_HEADER.size)
+            length = os.fstat(file.fileno()).st_size
+    except OSError:
+        return None
+    if len(header) != FILE_HEADER.size:
+        return None
+
+    magic, version, layout, size = FILE_HEADER.unpack(header)
+    tiers_crc, tiers_cells = _tiers_layout()
+    if magic != FILE_MAGIC or version != FILE_VERSION or layout != tiers_crc or size == 0 \
+            or length != FILE_HEADER.size + 8 * (tiers_cells + RingBuffer.cell_count(size)):
+        return None
+    return size
+
+
+def _write_history_file(path: str, size: int, stored_size: Optional[int]):
+    # Write a new history file, keeping the downsampled histories and the most recent values of the current file if it
+    # is valid. The file is replaced at once, so that it is never left half-written
+    tiers_crc, tiers_cells = _tiers_layout()
+    cells = Cells(np.empty(tiers_cells + RingBuffer.cell_count(size)), initialize=stored_size is None)
+    if stored_size is not None:
+        stored = np.fromfile(path, count=tiers_cells + RingBuffer.cell_count(stored_size), offset=FILE_HEADER.size)
+        cells.array[:tiers_cells] = stored[:tiers_cells]
+    for resolution, buckets in TIERS:
+        DownsampledHistory(resolution, buckets, cells)
+
+    cells.initialize = True
+    if stored_size is not None:
+        RingBuffer(stored_size, Cells(stored[tiers_cells:], initialize=False)).resized(size, cells)
+    else:
+        RingBuffer(size, cells)
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, tiers_crc, size))
+        file.write(cells.array.tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def map_history_file(path: str, size: int) -> Tuple[np.memmap, RingBuffer, List[DownsampledHistory]]:
+    # Map the history file of a metric in memory: values are used where they are, without parsing, so that loading
+    # the history costs the same whatever its size. The file is created or reset if it is not valid
+    stored_size = _read_history_size(path)
+    if stored_size != size:
+        _write_history_file(path, size, stored_size)
+
+    _, tiers_cells = _tiers_layout()
+    mapped = np.memmap(path, dtype=np.uint8, mode="r+",
+                       shape=(FILE_HEADER.size + 8 * (tiers_cells + RingBuffer.cell_count(size)),))
+    cells = Cells(mapped[FILE_HEADER.size:].view(np.float64), initialize=False)
+    tiers = [DownsampledHistory(resolution, buckets, cells) for resolution, buckets in TIERS]
+    return mapped, RingBuffer(size, cells), tiers
+
+
+class HistoryStore:
+    def __init__(self, directory: Optional[str] = None):
+        # Histories are stored in files of this directory if set, otherwise they are only kept in memory
+        self.directory = directory
+        self.buffers: Dict[str, RingBuffer] = {}
+        self.tiers: Dict[str, List[DownsampledHistory]] = {}
+        self.files: Dict[str, np.memmap] = {}
+        # Times of the raw values saved since the program started (not stored in files), to know the time they cover
+        self.times: Dict[str, RingBuffer] = {}
+        self.mutex = threading.Lock()
+
+    def save(self, metric: str, value: float, size: int, now: Optional[float] = None):
+        # Add a value to the history of a metric, that keeps the last `size` values
+        if now is None:
+            now = time.time()
+        with self.mutex:
+            if metric not in self.buffers or self.buffers[metric].size != size:
+                self._create(metric, size)
+            self.buffers[metric].append(value)
+
+            times = self.times.get(metric)
+            if times is None or times.size != size:
+                times = self.times[metric] = RingBuffer(size) if times is None else times.resized(size)
+            times.append(now)
+
+            for tier in self.tiers[metric]:
+                tier.add(value, now)
+
+    def values(self, metric: str) -> np.ndarray:
+        # History of a metric, oldest first. It is a copy: values can be saved by another thread while it is used
+        with self.mutex:
+            return self.buffers[metric].values().copy()
+
+    def window(self, metric: str, duration: float, max_points: int) -> np.ndarray:
+        # Values of a metric over the last `duration` seconds: the raw values if they cover this duration, otherwise the
+        # most precise downsampled history that covers it. At most max_points values are returned, so that plotting
+        # cost is bounded by the graph width
+        with self.mutex:
+            times = self.times[metric].values()
+            times = times[~np.isnan(times)]
+            # Time covered by the raw values of known time, including the interval before the oldest one
+            if times.size > 1 and (times[-1] - times[0]) * times.size / (times.size - 1) >= duration:
+                values = self.buffers[metric].values()[-times.size:][times > times[-1] - duration]
+                return decimate(values, values, values, max_points)
+
+            tiers = self.tiers[metric]
+            tier = next((tier for tier in tiers if tier.resolution * tier.size >= duration), tiers[-1])
+            return decimate(*tier.values(max(math.ceil(duration / tier.resolution), 1)), max_points)
+
+    def flush(self):
+        # Write histories to their files now, instead of when the OS decides to (only matters if the OS crashes)
+        with self.mutex:
+            for mapped in self.files.values():
+                mapped.flush()
+
+    # Internal methods below are called with the mutex locked
+
+    def _create(self, metric: str, size: int) -> RingBuffer:
+        # Create the history of a metric, or resize it keeping the most recent values
+        if metric in self.files:
+            self._detach(metric)
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, metric + FILE_EXTENSION)
+                self.files[metric], self.buffers[metric], self.tiers[metric] = map_history_file(path, size)
+                return self.buffers[metric]
+            except (OSError, ValueError) as e:
+                # Other metrics are still stored in files
+                logger.warning("Cannot store %s history in %s, it will only be kept in memory: %s"
+                               % (metric, self.directory, e))
+
+        buffer = self.buffers.get(metric)
+        if buffer is None:
+            self.buffers[metric] = RingBuffer(size)
+            self.tiers[metric] = [DownsampledHistory(resolution, buckets) for resolution, buckets in TIERS]
+        else:
+            self.buffers[metric] = buffer.resized(size)
+        return self.buffers[metric]
+
+    def _detach(self, metric: str):
+        # Replace the histories of a metric mapped to its file by copies in memory, and close the file: it can then be
+        # rewritten (a file mapped in memory cannot be replaced on Windows). The mapping is closed once no view uses it
+        mapped = self.files.pop(metric)
+        mapped.flush()
+        cells = Cells(np.array(mapped[FILE_HEADER.size:]).view(np.float64), initialize=False)
+        self.tiers[metric] = [DownsampledHistory(resolution, buckets, cells) for resolution, buckets in TIERS]
+        self.buffers[metric] = RingBuffer(self.buffers[metric].size, cells)
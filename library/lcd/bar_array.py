@@ -0,0 +1,62 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file draws an array of values (e.g. the usage of each CPU core) as a grid of cells, each cell being a bar or
+# a colored square (heatmap). The position of each pixel in the grid is computed once: then all cells are drawn at
+# once with NumPy, the cost of an update depends on the widget size and not on the number of values
+
+from typing import Tuple
+
+import numpy as np
+
+
+def _cells(size: int, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Split size pixels into count cells, separated by 1 pixel if cells are big enough:
+    # cell of each pixel (-1 for gaps), first pixel and usable size of each cell
+    edges = np.arange(count + 1) * size // count
+    cell = np.searchsorted(edges, np.arange(size), side='right') - 1
+    gap = 1 if size // count >= 3 else 0
+    sizes = np.diff(edges) - gap
+    if gap:
+        # Last pixel of each cell is a gap, except for the last cell
+        last_pixels = edges[1:-1] - 1
+        cell[last_pixels] = -1
+        sizes[-1] += gap
+    return cell, edges[:-1], sizes
+
+
+class BarArrayLayout:
+    def __init__(self, width: int, height: int, count: int, columns: int):
+        self.width = width
+        self.height = height
+        self.count = count
+        self.columns = columns if columns > 0 else count
+        self.rows = -(-count // self.columns)
+
+        column_of_x, _, _ = _cells(width, self.columns)
+        row_of_y, row_starts, row_heights = _cells(height, self.rows)
+
+        # Index of the value displayed by each pixel, `count` for pixels outside cells (gaps, empty cells of the last
+        # row): it points to an extra value that is never drawn
+        index = row_of_y[:, None] * self.columns + column_of_x[None, :]
+        outside = (row_of_y[:, None] < 0) | (column_of_x[None, :] < 0) | (index >= count)
+        self.index = np.where(outside, count, index)
+        self.inside = ~outside
+
+        # Bars grow from the bottom of their cell: distance of each pixel to the bottom, height of each cell
+        depth = row_starts[row_of_y] + row_heights[row_of_y] - 1 - np.arange(height)
+        self.depth = np.broadcast_to(depth[:, None], (height, width))
+        self.cell_heights = np.append(np.repeat(row_heights, self.columns)[:count], 0)
+
+    def draw(self, background: np.ndarray, ratios: np.ndarray, color: Tuple[int, ...], low_color=None) -> np.ndarray:
+        # Draw cells on a copy of the background (RGBA pixels). ratios are between 0 and 1, one per value.
+        # Bars are drawn with color, or cells are filled with a color between low_color and color for a heatmap
+        ratios = np.append(np.clip(np.nan_to_num(ratios[:self.count]), 0, 1), 0)
+        color = np.array((*color[:3], 255), dtype=np.float64)
+        if low_color is None:
+            filled_pixels = np.round(ratios * self.cell_heights)
+            mask = self.inside & (self.depth < filled_pixels[self.index])
+            return np.where(mask[:, :, None], color.astype(np.uint8), background)
+
+        low_color = np.array((*low_color[:3], 255), dtype=np.float64)
+        colors = np.round(low_color + (color - low_color) * ratios[:, None]).astype(np.uint8)
+        return np.where(self.inside[:, :, None], colors[self.index], background)
@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file contains a cache of rendered bitmaps (e.g. text patches), so that bitmaps drawn again with the same
+# parameters are not rendered again with PIL
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from PIL import Image
+
+
+def image_size_in_bytes(image: Image.Image) -> int:
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+
+class BitmapCache:
+    # Least recently used bitmaps are evicted once the total size of the cached bitmaps exceeds max_bytes.
+    # Cached bitmaps are shared: they must not be modified
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries: OrderedDict = OrderedDict()  # { key=parameters, value=(bitmap, x, y) }
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Mutex to protect the cache in case multiple threads draw bitmaps at the same time
+        self.mutex = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[Image.Image, int, int]]:
+        with self.mutex:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, bitmap: Image.Image, x: int, y: int):
+        size = image_size_in_bytes(bitmap)
+        if size > self.max_bytes:
+            return
+
+        with self.mutex:
+            if key in self.entries:
+                self.bytes -= image_size_in_bytes(self.entries.pop(key)[0])
+            self.entries[key] = (bitmap, x, y)
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, (evicted, _, _) = self.entries.popitem(last=False)
+                self.bytes -= image_size_in_bytes(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.mutex:
+            self.entries.clear()
+            self.bytes = 0
+
+    def __str__(self):
+        with self.mutex:
+            requests = self.hits + self.misses
+            hit_rate = self.hits / requests * 100 if requests else 0.0
+            return f"{self.hits} hits / {self.misses} misses ({hit_rate:.0f}% hit rate), {self.evictions} evictions, " \
+                   f"{len(self.entries)} bitmaps ({self.bytes / 1024:.0f}/{self.max_bytes / 1024:.0f} KiB)"
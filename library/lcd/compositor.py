@@ -0,0 +1,44 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file computes the bitmaps to send to the display for a frame: the areas that changed while drawing the widgets
+# are merged when sending a single bitmap is cheaper than sending them separately
+
+from typing import Callable, List, Optional, Tuple
+
+# Box of a screen area: (left, top, right, bottom)
+Box = Tuple[int, int, int, int]
+
+# Cost of sending a bitmap on top of its pixels (command, queue and USB round-trips...), in number of pixels that could
+# be sent in the same time. Two areas are merged if the extra pixels sent cost less than an additional bitmap
+BITMAP_OVERHEAD_PIXELS = 1000
+
+
+def box_union(box: Box, other: Box) -> Box:
+    return min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])
+
+
+def box_area(box: Box) -> int:
+    return max(box[2] - box[0], 0) * max(box[3] - box[1], 0)
+
+
+def merge_boxes(boxes: List[Box], overhead: int = BITMAP_OVERHEAD_PIXELS,
+                can_merge: Optional[Callable[[Box], bool]] = None) -> List[Box]:
+    # Greedily merge the pair of boxes with the best gain until no merge reduces the total cost anymore.
+    # If set, can_merge is called to check that the union of two boxes can be sent as a single bitmap.
+    # Frames contain a few dozen boxes at most, so the quadratic search is not an issue
+    boxes = [box for box in boxes if box_area(box) > 0]
+    while len(boxes) > 1:
+        best_gain, best_pair = -1, None
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                # Cost of sending both boxes separately, minus cost of sending their union
+                union = box_union(boxes[i], boxes[j])
+                gain = overhead + box_area(boxes[i]) + box_area(boxes[j]) - box_area(union)
+                if gain > best_gain and (can_merge is None or can_merge(union)):
+                    best_gain, best_pair = gain, (i, j)
+        if best_pair is None:
+            break
+        i, j = best_pair
+        union = box_union(boxes[i], boxes[j])
+        boxes = [box for k, box in enumerate(boxes) if k != i and k != j] + [union]
+    return boxes
@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file keeps a copy of the pixels currently displayed on the screen, so that only the parts of a bitmap
+# that are different from the screen content have to be serialized and sent to the display
+
+import threading
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Two changed areas separated by fewer unchanged lines than this are sent as a single bitmap: re-sending a few
+# unchanged lines is cheaper than the overhead of an additional bitmap command
+MIN_UNCHANGED_ROWS = 8
+
+
+def image_to_RGBA_array(image: Image.Image) -> np.ndarray:
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    return np.asarray(image)
+
+
+def changed_row_bands(changed_rows: np.ndarray, min_gap: int = MIN_UNCHANGED_ROWS) -> List[Tuple[int, int]]:
+    # Get (first, last + 1) indexes of the bands of changed rows, merging bands separated by less than min_gap rows
+    indexes = np.flatnonzero(changed_rows)
+    if indexes.size == 0:
+        return []
+
+    # A new band starts every time the gap with the previous changed row is big enough
+    breaks = np.flatnonzero(np.diff(indexes) > min_gap)
+    starts = np.concatenate(([indexes[0]], indexes[breaks + 1]))
+    ends = np.concatenate((indexes[breaks], [indexes[-1]])) + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class ShadowFramebuffer:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+        # RGBA copy of the screen content, as it has been sent to the display
+        self.pixels = np.zeros((height, width, 4), dtype=np.uint8)
+
+        # Pixels for which the screen content is known. Unknown pixels are always considered as changed
+        self.valid = np.zeros((height, width), dtype=bool)
+
+        # Mutex to protect the framebuffer in case multiple threads display bitmaps at the same time
+        self.mutex = threading.Lock()
+
+    def invalidate(self):
+        with self.mutex:
+            self.valid[:] = False
+
+    def update(self, image: Image.Image, x: int, y: int) -> List[Tuple[int, int, int, int]]:
+        # Store the image displayed at (x, y) in the framebuffer, and return the list of boxes (left, top, right, bottom)
+        # of the image areas that are different from the current screen content. Boxes are relative to the image.
+        # Image must fit in the framebuffer.
+        new_pixels = image_to_RGBA_array(image)
+        height, width = new_pixels.shape[:2]
+
+        with self.mutex:
+            old_pixels = self.pixels[y:y + height, x:x + width]
+            valid = self.valid[y:y + height, x:x + width]
+
+            changed = np.any(old_pixels != new_pixels, axis=2)
+            changed |= ~valid
+
+            boxes = []
+            for top, bottom in changed_row_bands(changed.any(axis=1)):
+                changed_cols = np.flatnonzero(changed[top:bottom].any(axis=0))
+                boxes.append((int(changed_cols[0]), top, int(changed_cols[-1]) + 1, bottom))
+
+            if boxes:
+                old_pixels[:] = new_pixels
+                valid[:] = True
+
+        return boxes
+
+    def is_valid(self, box: Tuple[int, int, int, int]) -> bool:
+        # Check whether the screen content is known for a whole area (left, top, right, bottom)
+        left, top, right, bottom = box
+        with self.mutex:
+            return bool(self.valid[top:bottom, left:right].all())
+
+    def crop(self, box: Tuple[int, int, int, int]) -> Image.Image:
+        # Get the content of an area (left, top, right, bottom) of the screen, as sent to the display
+        left, top, right, bottom = box
+        with self.mutex:
+            return Image.fromarray(self.pixels[top:bottom, left:right].copy(), "RGBA")
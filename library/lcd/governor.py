@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file keeps the amount of data sent to the display within what the serial link can carry: when the widgets of a
+# theme need more bytes per second than the measured link throughput, lower-priority widgets are refreshed less often
+
+import threading
+from typing import Dict, Optional
+
+from library.log import logger
+
+# Part of the measured link throughput that widgets can use, the rest is kept for commands and measurement errors
+BUDGET_RATIO = 0.9
+
+# Link throughput is measured over periods of this much time spent sending data (s)
+MEASURE_PERIOD = 0.5
+
+# Weight of a new measure in the averaged throughput and frame sizes
+SMOOTHING = 0.3
+
+# Degraded widgets are still refreshed at least this often (as a ratio of their normal refresh rate)
+MIN_RUN_RATIO = 0.1
+
+
+class TaskDemand:
+    # Bandwidth needed by a periodic task (a group of widgets refreshed together)
+    def __init__(self, interval: float, priority: int):
+        self.interval = interval  # Refresh interval (s)
+        self.priority = priority  # Widgets with a higher priority are degraded last
+        self.frame_bytes: Optional[float] = None  # Average bytes sent to the display per refresh
+        self.credit = 1.0  # Accumulated run ratio, the task runs when it reaches 1
+        self.skipped = 0  # Refreshes skipped because of the bandwidth budget
+
+    def bytes_per_second(self) -> float:
+        return (self.frame_bytes or 0.0) / self.interval
+
+
+class BandwidthGovernor:
+    def __init__(self, budget_ratio: float = BUDGET_RATIO):
+        self.budget_ratio = budget_ratio
+
+        # Measured link throughput (bytes/s), unknown until enough data has been sent
+        self.throughput: Optional[float] = None
+        self.measured_bytes = 0
+        self.measured_time = 0.0
+
+        self.tasks: Dict[str, TaskDemand] = {}
+        self.oversubscribed = False
+
+        # Mutex to protect measures, updated by the transport worker and by all periodic tasks
+        self.mutex = threading.Lock()
+
+    def register(self, task: str, interval: float, priority: int = 0):
+        with self.mutex:
+            self.tasks[task] = TaskDemand(interval, priority)
+
+    def record_transfer(self, size: int, duration: float):
+        # Called by the transport worker after sending data to the display
+        if size <= 0 or duration <= 0:
+            return
+        with self.mutex:
+            self.measured_bytes += size
+            self.measured_time += duration
+            if self.measured_time >= MEASURE_PERIOD:
+                throughput = self.measured_bytes / self.measured_time
+                self.throughput = throughput if self.throughput is None else \
+                    self.throughput + SMOOTHING * (throughput - self.throughput)
+                self.measured_bytes, self.measured_time = 0, 0.0
+
+    def record_frame(self, task: str, size: int):
+        # Called by a periodic task after a refresh, with the number of bytes it has queued for the display
+        with self.mutex:
+            demand = self.tasks.get(task)
+            if demand is None:
+                return
+            demand.frame_bytes = size if demand.frame_bytes is None else \
+                demand.frame_bytes + SMOOTHING * (size - demand.frame_bytes)
+            self._check_oversubscription()
+
+    def allow(self, task: str) -> bool:
+        # Check if a periodic task can refresh its widgets now, or should skip this refresh to stay within budget.
+        # Skipped refreshes are spread evenly, so that degraded widgets are refreshed at a lower but regular rate
+        with self.mutex:
+            demand = self.tasks.get(task)
+            if demand is None or self.throughput is None:
+                return True
+
+            demand.credit = min(demand.credit + self._run_ratio(demand), 1.0)
+            if demand.credit >= 1.0 - 1e-9:
+                demand.credit -= 1.0
+                return True
+            demand.skipped += 1
+            return False
+
+    def budget(self) -> Optional[float]:
+        # Bytes per second that widgets can send to the display
+        return self.throughput * self.budget_ratio if self.throughput is not None else None
+
+    def demand(self) -> float:
+        # Bytes per second that widgets would send to the display at their normal refresh rate
+        return sum(demand.bytes_per_second() for demand in self.tasks.values())
+
+    # Internal methods below are called with the mutex locked
+
+    def _run_ratio(self, demand: TaskDemand) -> float:
+        # The budget goes to the highest priorities first: tasks of the first priority level that does not fit in the
+        # remaining budget share what is left, lower priority levels get the minimum
+        remaining = self.budget()
+        for priority in sorted({d.priority for d in self.tasks.values()}, reverse=True):
+            level_demand = sum(d.bytes_per_second() for d in self.tasks.values() if d.priority == priority)
+            if priority == demand.priority:
+                if level_demand <= remaining:
+                    return 1.0
+                return max(remaining / level_demand, MIN_RUN_RATIO)
+            remaining = max(remaining - level_demand, 0.0)
+        return 1.0
+
+    def _check_oversubscription(self):
+        budget = self.budget()
+        if budget is None:
+            return
+        oversubscribed = self.demand() > budget
+        if oversubscribed and not self.oversubscribed:
+            logger.warning("Theme is oversubscribed: widgets need %.1f kB/s but the display link carries %.1f kB/s, "
+                           "lower priority widgets will be refreshed less often"
+                           % (self.demand() / 1000, self.throughput / 1000))
+        elif self.oversubscribed and not oversubscribed:
+            logger.info("Theme is no longer oversubscribed, all widgets are refreshed normally")
+        self.oversubscribed = oversubscribed
+
+    def __str__(self):
+        with self.mutex:
+            throughput = f"{self.throughput / 1000:.1f} kB/s" if self.throughput is not None else "unknown"
+            skipped = sum(demand.skipped for demand in self.tasks.values())
+            return f"link throughput {throughput}, widgets demand {self.demand() / 1000:.1f} kB/s, " \
+                   f"{skipped} refreshes skipped"
@@ -27,14 +27,34 @@ import sys
 import threading
 import time
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from enum import IntEnum
-from typing import Tuple, List, Optional, Dict
+from typing import Tuple, List, Optional, Dict, Union
 
+import numpy as np
 import serial
 from PIL import Image, ImageDraw, ImageFont
 
 from library.log import logger
+from library.lcd.bar_array import BarArrayLayout
+from library.lcd.bitmap_cache import BitmapCache
 from library.lcd.color import Color, parse_color
+from library.lcd.compositor import Box, merge_boxes
+from library.lcd.framebuffer import ShadowFramebuffer
+from library.lcd.governor import BandwidthGovernor
+from library.lcd.line_graph import ScrollingPlot
+from library.lcd.serialize import BufferPool, merge_views
+from library.lcd.update_queue import UpdateQueue, region_contains
+
+
+# Max. size of the rendered text bitmaps kept in cache (bytes)
+TEXT_CACHE_SIZE = 4 * 1024 * 1024
+
+# Max. size of the background image areas kept in cache (bytes)
+IMAGE_CROP_CACHE_SIZE = 2 * 1024 * 1024
+
+# Max. size of the radial progress bar layers kept in cache (bytes)
+RADIAL_LAYER_CACHE_SIZE = 4 * 1024 * 1024
 
 
 class Orientation(IntEnum):
@@ -44,7 +64,28 @@ class Orientation(IntEnum):
     REVERSE_LANDSCAPE = 3
 
 
+class WriteCounters:
+    # Counters to measure how requests are grouped into serial writes
+    def __init__(self):
+        self.frames = 0  # Transactions sent
+        self.writes = 0  # Serial writes
+        self.bytes = 0  # Bytes written
+
+    def writes_per_frame(self) -> float:
+        return self.writes / self.frames if self.frames else 0.0
+
+    def bytes_per_write(self) -> float:
+        return self.bytes / self.writes if self.writes else 0.0
+
+    def __str__(self):
+        return f"{self.frames} frames, {self.writes} writes ({self.writes_per_frame():.1f} writes/frame), " \
+               f"{self.bytes} bytes ({self.bytes_per_write():.0f} bytes/write)"
+
+
 class LcdComm(ABC):
+    # Incremented every time the screen content is lost, so that callers know everything must be drawn again
+    content_generation = 0
+
     def __init__(self, com_port: str = "AUTO", display_width: int = 320, display_height: int = 480,
                  update_queue: Optional[queue.Queue] = None):
         self.lcd_serial = None
@@ -64,9 +105,18 @@ class LcdComm(ABC):
         self.update_queue = update_queue
 
         # Mutex to protect the queue in case a thread want to add multiple requests (e.g. image data) that should not be
-        # mixed with other requests in-between
+        # mixed with other requests in-between. Use Transaction() to lock it
         self.update_queue_mutex = threading.Lock()
 
+        # Requests of the transaction opened by the current thread, if any
+        self.transaction = threading.local()
+
+        # Number of transactions, serial writes and bytes sent to the display
+        self.write_counters = WriteCounters()
+
+        # Measures the link throughput and the bandwidth needed by widgets, to degrade widgets in case of overload
+        self.governor = BandwidthGovernor()
+
         # Create a cache to store opened images, to avoid opening and loading from the filesystem every time
         self.image_cache = {}  # { key=path, value=PIL.Image }
 
@@ -76,6 +126,56 @@ class LcdComm(ABC):
             ImageFont.FreeTypeFont # value= a loaded freetype font
         ] = {}
 
+        # Create a cache to store rendered texts, to avoid rendering again values that are often displayed
+        self.text_cache = BitmapCache(TEXT_CACHE_SIZE)
+
+        # Create a cache to store the areas of background images on which texts are drawn
+        self.image_crop_cache = BitmapCache(IMAGE_CROP_CACHE_SIZE)
+
+        # Create a cache to store the filled and empty pixels of progress bars
+        self.progress_bar_strips: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+
+        # Create a cache to store the position of the cells of bar arrays, and their background pixels
+        self.bar_array_layouts: Dict[Tuple, Tuple[BarArrayLayout, np.ndarray]] = {}
+
+        # Line of the graphs displayed in scrolling mode, kept between updates
+        self.line_graphs: Dict[Tuple[int, int, int, int], ScrollingPlot] = {}
+
+        # Create a cache to store the parts of radial progress bars that do not depend on the value
+        self.radial_layer_cache = BitmapCache(RADIAL_LAYER_CACHE_SIZE)
+
+        # Copy of the screen content, used to only send the parts of bitmaps that have changed. Created on first use
+        self.shadow_framebuffer: Optional[ShadowFramebuffer] = None
+
+        # Areas changed in the frame opened by the current thread, if any
+        self.frame = threading.local()
+
+        # Mutex to send frames one at a time: merged boxes are cut from the shadow framebuffer and may contain areas
+        # changed by other threads, they must be queued before another thread queues newer content of these areas.
+        # It is locked before update_queue_mutex: frames must not be sent from a transaction
+        self.frame_mutex = threading.Lock()
+
+        # Reusable buffers to serialize bitmaps into, instead of allocating new ones for every bitmap
+        self.buffer_pool = BufferPool()
+
+    @property
+    def orientation(self) -> Orientation:
+        return self._orientation
+
+    @orientation.setter
+    def orientation(self, orientation: Orientation):
+        self._orientation = orientation
+        # Changing orientation redraws the screen: its content is not known anymore
+        self.invalidate_shadow()
+
+    def invalidate_shadow(self):
+        # To be called when the screen content changes without going through DisplayPatch (clear, reset, turn on...)
+        # Next bitmaps will be sent entirely
+        self.content_generation += 1
+        shadow = getattr(self, "shadow_framebuffer", None)
+        if shadow is not None:
+            shadow.invalidate()
+
     def get_width(self) -> int:
         if self.orientation == Orientation.PORTRAIT or self.orientation == Orientation.REVERSE_PORTRAIT:
             return self.display_width
@@ -119,6 +219,8 @@ class LcdComm(ABC):
     def serial_write(self, data: bytes):
         assert self.lcd_serial is not None
         self.lcd_serial.write(data)
+        self.write_counters.writes += 1
+        self.write_counters.bytes += len(data)
 
     def serial_read(self, size: int) -> bytes:
         assert self.lcd_serial is not None
@@ -133,15 +235,100 @@ class LcdComm(ABC):
             self.lcd_serial.reset_input_buffer()
 
     def WriteData(self, byteBuffer: bytearray):
-        self.WriteLine(bytes(byteBuffer))
-
-    def SendLine(self, line: bytes):
-        if self.update_queue:
-            # Queue the request. Mutex is locked by caller to queue multiple lines
-            self.update_queue.put((self.WriteLine, [line]))
+        self.WriteLine(byteBuffer)
+
+    @contextmanager
+    def Transaction(self, region: Optional[Tuple[int, int, int, int]] = None):
+        # Group all requests sent from this block (commands, image data...) into a single unit: it is queued as one
+        # request, and consecutive data lines are sent to the display with a single serial write.
+        # If the transaction only updates a region (x, y, width, height) of the screen, it can be superseded by a newer
+        # update of the same region while it is still waiting in the queue.
+        # Transactions can be nested: requests are then sent at the end of the outermost one
+        if getattr(self.transaction, "requests", None) is not None:
+            yield
+            return
+
+        with self.update_queue_mutex:
+            self.transaction.requests = []
+            try:
+                yield
+            finally:
+                requests = self._merge_writes(self.transaction.requests)
+                self.transaction.requests = None
+                self.transaction.queued_bytes = self.queued_bytes() + \
+                    sum(len(args[0]) for f, args in requests if f in (self.WriteLine, self.WriteData))
+                if requests:
+                    self.write_counters.frames += 1
+                    if region and isinstance(self.update_queue, UpdateQueue):
+                        # Buffers used by the transaction must go back to the pool even if it is superseded
+                        releases = [(f, args) for f, args in requests if f == self.buffer_pool.release]
+                        self.update_queue.put_region_update((self.RunRequests, [requests]), region,
+                                                            (self.RunRequests, [releases]))
+                    elif self.update_queue:
+                        self.update_queue.put((self.RunRequests, [requests]))
+                    else:
+                        self.RunRequests(requests)
+
+    def _is_write(self, f) -> bool:
+        # Requests that only write data to the serial port can be merged together
+        return f == self.WriteLine or (f == self.WriteData and type(self).WriteData is LcdComm.WriteData)
+
+    def _merge_writes(self, requests: List[Tuple]) -> List[Tuple]:
+        if platform.system() == "Darwin":
+            # macOS needs the serial buffer to be flushed after each line to avoid bitmap corruption (see WriteLine):
+            # lines are written one by one
+            return requests
+
+        # Consecutive chunks of a serialized bitmap are written at once from its buffer, without copying them. Other
+        # consecutive lines (commands, headers) are small: they are joined
+        merged = []
+        lines = []
+        for f, args in requests + [(None, None)]:
+            if self._is_write(f):
+                line = args[0]
+                view = merge_views(lines[-1], line) if lines else None
+                if view is not None:
+                    lines[-1] = view
+                elif lines and not isinstance(lines[-1], memoryview) and not isinstance(line, memoryview):
+                    lines[-1] = bytes(lines[-1]) + line
+                else:
+                    lines.append(line)
+                continue
+            merged.extend((self.WriteLine, [line]) for line in lines)
+            lines = []
+            if f:
+                merged.append((f, args))
+        return merged
+
+    def queued_bytes(self) -> int:
+        # Number of bytes sent in transactions by the current thread
+        return getattr(self.transaction, "queued_bytes", 0)
+
+    def RunRequests(self, requests: List[Tuple]):
+        start_bytes, start_time = self.write_counters.bytes, time.perf_counter()
+        for f, args in requests:
+            f(*args)
+        self.governor.record_transfer(self.write_counters.bytes - start_bytes, time.perf_counter() - start_time)
+
+    def SendRequest(self, f, args: list):
+        requests = getattr(self.transaction, "requests", None)
+        if requests is not None:
+            # Add the request to the current transaction
+            requests.append((f, args))
+        elif self.update_queue:
+            # Lock queue mutex then queue the request
+            with self.update_queue_mutex:
+                self.update_queue.put((f, args))
         else:
             # If no queue for async requests: do request now
-            self.WriteLine(line)
+            f(*args)
+
+    def ReleaseBuffer(self, buffer: memoryview):
+        # Give a buffer back to the pool once all lines using it have been sent
+        self.SendRequest(self.buffer_pool.release, [buffer])
+
+    def SendLine(self, line: bytes):
+        self.SendRequest(self.WriteLine, [line])
 
     def WriteLine(self, line: bytes):
         try:
@@ -224,6 +411,72 @@ class LcdComm(ABC):
             image_height: int = 0
     ):
         pass
+
+    def DisplayPatch(self, image: Image.Image, x: int = 0, y: int = 0):
+        # Display an image at given coordinates, but only send the areas that are different from the screen content
+        width, height = self.get_width(), self.get_height()
+
+        # Restrict the image if it overflows the display size
+        image_width = min(image.size[0], width - x)
+        image_height = min(image.size[1], height - y)
+        if image_width <= 0 or image_height <= 0:
+            return
+        if image_width != image.size[0] or image_height != image.size[1]:
+            image = image.crop((0, 0, image_width, image_height))
+
+        shadow = self.shadow_framebuffer
+        if shadow is None or shadow.width != width or shadow.height != height:
+            # Framebuffer created on first use, or display size has changed (e.g. detected by a HELLO command)
+            shadow = ShadowFramebuffer(width, height)
+            self.shadow_framebuffer = shadow
+
+        with self.Frame():
+            boxes = shadow.update(image, x, y)
+            if boxes:
+                self.frame.dirty_boxes.extend((x + left, y + top, x + right, y + bottom)
+                                              for left, top, right, bottom in boxes)
+                self.frame.areas.append((x, y, image_width, image_height))
+
+    @contextmanager
+    def Frame(self, task: Optional[str] = None):
+        # Images displayed with DisplayPatch from this block are only drawn in the shadow framebuffer. At the end of the
+        # block, the areas that have changed are merged and sent to the display as a few bitmaps (see compositor.py).
+        # If the frame is drawn by a periodic task, the bytes sent are reported to the bandwidth governor.
+        # Frames can be nested: areas are then sent at the end of the outermost one
+        if getattr(self.frame, "dirty_boxes", None) is not None:
+            yield
+            return
+
+        start_bytes = self.queued_bytes()
+        self.frame.dirty_boxes = []
+        self.frame.areas = []
+        try:
+            yield
+        finally:
+            dirty_boxes, areas = self.frame.dirty_boxes, self.frame.areas
+            self.frame.dirty_boxes = self.frame.areas = None
+            self._send_frame(dirty_boxes, areas)
+            if task:
+                self.governor.record_frame(task, self.queued_bytes() - start_bytes)
+
+    def _send_frame(self, dirty_boxes: List[Box], areas: List[Tuple[int, int, int, int]]):
+        if not dirty_boxes:
+            return
+
+        with self.frame_mutex:
+            if isinstance(self.update_queue, UpdateQueue):
+                # Older updates of the changed images may still be waiting in the queue: send their area again with the
+                # new content, so that they are superseded (see UpdateQueue.put_region_update)
+                for px, py, pw, ph in self.update_queue.pending_regions():
+                    if any(region_contains(area, (px, py, pw, ph)) for area in areas):
+                        dirty_boxes.append((px, py, px + pw, py + ph))
+
+            # Merged boxes must not contain pixels for which the screen content is unknown, as they are sent from the
+            # shadow
+            shadow = self.shadow_framebuffer
+            for box in merge_boxes(dirty_boxes, can_merge=shadow.is_valid):
+                self.DisplayPILImage(shadow.crop(box), box[0], box[1])
+
     #Thanks to Gihhub user @Gihh for the DisplayStatusCircle function
     def DisplayStatusCircle(self, x: int, y: int, width: int, height: int, radius: int, status: bool,background_image: Optional[str] = None):
         # Display a status circle at given coordinates
@@ -262,7 +515,7 @@ class LcdComm(ABC):
         draw = ImageDraw.Draw(image)        
         draw.ellipse([0, 0, width - 1, height - 1], fill=color, outline=None)
         
-        self.DisplayPILImage(image, x, y)
+        self.DisplayPatch(image, x, y)
 
     def DisplayBitmap(self, bitmap_path: str, x: int = 0, y: int = 0, width: int = 0, height: int = 0):
         image = self.open_image(bitmap_path)
@@ -272,7 +525,7 @@ class LcdComm(ABC):
             if width != image.size[0] or height != image.size[1]:
                 image = image.resize((width, height))
 
-        self.DisplayPILImage(image, x, y, width, height)
+        self.DisplayPatch(image, x, y)
 
     def DisplayText(
             self,
@@ -306,22 +559,21 @@ class LcdComm(ABC):
         if width > 0 and height == 0:
             height = font_size
 
-        if background_image is None:
-            # A text bitmap is created with max width/height by default : text with solid background
-            text_image = Image.new(
-                'RGB',
-                (self.get_width(), self.get_height()),
-                background_color
-            )
-        else:
-            # The text bitmap is created from provided background image : text with transparent background
-            text_image = self.open_image(background_image)
+        # Texts drawn on a background image depend on their position, so it is part of the key in all cases
+        cache_key = (text, x, y, width, height, font, font_size, font_color, background_color, background_image, align,
+                     anchor, self.get_width(), self.get_height())
+        cached = self.text_cache.get(cache_key)
+        if cached is not None:
+            text_image, left, top = cached
+            self.DisplayPatch(text_image, left, top)
+            return
 
-        # Get text bounding box
+        # Get text bounding box first, so that only the text area has to be created and drawn
         ttfont = self.open_font(font, font_size)
-        d = ImageDraw.Draw(text_image)
+        mode = 'RGB' if background_image is None else self.load_image(background_image).mode
 
         if width == 0 or height == 0:
+            d = ImageDraw.Draw(Image.new(mode, (1, 1)))
             left, top, right, bottom = d.textbbox((x, y), text, font=ttfont, align=align, anchor=anchor)
 
             # textbbox may return float values, which is not good for the bitmap operations below.
@@ -345,19 +597,25 @@ class LcdComm(ABC):
             else:
                 y = top
 
-        # Draw text onto the background image with specified color & font
-        d.text((x, y), text, font=ttfont, fill=font_color, align=align, anchor=anchor)
-
         # Restrict the dimensions if they overflow the display size
         left = max(left, 0)
         top = max(top, 0)
         right = min(right, self.get_width())
         bottom = min(bottom, self.get_height())
 
-        # Crop text bitmap to keep only the text
-        text_image = text_image.crop(box=(left, top, right, bottom))
+        if background_image is None:
+            # Text with solid background
+            text_image = Image.new(mode, (right - left, bottom - top), background_color)
+        else:
+            # The text bitmap is created from the area of the provided background image : text with transparent background
+            text_image = self.open_image_crop(background_image, (left, top, right, bottom))
+
+        # Draw text onto the text area with specified color & font
+        d = ImageDraw.Draw(text_image)
+        d.text((x - left, y - top), text, font=ttfont, fill=font_color, align=align, anchor=anchor)
+        self.text_cache.put(cache_key, text_image, left, top)
 
-        self.DisplayPILImage(text_image, left, top)
+        self.DisplayPatch(text_image, left, top)
 
     def DisplayProgressBar(self, x: int, y: int, width: int, height: int, min_value: int = 0, max_value: int = 100,
                            value: int = 50,
@@ -384,31 +642,86 @@ class LcdComm(ABC):
 
         assert min_value <= value <= max_value, 'Progress bar value shall be between min and max'
 
-        if background_image is None:
-            # A bitmap is created with solid background
-            bar_image = Image.new('RGB', (width, height), background_color)
-        else:
-            # A bitmap is created from provided background image
-            bar_image = self.open_image(background_image)
+        # A progress bar only depends on its filled width: the filled and empty bars are drawn once, then each update
+        # is made of the beginning of the filled bar and the end of the empty bar
+        strips_key = (x, y, width, height, bar_color, bar_outline, background_color, background_image)
+        strips = self.progress_bar_strips.get(strips_key)
+        if strips is None:
+            if background_image is None:
+                # A bitmap is created with solid background
+                empty_bar = Image.new('RGB', (width, height), background_color)
+            else:
+                # A bitmap is created from provided background image, cropped to keep only the progress bar background
+                empty_bar = self.open_image_crop(background_image, (x, y, x + width, y + height))
 
-            # Crop bitmap to keep only the progress bar background
-            bar_image = bar_image.crop(box=(x, y, x + width, y + height))
+            filled_bar = empty_bar.copy()
+            ImageDraw.Draw(filled_bar).rectangle([0, 0, width - 1, height - 1], fill=bar_color, outline=bar_color)
+            if bar_outline:
+                # Draw outline
+                ImageDraw.Draw(empty_bar).rectangle([0, 0, width - 1, height - 1], fill=None, outline=bar_color)
 
-        # Draw progress bar
+            # RGBA pixels can be turned back into an image without conversion
+            strips = (np.asarray(filled_bar.convert('RGBA')), np.asarray(empty_bar.convert('RGBA')))
+            self.progress_bar_strips[strips_key] = strips
+        filled_bar, empty_bar = strips
+
+        # Draw progress bar: filled columns are the ones PIL would draw for a rectangle up to bar_filled_width
         bar_filled_width = (value / (max_value - min_value) * width) - 1
         if bar_filled_width < 0:
             bar_filled_width = 0
-        draw = ImageDraw.Draw(bar_image)
-        draw.rectangle([0, 0, bar_filled_width, height - 1], fill=bar_color, outline=bar_color)
+        filled_columns = min(int(bar_filled_width) + 1, width)
+        pixels = np.concatenate((filled_bar[:, :filled_columns], empty_bar[:, filled_columns:]), axis=1)
+        bar_image = Image.frombuffer('RGBA', (width, height), pixels, 'raw', 'RGBA', 0, 1)
+
+        self.DisplayPatch(bar_image, x, y)
+
+    def DisplayBarArray(self, x: int, y: int, width: int, height: int,
+                        values: Union[List[float], np.ndarray],
+                        min_value: float = 0,
+                        max_value: float = 100,
+                        columns: int = 0,
+                        bar_color: Color = (0, 0, 0),
+                        heatmap: bool = False,
+                        low_color: Optional[Color] = None,
+                        background_color: Color = (255, 255, 255),
+                        background_image: Optional[str] = None):
+        # Generate an array of bars (e.g. one per CPU core) and display it. Values are displayed in a grid of cells
+        # with the given number of columns (all values on one row if 0)
+        # In heatmap mode, cells are filled with a color between low_color (background color if not set) and bar_color
+        # Provide the background image path to display the bars with transparent background
 
-        if bar_outline:
-            # Draw outline
-            draw.rectangle([0, 0, width - 1, height - 1], fill=None, outline=bar_color)
+        bar_color = parse_color(bar_color)
+        background_color = parse_color(background_color)
+        low_color = parse_color(low_color) if low_color is not None else background_color
+
+        assert x <= self.get_width(), 'Bar array X coordinate must be <= display width'
+        assert y <= self.get_height(), 'Bar array Y coordinate must be <= display height'
+        assert x + width <= self.get_width(), 'Bar array width exceeds display width'
+        assert y + height <= self.get_height(), 'Bar array height exceeds display height'
+
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+
+        layout_key = (x, y, width, height, values.size, columns, background_color, background_image)
+        layout = self.bar_array_layouts.get(layout_key)
+        if layout is None:
+            if background_image is None:
+                # A bitmap is created with solid background
+                background = Image.new('RGBA', (width, height), background_color)
+            else:
+                # A bitmap is created from provided background image, cropped to keep only the bars background
+                background = self.open_image_crop(background_image, (x, y, x + width, y + height)).convert('RGBA')
+            layout = (BarArrayLayout(width, height, values.size, columns), np.asarray(background))
+            self.bar_array_layouts[layout_key] = layout
+        layout, background = layout
 
-        self.DisplayPILImage(bar_image, x, y)
+        ratios = (values - min_value) / (max_value - min_value)
+        pixels = layout.draw(background, ratios, bar_color, low_color if heatmap else None)
+        self.DisplayPatch(Image.frombuffer('RGBA', (width, height), pixels, 'raw', 'RGBA', 0, 1), x, y)
 
     def DisplayLineGraph(self, x: int, y: int, width: int, height: int,
-                         values: List[float],
+                         values: Union[List[float], np.ndarray],
                          min_value: float = 0,
                          max_value: float = 100,
                          autoscale: bool = False,
@@ -420,9 +733,12 @@ class LcdComm(ABC):
                          axis_font_size: int = 10,
                          background_color: Color = (255, 255, 255),
                          background_image: Optional[str] = None,
-                         axis_minmax_format: str = "{:0.0f}"):
+                         axis_minmax_format: str = "{:0.0f}",
+                         scrolling: bool = False):
         # Generate a plot graph and display it
         # Provide the background image path to display plot graph with transparent background
+        # In scrolling mode, the line is kept between updates: when a value is added, it is shifted and only the new
+        # segment is drawn. Graphs in scrolling mode must be displayed with the same history size on each update
 
         line_color = parse_color(line_color)
         axis_color = parse_color(axis_color)
@@ -437,22 +753,18 @@ class LcdComm(ABC):
             # A bitmap is created with solid background
             graph_image = Image.new('RGB', (width, height), background_color)
         else:
-            # A bitmap is created from provided background image
-            graph_image = self.open_image(background_image)
+            # A bitmap is created from provided background image, cropped to keep only the plot graph background
+            graph_image = self.open_image_crop(background_image, (x, y, x + width, y + height))
 
-            # Crop bitmap to keep only the plot graph background
-            graph_image = graph_image.crop(box=(x, y, x + width, y + height))
+        # Values can be given as a NumPy array (e.g. a history view), used without copy.
+        # NaN values (history not full yet) are not displayed
+        values = np.asarray(values, dtype=float)
+        valid_values = values[~np.isnan(values)]
 
         # if autoscale is enabled, define new min/max value to "zoom" the graph
-        if autoscale:
-            trueMin = max_value
-            trueMax = min_value
-            for value in values:
-                if not math.isnan(value):
-                    if trueMin > value:
-                        trueMin = value
-                    if trueMax < value:
-                        trueMax = value
+        if autoscale and valid_values.size > 0:
+            trueMin = min(float(np.nanmin(values)), max_value)
+            trueMax = max(float(np.nanmax(values)), min_value)
 
             if trueMin != max_value and trueMax != min_value:
                 min_value = max(trueMin - 5, min_value)
@@ -462,27 +774,25 @@ class LcdComm(ABC):
         # pre compute yScale multiplier value
         yScale = (height / (max_value - min_value)) if (max_value - min_value) != 0 else 0
 
-        plotsX = []
-        plotsY = []
-        count = 0
-        for value in values:
-            if not math.isnan(value):
-                # Don't let the set value exceed our min or max value, this is bad :)                
-                if value < min_value:
-                    value = min_value
-                elif max_value < value:
-                    value = max_value
-
-                assert min_value <= value <= max_value, 'Plot point value shall be between min and max'
-
-                plotsX.append(count * step)
-                plotsY.append(height - (value - min_value) * yScale)
-
-                count += 1
+        # Don't let the set value exceed our min or max value, this is bad :)
+        valid_values = np.clip(valid_values, min_value, max_value)
+        plotsX = np.arange(valid_values.size) * step
+        plotsY = height - (valid_values - min_value) * yScale
+        points = list(zip(plotsX.tolist(), plotsY.tolist()))
 
         # Draw plot graph
+        if scrolling:
+            plot = self.line_graphs.get((x, y, width, height))
+            if plot is None or not plot.is_compatible(step, line_width, (min_value, max_value)):
+                # First update, or scale has changed: the line is drawn from scratch
+                plot = ScrollingPlot(width, height, step, line_width, (min_value, max_value))
+                self.line_graphs[(x, y, width, height)] = plot
+            plot.update(points)
+            graph_image = plot.draw_on(graph_image, line_color)
+        else:
+            ImageDraw.Draw(graph_image).line(points, fill=line_color, width=line_width)
+
         draw = ImageDraw.Draw(graph_image)
-        draw.line(list(zip(plotsX, plotsY)), fill=line_color, width=line_width)
 
         if graph_axis:
             # Draw axis
@@ -502,7 +812,7 @@ class LcdComm(ABC):
             draw.text((width - 1 - right, height - 2 - bottom), text,
                       font=ttfont, fill=axis_color)
 
-        self.DisplayPILImage(graph_image, x, y)
+        self.DisplayPatch(graph_image, x, y)
 
     def DrawRadialDecoration(self, draw: ImageDraw.ImageDraw, angle: float, radius: float, width: float, color: Tuple[int, int, int] = (0, 0, 0)):
         i_cos = math.cos(angle*math.pi/180)
@@ -582,20 +892,7 @@ class LcdComm(ABC):
 
         diameter = 2 * radius
         bbox = (xc - radius, yc - radius, xc + radius, yc + radius)
-        #
-        if background_image is None:
-            # A bitmap is created with solid background
-            bar_image = Image.new('RGB', (diameter, diameter), background_color)
-        else:
-            # A bitmap is created from provided background image
-            bar_image = self.open_image(background_image)
-
-            # Crop bitmap to keep only the progress bar background
-            bar_image = bar_image.crop(box=bbox)
-
-        # Draw progress bar
         pct = (value - min_value) / (max_value - min_value)
-        draw = ImageDraw.Draw(bar_image)
 
         # PIL arc method uses angles with
         #  . 3 o'clock for 0
@@ -608,21 +905,52 @@ class LcdComm(ABC):
                 ecart = 360 - angle_start + angle_end
             else:
                 ecart = angle_end - angle_start
+        else:
+            if angle_end < angle_start:
+                ecart = angle_start - angle_end
+            else:
+                ecart = 360 - angle_end + angle_start
+
+        # The background, bar background and start/end decorations do not depend on the value: this layer is drawn
+        # once and cached, only the value-dependent bar and text are drawn on each update
+        layer_key = (bbox, background_color, background_image, angle_start, angle_end, clockwise, bar_width,
+                     draw_bar_background, bar_background_color, bar_decoration, bar_color)
+        layer = self.radial_layer_cache.get(layer_key)
+        if layer is None:
+            if background_image is None:
+                # A bitmap is created with solid background
+                layer_image = Image.new('RGB', (diameter, diameter), background_color)
+            else:
+                # A bitmap is created from provided background image, cropped to keep only the progress bar background
+                layer_image = self.open_image_crop(background_image, bbox)
+            draw = ImageDraw.Draw(layer_image)
 
             # draw bar background
             if draw_bar_background:
-                if angle_end < angle_start:
-                    angleE = angle_start + ecart
-                    angleS = angle_start
-                else:
+                if clockwise:
                     angleS = angle_start
                     angleE = angle_start + ecart
-                draw.arc([0, 0, diameter - 1, diameter - 1], angleS, angleE, fill=bar_background_color, width=bar_width) 
-                
-            # draw bar decoration
+                else:
+                    angleS = angle_start - ecart
+                    angleE = angle_start
+                draw.arc([0, 0, diameter - 1, diameter - 1], angleS, angleE, fill=bar_background_color, width=bar_width)
+
+            # draw bar start/end decoration
             if bar_decoration == "Ellipse":
                 self.DrawRadialDecoration(draw = draw, angle = angle_end, radius = radius, width = bar_width, color = bar_background_color)
                 self.DrawRadialDecoration(draw = draw, angle = angle_start, radius = radius, width = bar_width, color = bar_color)
+
+            self.radial_layer_cache.put(layer_key, layer_image, bbox[0], bbox[1])
+        else:
+            layer_image = layer[0]
+
+        # Draw progress bar
+        bar_image = layer_image.copy()
+        draw = ImageDraw.Draw(bar_image)
+
+        if clockwise:
+            # draw bar decoration
+            if bar_decoration == "Ellipse":
                 self.DrawRadialDecoration(draw = draw, angle = angle_start + pct * ecart, radius = radius, width = bar_width, color = bar_color)
 
             #
@@ -654,26 +982,8 @@ class LcdComm(ABC):
                          fill=bar_color,
                          width=bar_width)
         else:
-            if angle_end < angle_start:
-                ecart = angle_start - angle_end
-            else:
-                ecart = 360 - angle_end + angle_start
-
-            # draw bar background
-            if draw_bar_background:
-                if angle_end < angle_start:
-                    angleE = angle_start
-                    angleS = angle_start - ecart
-                else:
-                    angleS = angle_start - ecart
-                    angleE = angle_start
-                draw.arc([0, 0, diameter - 1, diameter - 1], angleS, angleE, fill=bar_background_color, width=bar_width) 
-
-
             # draw bar decoration
             if bar_decoration == "Ellipse":
-                self.DrawRadialDecoration(draw = draw, angle = angle_end, radius = radius, width = bar_width, color = bar_background_color)
-                self.DrawRadialDecoration(draw = draw, angle = angle_start, radius = radius, width = bar_width, color = bar_color)
                 self.DrawRadialDecoration(draw = draw, angle = angle_start - pct * ecart, radius = radius, width = bar_width, color = bar_color)
 
             #      
@@ -718,15 +1028,30 @@ class LcdComm(ABC):
         if custom_bbox[0] != 0 or custom_bbox[1] != 0 or custom_bbox[2] != 0 or custom_bbox[3] != 0:
             bar_image = bar_image.crop(box=custom_bbox)
 
-        self.DisplayPILImage(bar_image, xc - radius + custom_bbox[0], yc - radius + custom_bbox[1])
+        self.DisplayPatch(bar_image, xc - radius + custom_bbox[0], yc - radius + custom_bbox[1])
        # self.DisplayPILImage(bar_image, xc - radius, yc - radius)
 
     # Load image from the filesystem, or get from the cache if it has already been loaded previously
     def open_image(self, bitmap_path: str) -> Image.Image:
+        return copy.copy(self.load_image(bitmap_path))
+
+    # Get an area (left, top, right, bottom) of an image, without copying the whole image.
+    # Areas are cached, as widgets are usually drawn at the same place
+    def open_image_crop(self, bitmap_path: str, box: Tuple[int, int, int, int]) -> Image.Image:
+        cached = self.image_crop_cache.get((bitmap_path, box))
+        if cached is None:
+            image_crop = self.load_image(bitmap_path).crop(box)
+            self.image_crop_cache.put((bitmap_path, box), image_crop, box[0], box[1])
+        else:
+            image_crop = cached[0]
+        return image_crop.copy()
+
+    # Cached image must not be modified: use open_image() to get a copy
+    def load_image(self, bitmap_path: str) -> Image.Image:
         if bitmap_path not in self.image_cache:
             logger.debug("Bitmap " + bitmap_path + " is now loaded in the cache")
             self.image_cache[bitmap_path] = Image.open(bitmap_path)
-        return copy.copy(self.image_cache[bitmap_path])
+        return self.image_cache[bitmap_path]
 
     def open_font(self, name: str, size: int) -> ImageFont.FreeTypeFont:
         if (name, size) not in self.font_cache:
@@ -85,13 +85,11 @@ class LcdCommRevA(LcdComm):
         byteBuffer[4] = (ey & 255)
         byteBuffer[5] = cmd
 
-        # If no queue for async requests, or if asked explicitly to do the request sequentially: do request now
-        if not self.update_queue or bypass_queue:
+        # If asked explicitly to do the request sequentially: do request now
+        if bypass_queue:
             self.WriteData(byteBuffer)
         else:
-            # Lock queue mutex then queue the request
-            with self.update_queue_mutex:
-                self.update_queue.put((self.WriteData, [byteBuffer]))
+            self.SendRequest(self.WriteData, [byteBuffer])
 
     def _hello(self):
         hello = bytearray([Command.HELLO, Command.HELLO, Command.HELLO, Command.HELLO, Command.HELLO, Command.HELLO])
@@ -127,6 +125,7 @@ class LcdCommRevA(LcdComm):
         logger.info("Display reset (COM port may change)...")
         # Reset command bypasses queue because it is run when queue threads are not yet started
         self.SendCommand(Command.RESET, 0, 0, 0, 0, bypass_queue=True)
+        self.invalidate_shadow()
         self.closeSerial()
         # Wait for display reset then reconnect
         time.sleep(5)
@@ -208,12 +207,14 @@ class LcdCommRevA(LcdComm):
         (x0, y0) = (x, y)
         (x1, y1) = (x + image_width - 1, y + image_height - 1)
 
-        rgb565le = image_to_RGB565(image, "little")
+        buffer = self.buffer_pool.acquire(image_width * image_height * 2)
+        rgb565le = image_to_RGB565(image, "little", out=buffer)
 
-        self.SendCommand(Command.DISPLAY_BITMAP, x0, y0, x1, y1)
+        # Queue the bitmap command and all the image data as a single transaction
+        with self.Transaction(region=(x, y, image_width, image_height)):
+            self.SendCommand(Command.DISPLAY_BITMAP, x0, y0, x1, y1)
 
-        # Lock queue mutex then queue all the requests for the image data
-        with self.update_queue_mutex:
             # Send image data by multiple of "display width" bytes
             for chunk in chunked(rgb565le, width * 8):
                 self.SendLine(chunk)
+            self.ReleaseBuffer(buffer)
@@ -98,13 +98,11 @@ class LcdCommRevB(LcdComm):
         byteBuffer[8] = payload[7]
         byteBuffer[9] = cmd
 
-        # If no queue for async requests, or if asked explicitly to do the request sequentially: do request now
-        if not self.update_queue or bypass_queue:
+        # If asked explicitly to do the request sequentially: do request now
+        if bypass_queue:
             self.WriteData(byteBuffer)
         else:
-            # Lock queue mutex then queue the request
-            with self.update_queue_mutex:
-                self.update_queue.put((self.WriteData, [byteBuffer]))
+            self.SendRequest(self.WriteData, [byteBuffer])
 
     def _hello(self):
         hello = [ord('H'), ord('E'), ord('L'), ord('L'), ord('O')]
@@ -195,12 +193,13 @@ class LcdCommRevB(LcdComm):
         else:
             self.SendCommand(Command.SET_ORIENTATION, payload=[OrientationValueRevB.ORIENTATION_LANDSCAPE])
 
-    def serialize_image(self, image: Image.Image, height: int, width: int) -> bytes:
+    def serialize_image(self, image: Image.Image, height: int, width: int,
+                        out: Optional[memoryview] = None) -> Union[bytes, memoryview]:
         if image.width != width or image.height != height:
             image = image.crop((0, 0, width, height))
         if self.orientation == Orientation.REVERSE_PORTRAIT or self.orientation == Orientation.REVERSE_LANDSCAPE:
             image = image.rotate(180)
-        return image_to_RGB565(image, "big")
+        return image_to_RGB565(image, "big", out=out)
 
     def DisplayPILImage(
             self,
@@ -234,23 +233,22 @@ class LcdCommRevB(LcdComm):
             (x0, y0) = (self.get_width() - x - image_width, self.get_height() - y - image_height)
             (x1, y1) = (self.get_width() - x - 1, self.get_height() - y - 1)
 
-        self.SendCommand(Command.DISPLAY_BITMAP,
-                         payload=[(x0 >> 8) & 255, x0 & 255,
-                                  (y0 >> 8) & 255, y0 & 255,
-                                  (x1 >> 8) & 255, x1 & 255,
-                                  (y1 >> 8) & 255, y1 & 255])
+        buffer = self.buffer_pool.acquire(image_width * image_height * 2)
+        rgb565be = self.serialize_image(image, image_height, image_width, out=buffer)
 
-        rgb565be = self.serialize_image(image, image_height, image_width)
+        # Queue the bitmap command and all the image data as a single transaction
+        with self.Transaction(region=(x, y, image_width, image_height)):
+            self.SendCommand(Command.DISPLAY_BITMAP,
+                             payload=[(x0 >> 8) & 255, x0 & 255,
+                                      (y0 >> 8) & 255, y0 & 255,
+                                      (x1 >> 8) & 255, x1 & 255,
+                                      (y1 >> 8) & 255, y1 & 255])
 
-        # Lock queue mutex then queue all the requests for the image data
-        with self.update_queue_mutex:
             # Send image data by multiple of "display width" bytes
             for chunk in chunked(rgb565be, self.get_width() * 8):
                 self.SendLine(chunk)
+            self.ReleaseBuffer(buffer)
 
             # Implement a cooldown between two bitmaps, because we are not listening to events coming from the display
             # Cooldown of 0.05 decreases "corrupted bitmap" significantly without slowing down too much
-            if self.update_queue:
-                self.update_queue.put((time.sleep, [0.05]))
-            else:
-                time.sleep(0.05)
\ No newline at end of file
+            self.SendRequest(time.sleep, [0.05])
\ No newline at end of file
@@ -28,11 +28,12 @@ from math import ceil
 from typing import Optional, Tuple
 
 import serial
+import numpy as np
 from PIL import Image
 from serial.tools.list_ports import comports
 
 from library.lcd.lcd_comm import Orientation, LcdComm
-from library.lcd.serialize import image_to_BGRA, image_to_BGR, chunked
+from library.lcd.serialize import image_to_BGRA, image_to_compressed_BGRA, join_chunks, joined_chunks_size
 from library.log import logger
 
 
@@ -192,7 +193,10 @@ class LcdCommRevC(LcdComm):
         if not padding:
             padding = Padding.NULL
 
-        if payload:
+        if cmd == Command.SEND_PAYLOAD and payload and len(payload) % 250 == 0:
+            # Payload is already padded (e.g. bitmap data): send it as is, without copying it
+            message = payload
+        elif payload:
             message.extend(payload)
 
         msg_size = len(message)
@@ -201,16 +205,15 @@ class LcdCommRevC(LcdComm):
             pad_size = (250 * ceil(msg_size / 250) - msg_size)
             message += bytearray(padding.value * pad_size)
 
-        # If no queue for async requests, or if asked explicitly to do the request sequentially: do request now
-        if not self.update_queue or bypass_queue:
+        # If asked explicitly to do the request sequentially: do request now
+        if bypass_queue:
             self.WriteData(message)
             if readsize:
                 self.ReadData(readsize)
         else:
-            # Lock queue mutex then queue the request
-            self.update_queue.put((self.WriteData, [message]))
+            self.SendRequest(self.WriteData, [message])
             if readsize:
-                self.update_queue.put((self.ReadData, [readsize]))
+                self.SendRequest(self.ReadData, [readsize])
 
     def _hello(self):
         # This command reads LCD answer on serial link, so it bypasses the queue
@@ -260,6 +263,7 @@ class LcdCommRevC(LcdComm):
         logger.info("Display reset (COM port may change)...")
         # Reset command bypasses queue because it is run when queue threads are not yet started
         self._send_command(Command.RESTART, bypass_queue=True)
+        self.invalidate_shadow()
         self.closeSerial()
         # Wait for disconnection (max. 15 seconds)
         for i in range(15):
@@ -345,7 +349,7 @@ class LcdCommRevC(LcdComm):
         assert image_width > 0, 'Image width must be > 0'
 
         if x == 0 and y == 0 and (image_width == self.get_width()) and (image_height == self.get_height()):
-            with self.update_queue_mutex:
+            with self.Transaction(region=(x, y, image_width, image_height)):
                 self._send_command(Command.PRE_UPDATE_BITMAP)
                 self._send_command(Command.START_DISPLAY_BITMAP, padding=Padding.START_DISPLAY_BITMAP)
 
@@ -359,19 +363,30 @@ class LcdCommRevC(LcdComm):
                 self._send_command(display_bmp_cmd,
                                    payload=bytearray(
                                        int(self.display_width * self.display_width / 64).to_bytes(2, "big")))
-                self._send_command(Command.SEND_PAYLOAD,
-                                   payload=bytearray(self._generate_full_image(image)),
-                                   readsize=1024)
+                img = self._generate_full_image(image)
+                self._send_command(Command.SEND_PAYLOAD, payload=img, readsize=1024)
+                self.ReleaseBuffer(img)
                 self._send_command(Command.QUERY_STATUS, readsize=1024)
         else:
-            with self.update_queue_mutex:
+            with self.Transaction(region=(x, y, image_width, image_height)):
                 img, pyd = self._generate_update_image(image, x, y, Count.Start, Command.UPDATE_BITMAP)
                 self._send_command(Command.SEND_PAYLOAD, payload=pyd)
                 self._send_command(Command.SEND_PAYLOAD, payload=img)
+                self.ReleaseBuffer(img)
                 self._send_command(Command.QUERY_STATUS, readsize=1024)
             Count.Start += 1
 
-    def _generate_full_image(self, image: Image.Image) -> bytes:
+    def _pack_payload(self, data: memoryview, chunk_size: int = 249, footer: bytes = b"") -> memoryview:
+        # Split data in chunks separated by a null byte, add the footer and pad it to a multiple of 250 bytes.
+        # Result is written in a buffer from the pool, that must be released once sent
+        size = joined_chunks_size(len(data), chunk_size, separator_size=1) + len(footer)
+        buffer = self.buffer_pool.acquire(250 * ceil(size / 250))
+        join_chunks(data, chunk_size, out=buffer, separator=b'\x00')
+        buffer[size - len(footer):size] = footer
+        buffer[size:] = bytes(len(buffer) - size)
+        return buffer
+
+    def _generate_full_image(self, image: Image.Image) -> memoryview:
         if self.sub_revision == SubRevision.REV_8INCH:
             # Switch landscape/portrait mode for 8"
             if self.orientation == Orientation.LANDSCAPE:
@@ -390,13 +405,15 @@ class LcdCommRevC(LcdComm):
             elif self.orientation == Orientation.REVERSE_LANDSCAPE:
                 image = image.rotate(180)
 
-        bgra_data, pixel_size = image_to_BGRA(image)
-
-        return b'\x00'.join(chunked(bgra_data, 249))
+        pixels_buffer = self.buffer_pool.acquire(image.width * image.height * 4)
+        bgra_data, pixel_size = image_to_BGRA(image, out=pixels_buffer)
+        payload = self._pack_payload(bgra_data)
+        self.buffer_pool.release(pixels_buffer)
+        return payload
 
     def _generate_update_image(
             self, image: Image.Image, x: int, y: int, count: int, cmd: Optional[Command] = None
-    ) -> Tuple[bytearray, bytearray]:
+    ) -> Tuple[memoryview, bytearray]:
         x0, y0 = x, y
         if self.sub_revision == SubRevision.REV_8INCH:
             # Switch landscape/portrait mode for 8"
@@ -428,28 +445,35 @@ class LcdCommRevC(LcdComm):
                 x0 = y
                 y0 = x
 
-        img_raw_data = bytearray()
-
         # Some screens require different RGBA encoding
         if self.sub_revision != SubRevision.REV_2INCH and self.rom_version > 88:
             # BGRA mode on 4 bytes : [B, G, R, A]
-            img_data, pixel_size = image_to_BGRA(image)
+            pixel_size = 4
+            serialize = image_to_BGRA
         else:
             # BGRA mode on 3 bytes: [6-bit B + 2-bit A, 6-bit G + 2-bit A, 8-bit R]
-            # img_data, pixel_size = image_to_compressed_BGRA(image)
-            # For now use simple BGR that is more optimized, because this program does not support transparent background
-            img_data, pixel_size = image_to_BGR(image)
-
-        for h, line in enumerate(chunked(img_data, image.width * pixel_size)):
-            if self.sub_revision == SubRevision.REV_8INCH:
-                # Switch landscape/portrait mode for 8"
-                img_raw_data += int(((x0 + h) * self.display_width) + y0).to_bytes(3, "big")
-            else:
-                img_raw_data += int(((x0 + h) * self.display_height) + y0).to_bytes(3, "big")
-            img_raw_data += int(image.width).to_bytes(2, "big")
-            img_raw_data += line
+            pixel_size = 3
+            serialize = image_to_compressed_BGRA
+        pixels_buffer = self.buffer_pool.acquire(image.width * image.height * pixel_size)
+        img_data, pixel_size = serialize(image, out=pixels_buffer)
+
+        # Each line of the image is sent with a header: [3-byte address of the first pixel, 2-byte line width]
+        line_size = 5 + image.width * pixel_size
+        raw_buffer = self.buffer_pool.acquire(image.height * line_size)
+        lines = np.frombuffer(raw_buffer, dtype=np.uint8).reshape(image.height, line_size)
+        if self.sub_revision == SubRevision.REV_8INCH:
+            # Switch landscape/portrait mode for 8"
+            addresses = (x0 + np.arange(image.height)) * self.display_width + y0
+        else:
+            addresses = (x0 + np.arange(image.height)) * self.display_height + y0
+        lines[:, 0] = addresses >> 16
+        lines[:, 1] = addresses >> 8 & 0xFF
+        lines[:, 2] = addresses & 0xFF
+        lines[:, 3:5] = np.frombuffer(int(image.width).to_bytes(2, "big"), dtype=np.uint8)
+        lines[:, 5:] = np.frombuffer(img_data, dtype=np.uint8).reshape(image.height, -1)
+        self.buffer_pool.release(pixels_buffer)
 
-        image_size = int(len(img_raw_data) + 2).to_bytes(3, "big")  # The +2 is for the "ef69" that will be added later.
+        image_size = int(len(raw_buffer) + 2).to_bytes(3, "big")  # The +2 is for the "ef69" that will be added later.
 
         # logger.debug("Render Count: {}".format(count))
         payload = bytearray()
@@ -460,8 +484,10 @@ class LcdCommRevC(LcdComm):
         payload.extend(Padding.NULL.value * 3)
         payload.extend(count.to_bytes(4, 'big'))
 
-        if len(img_raw_data) > 250:
-            img_raw_data = bytearray(b'\x00').join(chunked(bytes(img_raw_data), 249))
-        img_raw_data += b'\xef\x69'
+        if len(raw_buffer) > 250:
+            img_raw_data = self._pack_payload(raw_buffer, footer=b'\xef\x69')
+        else:
+            img_raw_data = self._pack_payload(raw_buffer, chunk_size=len(raw_buffer), footer=b'\xef\x69')
+        self.buffer_pool.release(raw_buffer)
 
         return img_raw_data, payload
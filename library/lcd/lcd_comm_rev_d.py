@@ -23,7 +23,7 @@ from enum import Enum
 from serial.tools.list_ports import comports
 
 from library.lcd.lcd_comm import *
-from library.lcd.serialize import image_to_RGB565, chunked
+from library.lcd.serialize import image_to_RGB565, chunked, join_chunks, joined_chunks_size
 from library.log import logger
 
 
@@ -73,13 +73,11 @@ class LcdCommRevD(LcdComm):
         if payload:
             message.extend(payload)
 
-        # If no queue for async requests, or if asked explicitly to do the request sequentially: do request now
-        if not self.update_queue or bypass_queue:
+        # If asked explicitly to do the request sequentially: do request now
+        if bypass_queue:
             self.WriteData(message)
         else:
-            # Lock queue mutex then queue the request
-            with self.update_queue_mutex:
-                self.update_queue.put((self.WriteData, [message]))
+            self.SendRequest(self.WriteData, [message])
 
     def InitializeComm(self):
         pass
@@ -93,6 +91,7 @@ class LcdCommRevD(LcdComm):
         color = 0xFFFF  # RGB565 White color
         color_bytes = bytearray(color.to_bytes(2, "big"))
         self.SendCommand(cmd=Command.DISPCOLOR, payload=color_bytes)
+        self.invalidate_shadow()
 
     def ScreenOff(self):
         # HW revision D does not implement a "ScreenOff" native command: using SetBrightness(0) instead
@@ -155,6 +154,8 @@ class LcdCommRevD(LcdComm):
         if image_width != image.size[0] or image_height != image.size[1]:
             image = image.crop((0, 0, image_width, image_height))
 
+        region = (x, y, image_width, image_height)
+
         if self.orientation == Orientation.PORTRAIT or self.orientation == Orientation.REVERSE_PORTRAIT:
             (x0, y0) = (x, y)
             (x1, y1) = (x + image_width - 1, y + image_height - 1)
@@ -165,23 +166,30 @@ class LcdCommRevD(LcdComm):
             (x1, y1) = (self.display_width - y - 1, x + image_width - 1)
             image_width, image_height = image_height, image_width
 
-        # Send bitmap size
-        image_data = bytearray()
-        image_data += x0.to_bytes(2, "big")
-        image_data += x1.to_bytes(2, "big")
-        image_data += y0.to_bytes(2, "big")
-        image_data += y1.to_bytes(2, "big")
-        self.SendCommand(cmd=Command.BLOCKWRITE, payload=image_data)
-
-        # Prepare bitmap data transmission
-        self.SendCommand(Command.INTOPICMODE)
-
-        rgb565be = image_to_RGB565(image, "big")
-
-        # Lock queue mutex then queue all the requests for the image data
-        with self.update_queue_mutex:
-            for chunk in chunked(rgb565be, 63):
-                self.SendLine(b"\x50" + chunk)
-
-        # Indicate the complete bitmap has been transmitted
-        self.SendCommand(Command.OUTPICMODE)
+        pixels_buffer = self.buffer_pool.acquire(image_width * image_height * 2)
+        rgb565be = image_to_RGB565(image, "big", out=pixels_buffer)
+
+        # Each line is made of a 0x50 header followed by 63 bytes of bitmap data
+        buffer = self.buffer_pool.acquire(joined_chunks_size(len(rgb565be), 63, header_size=1))
+        lines = join_chunks(rgb565be, 63, out=buffer, header=b"\x50")
+        self.buffer_pool.release(pixels_buffer)
+
+        # Queue the bitmap commands and all the image data as a single transaction
+        with self.Transaction(region=region):
+            # Send bitmap size
+            image_data = bytearray()
+            image_data += x0.to_bytes(2, "big")
+            image_data += x1.to_bytes(2, "big")
+            image_data += y0.to_bytes(2, "big")
+            image_data += y1.to_bytes(2, "big")
+            self.SendCommand(cmd=Command.BLOCKWRITE, payload=image_data)
+
+            # Prepare bitmap data transmission
+            self.SendCommand(Command.INTOPICMODE)
+
+            for line in chunked(lines, 64):
+                self.SendLine(line)
+            self.ReleaseBuffer(buffer)
+
+            # Indicate the complete bitmap has been transmitted
+            self.SendCommand(Command.OUTPICMODE)
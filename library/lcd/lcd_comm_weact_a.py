@@ -70,22 +70,18 @@ class LcdCommWeActA(LcdComm):
         byteBuffer[8] = ye >> 8 & 0xFF
         byteBuffer[9] = Command.CMD_END
 
-        # If no queue for async requests, or if asked explicitly to do the request sequentially: do request now
-        if not self.update_queue or bypass_queue:
+        # If asked explicitly to do the request sequentially: do request now
+        if bypass_queue:
             self.WriteData(byteBuffer)
         else:
-            # Lock queue mutex then queue the request
-            with self.update_queue_mutex:
-                self.update_queue.put((self.WriteData, [byteBuffer]))
+            self.SendRequest(self.WriteData, [byteBuffer])
 
     def SendCommand(self, byteBuffer, bypass_queue: bool = False):
-        # If no queue for async requests, or if asked explicitly to do the request sequentially: do request now
-        if not self.update_queue or bypass_queue:
+        # If asked explicitly to do the request sequentially: do request now
+        if bypass_queue:
             self.WriteData(byteBuffer)
         else:
-            # Lock queue mutex then queue the request
-            with self.update_queue_mutex:
-                self.update_queue.put((self.WriteData, [byteBuffer]))
+            self.SendRequest(self.WriteData, [byteBuffer])
 
     def InitializeComm(self,use_compress:int = 0):
         byteBuffer = bytearray(2)
@@ -148,6 +144,7 @@ class LcdCommWeActA(LcdComm):
         byteBuffer[10] = line[1]
         byteBuffer[11] = Command.CMD_END
         self.SendCommand(byteBuffer)
+        self.invalidate_shadow()
 
     def ScreenOff(self):
         self.SetBrightness(0)
@@ -254,7 +251,8 @@ class LcdCommWeActA(LcdComm):
 
         line_to_send_size = self.get_width() * 4
 
-        rgb565le = serialize.image_to_RGB565(image,'little')
+        buffer = self.buffer_pool.acquire(image.size[0] * image.size[1] * 2)
+        rgb565le = serialize.image_to_RGB565(image, 'little', out=buffer)
 
         # if self.support_fastlz:
         #     chunk_size = line_to_send_size
@@ -269,8 +267,9 @@ class LcdCommWeActA(LcdComm):
         #             chunk_with_header = struct.pack("<HH", len(chunk), len(compressed_chunk[4:])) + compressed_chunk[4:]
         #             self.SendLine(chunk_with_header)
         # else:
-        # Lock queue mutex then queue all the requests for the image data
-        with self.update_queue_mutex:
+        # Queue the bitmap command and all the image data as a single transaction
+        with self.Transaction(region=(x, y, image_width, image_height)):
             self.SendLine(byteBuffer)
             for chunk in serialize.chunked(rgb565le,line_to_send_size):
                 self.SendLine(chunk)
+            self.ReleaseBuffer(buffer)
@@ -107,7 +107,7 @@ class LcdSimulated(LcdComm):
     def SetOrientation(self, orientation: Orientation = Orientation.PORTRAIT):
         self.orientation = orientation
         # Just draw the screen again with the new width/height based on orientation
-        with self.update_queue_mutex:
+        with self.Transaction():
             self.screen_image = Image.new("RGB", (self.get_width(), self.get_height()), (255, 255, 255))
             self.screen_image.save("tmp", "PNG")
             shutil.copyfile("tmp", SCREENSHOT_FILE)
@@ -139,7 +139,7 @@ class LcdSimulated(LcdComm):
         assert image_height > 0, 'Image height must be > 0'
         assert image_width > 0, 'Image width must be > 0'
 
-        with self.update_queue_mutex:
+        with self.Transaction():
             self.screen_image.paste(image, (x, y))
             self.screen_image.save("tmp", "PNG")
             shutil.copyfile("tmp", SCREENSHOT_FILE)
@@ -0,0 +1,72 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file keeps the rasterized line of a scrolling line graph between updates: when a value is added to the graph,
+# the line is shifted to the left and only the new segment is drawn, instead of drawing the whole line again
+
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+Point = Tuple[float, float]
+
+
+class ScrollingPlot:
+    def __init__(self, width: int, height: int, step: float, line_width: int, scale: Tuple[float, float]):
+        self.width = width
+        self.height = height
+        self.step = step  # Horizontal distance between points
+        self.line_width = line_width
+        self.scale = scale  # (min, max) values used to compute the points
+
+        # Pixels of the line (0 or 255) and points it has been drawn from
+        self.mask = Image.new('L', (width, height))
+        self.points: List[Point] = []
+
+    def is_compatible(self, step: float, line_width: int, scale: Tuple[float, float]) -> bool:
+        # Points computed with another scale have all moved: the line must be drawn again from scratch
+        return step == self.step and line_width == self.line_width and scale == self.scale
+
+    def update(self, points: List[Point]):
+        old_points = self.points
+        self.points = points
+        if points == old_points:
+            return
+
+        draw = ImageDraw.Draw(self.mask)
+        if len(old_points) > 0 and points[:-1] == old_points:
+            # History is not full yet: points do not move, only the new segment is added
+            draw.line(points[-2:], fill=255, width=self.line_width)
+        elif len(old_points) > 1 and len(points) == len(old_points) and float(self.step).is_integer() \
+                and [y for _, y in points[:-1]] == [y for _, y in old_points[1:]]:
+            self._shift(int(self.step))
+            draw = ImageDraw.Draw(self.mask)
+            draw.line(points[-2:], fill=255, width=self.line_width)
+        else:
+            self.mask = Image.new('L', (self.width, self.height))
+            ImageDraw.Draw(self.mask).line(points, fill=255, width=self.line_width)
+
+    def _shift(self, shift: int):
+        # Shift the line to the left: the oldest segment goes out of the graph
+        pixels = np.zeros((self.height, self.width), dtype=np.uint8)
+        pixels[:, :self.width - shift] = np.asarray(self.mask)[:, shift:]
+
+        # What is left of the oldest segment after the shift overlaps the beginning of the first segments: clear the
+        # first columns and draw these segments again
+        cleared = min(self.line_width + 1, self.width)
+        pixels[:, :cleared] = 0
+        self.mask = Image.fromarray(pixels)
+
+        # Pixels of the last segments that were clipped by the right edge before the shift are now inside the graph:
+        # draw these segments again too. Drawing a segment again does not change the pixels already drawn
+        margin = self.width - shift - 2 * (self.line_width + 1)
+        draw = ImageDraw.Draw(self.mask)
+        for start, end in zip(self.points[:-2], self.points[1:-1]):
+            if start[0] <= cleared + self.line_width or end[0] >= margin:
+                draw.line([start, end], fill=255, width=self.line_width)
+
+    def draw_on(self, image: Image.Image, color: Tuple[int, int, int]) -> Image.Image:
+        # Get the image with the line drawn on it with the given color
+        pixels = np.array(image.convert('RGBA'))
+        pixels[np.asarray(self.mask) != 0] = (*color[:3], 255)
+        return Image.fromarray(pixels)
@@ -1,16 +1,107 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
-from typing import Iterator, Literal
+import threading
+from typing import Iterator, List, Literal, Optional, Union
 
 import numpy as np
 from PIL import Image
 
-
-def chunked(data: bytes, chunk_size: int) -> Iterator[bytes]:
-    for i in range(0, len(data), chunk_size):
-        yield data[i: i + chunk_size]
-
-
-def image_to_RGB565(image: Image.Image, endianness: Literal["big", "little"]) -> bytes:
+# Serialization functions below return a new bytes object by default. If an "out" buffer is provided (e.g. from a
+# BufferPool), the data is directly written in it and a memoryview on the written part of the buffer is returned
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class BufferPool:
+    # Reusable buffers for serialized bitmaps: a full frame can weigh several MB (3.7 MB of BGRA for a 8.8" screen),
+    # allocating new buffers for every bitmap puts a lot of pressure on the memory allocator.
+    # A buffer must be released only once its content has been written to the serial port.
+
+    def __init__(self, max_free_buffers: int = 4):
+        self.max_free_buffers = max_free_buffers
+        self.free_buffers: List[bytearray] = []
+        self.mutex = threading.Lock()
+
+    def acquire(self, size: int) -> memoryview:
+        with self.mutex:
+            # Use the smallest free buffer that is big enough
+            # (buffers are compared by identity, not by content)
+            candidates = [i for i, b in enumerate(self.free_buffers) if len(b) >= size]
+            if candidates:
+                buffer = self.free_buffers.pop(min(candidates, key=lambda i: len(self.free_buffers[i])))
+                return memoryview(buffer)[:size]
+        return memoryview(bytearray(size))
+
+    def release(self, view: memoryview):
+        with self.mutex:
+            if any(b is view.obj for b in self.free_buffers):
+                return
+            self.free_buffers.append(view.obj)
+            if len(self.free_buffers) > self.max_free_buffers:
+                # Keep the biggest buffers: they are the most expensive to allocate
+                smallest = min(range(len(self.free_buffers)), key=lambda i: len(self.free_buffers[i]))
+                self.free_buffers.pop(smallest)
+
+
+def chunked(data: Buffer, chunk_size: int) -> Iterator[memoryview]:
+    # Chunks are views on the data: nothing is copied
+    view = memoryview(data)
+    for i in range(0, len(view), chunk_size):
+        yield view[i: i + chunk_size]
+
+
+def _address(view: memoryview) -> int:
+    return np.frombuffer(view, dtype=np.uint8).__array_interface__["data"][0]
+
+
+def merge_views(first: Buffer, second: Buffer) -> Optional[memoryview]:
+    # View on both buffers if second directly follows first in the same underlying buffer (e.g. consecutive chunks),
+    # None otherwise. Nothing is copied
+    if not isinstance(first, memoryview) or not isinstance(second, memoryview) or first.obj is not second.obj \
+            or not first.nbytes or not second.nbytes:
+        return None
+    try:
+        whole = memoryview(first.obj).cast("B")
+    except TypeError:
+        # Underlying buffer is not contiguous
+        return None
+    start = _address(first) - _address(whole)
+    if _address(second) != _address(first) + first.nbytes:
+        return None
+    return whole[start:start + first.nbytes + second.nbytes]
+
+
+def joined_chunks_size(data_size: int, chunk_size: int, header_size: int = 0, separator_size: int = 0) -> int:
+    chunks = -(-data_size // chunk_size)
+    return data_size + chunks * header_size + max(chunks - 1, 0) * separator_size
+
+
+def join_chunks(data: Buffer, chunk_size: int, out: Union[bytearray, memoryview], header: bytes = b"",
+                separator: bytes = b"") -> memoryview:
+    # Same as separator.join(header + chunk for chunk in chunked(data, chunk_size)), written in the out buffer
+    size = joined_chunks_size(len(data), chunk_size, len(header), len(separator))
+    record_size = len(header) + chunk_size + len(separator)
+    full_chunks, remainder = divmod(len(data), chunk_size)
+    if remainder == 0 and full_chunks > 0:
+        # Last chunk has no separator: handle it like a partial chunk
+        full_chunks, remainder = full_chunks - 1, chunk_size
+
+    src = np.frombuffer(data, dtype=np.uint8)
+    dst = np.frombuffer(out, dtype=np.uint8, count=size)
+
+    records = dst[:full_chunks * record_size].reshape(full_chunks, record_size)
+    records[:, :len(header)] = np.frombuffer(header, dtype=np.uint8)
+    records[:, len(header):len(header) + chunk_size] = src[:full_chunks * chunk_size].reshape(full_chunks, chunk_size)
+    records[:, len(header) + chunk_size:] = np.frombuffer(separator, dtype=np.uint8)
+
+    if remainder:
+        last = dst[full_chunks * record_size:]
+        last[:len(header)] = np.frombuffer(header, dtype=np.uint8)
+        last[len(header):] = src[full_chunks * chunk_size:]
+
+    return memoryview(out)[:size]
+
+
+def image_to_RGB565(image: Image.Image, endianness: Literal["big", "little"],
+                    out: Optional[Union[bytearray, memoryview]] = None) -> Buffer:
     if image.mode not in ["RGB", "RGBA"]:
         # we need the first 3 channels to be R, G and B
         image = image.convert("RGB")
@@ -37,38 +128,56 @@ def image_to_RGB565(image: Image.Image, endianness: Literal["big", "little"]) ->
         typ = ">u2"
     else:
         typ = "<u2"
-    return rgb565.astype(typ).tobytes()
 
+    if out is None:
+        return rgb565.astype(typ).tobytes()
+    np.frombuffer(out, dtype=typ, count=rgb565.size)[:] = rgb565
+    return memoryview(out)[:rgb565.nbytes]
 
-def image_to_BGR(image: Image.Image) -> (bytes, int):
+
+def image_to_BGR(image: Image.Image, out: Optional[Union[bytearray, memoryview]] = None) -> (Buffer, int):
     if image.mode not in ["RGB", "RGBA"]:
         # we need the first 3 channels to be R, G and B
         image = image.convert("RGB")
     rgb = np.asarray(image)
-    # same as rgb[:, :, [2, 1, 0]] but faster
-    bgr = np.take(rgb, (2, 1, 0), axis=-1)
-    return bgr.tobytes(), 3
+    if out is None:
+        # same as rgb[:, :, [2, 1, 0]] but faster
+        return np.take(rgb, (2, 1, 0), axis=-1).tobytes(), 3
+    bgr = np.frombuffer(out, dtype=np.uint8, count=rgb.shape[0] * rgb.shape[1] * 3).reshape(rgb.shape[:2] + (3,))
+    np.take(rgb, (2, 1, 0), axis=-1, out=bgr)
+    return memoryview(out)[:bgr.nbytes], 3
+
+
+def image_to_BGRA(image: Image.Image, out: Optional[Union[bytearray, memoryview]] = None) -> (Buffer, int):
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    rgba = np.asarray(image)
+    if out is None:
+        # same as rgba[:, :, [2, 1, 0, 3]] but faster
+        return np.take(rgba, (2, 1, 0, 3), axis=-1).tobytes(), 4
+    bgra = np.frombuffer(out, dtype=np.uint8, count=rgba.size).reshape(rgba.shape)
+    np.take(rgba, (2, 1, 0, 3), axis=-1, out=bgra)
+    return memoryview(out)[:bgra.nbytes], 4
 
 
-def image_to_BGRA(image: Image.Image) -> (bytes, int):
+def image_to_compressed_BGRA(image: Image.Image, out: Optional[Union[bytearray, memoryview]] = None) -> (Buffer, int):
     if image.mode != "RGBA":
         image = image.convert("RGBA")
     rgba = np.asarray(image)
-    # same as rgba[:, :, [2, 1, 0, 3]] but faster
-    bgra = np.take(rgba, (2, 1, 0, 3), axis=-1)
-    return bgra.tobytes(), 4
-
-
-# FIXME: to optimize like other functions above
-def image_to_compressed_BGRA(image: Image.Image) -> (bytes, int):
-    compressed_bgra = bytearray()
-    image_data = image.convert("RGBA").load()
-    for h in range(image.height):
-        for w in range(image.width):
-            # r = pixel[0], g = pixel[1], b = pixel[2], a = pixel[3]
-            pixel = image_data[w, h]
-            a = pixel[3] >> 4
-            compressed_bgra.append(pixel[2] & 0xFC | a >> 2)
-            compressed_bgra.append(pixel[1] & 0xFC | a & 2)
-            compressed_bgra.append(pixel[0])
-    return bytes(compressed_bgra), 3
+
+    # keep the 4 most significant bits of alpha channel
+    a = rgba[:, :, 3] >> 4
+
+    # BGRA on 3 bytes: [6-bit B + 2-bit A, 6-bit G + 2-bit A, 8-bit R]
+    shape = rgba.shape[:2] + (3,)
+    if out is None:
+        compressed_bgra = np.empty(shape, dtype=np.uint8)
+    else:
+        compressed_bgra = np.frombuffer(out, dtype=np.uint8, count=shape[0] * shape[1] * 3).reshape(shape)
+    np.bitwise_or(rgba[:, :, 2] & 0xFC, a >> 2, out=compressed_bgra[:, :, 0])
+    np.bitwise_or(rgba[:, :, 1] & 0xFC, a & 2, out=compressed_bgra[:, :, 1])
+    compressed_bgra[:, :, 2] = rgba[:, :, 0]
+
+    if out is None:
+        return compressed_bgra.tobytes(), 3
+    return memoryview(out)[:compressed_bgra.nbytes], 3
@@ -0,0 +1,107 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file contains the queue of serial requests to send to the screen: (function, args) tuples executed in order by
+# a single transport worker
+
+import queue
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Screen area updated by a request: (x, y, width, height)
+Region = Tuple[int, int, int, int]
+
+
+def region_contains(region: Region, other: Region) -> bool:
+    x, y, width, height = region
+    other_x, other_y, other_width, other_height = other
+    return x <= other_x and y <= other_y and other_x + other_width <= x + width and \
+        other_y + other_height <= y + height
+
+
+class QueueStats:
+    # Statistics on queued requests, to check that the transport worker keeps up with the requests
+    def __init__(self):
+        self.requests = 0  # Requests taken out of the queue
+        self.batches = 0  # Times the queue has been drained
+        self.max_depth = 0  # Max. number of pending requests
+        self.total_wait = 0.0  # Total time spent in queue by requests (s)
+        self.max_wait = 0.0  # Max. time spent in queue by a request (s)
+        self.superseded = 0  # Region updates replaced by a newer update before being sent
+
+    def average_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+    def __str__(self):
+        return f"{self.requests} requests in {self.batches} batches, {self.superseded} superseded, " \
+               f"max. depth {self.max_depth}, " \
+               f"time in queue avg. {self.average_wait() * 1000:.1f}ms / max. {self.max_wait * 1000:.1f}ms"
+
+
+class UpdateQueue(queue.Queue):
+    # A FIFO queue that records the time spent in queue by requests, and can be drained in batches.
+    # Requests updating a screen region can be queued with put_region_update(): when the display cannot keep up, pending
+    # updates of this region are dropped so that only the latest one is sent (last write wins)
+
+    def __init__(self):
+        queue.Queue.__init__(self)
+        self.stats = QueueStats()
+        # Called when a request is queued, in addition to waking up threads waiting in get()/get_batch()
+        self.wakeup: Optional[Callable[[], None]] = None
+
+    def put_region_update(self, item, region: Region, superseded_item=(None, None)):
+        # Same as put(), for a request that updates the given region of the screen.
+        # superseded_item is run instead of the request if it is superseded: it must not update the screen
+        with self.not_full:
+            # Drop pending updates entirely covered by the new one: all their pixels would be overwritten anyway.
+            # Other requests (commands, reads...) act as barriers: updates queued before them are always sent
+            for i in reversed(range(len(self.queue))):
+                queued_time, _, pending_region, pending_superseded_item = self.queue[i]
+                if pending_region is None:
+                    break
+                if pending_superseded_item and region_contains(region, pending_region):
+                    # Keep the replacement request in place, the worker still has to mark the request as done
+                    self.queue[i] = (queued_time, pending_superseded_item, pending_region, None)
+                    self.stats.superseded += 1
+
+            self._put(item, region, superseded_item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def run_batch(self, batch: List[Tuple]):
+        # Execute requests taken out of the queue, in order, and mark them as done
+        for f, args in batch:
+            if f:
+                f(*args)
+            self.task_done()
+
+    def pending_regions(self) -> List[Region]:
+        # Regions of the updates waiting in the queue
+        with self.mutex:
+            return [region for _, _, region, superseded_item in self.queue if region is not None and superseded_item]
+
+    # Internal methods below are called by queue.Queue with its mutex locked
+
+    def _put(self, item, region: Optional[Region] = None, superseded_item=None):
+        self.queue.append((time.monotonic(), item, region, superseded_item))
+        self.stats.max_depth = max(self.stats.max_depth, len(self.queue))
+        if self.wakeup:
+            self.wakeup()
+
+    def _get(self):
+        queued_time, item, _, _ = self.queue.popleft()
+        wait = time.monotonic() - queued_time
+        self.stats.requests += 1
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+        return item
+
+    def get_batch(self, timeout=None) -> List[Tuple]:
+        # Wait for requests to be queued and return all of them. Returns an empty list if the timeout expired
+        with self.not_empty:
+            if not self._qsize():
+                self.not_empty.wait_for(self._qsize, timeout)
+            batch = [self._get() for _ in range(self._qsize())]
+            if batch:
+                self.stats.batches += 1
+                self.not_full.notify_all()
+            return batch
@@ -0,0 +1,200 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# This file runs periodic tasks (stats refreshes) at fixed times: a single thread keeps the next run time (deadline) of
+# each task in a heap and hands tasks to a small pool of worker threads when they are due.
+# Deadlines are absolute times on a monotonic clock, so that periods do not drift by the time tasks take to run.
+# The next deadline of a task is set when its run is finished: runs that are due while the previous run is not finished
+# (overrun), or while the computer was sleeping or overloaded, are skipped instead of being run in a burst.
+# Adaptive tasks are run less often while their runs do not change the display (see Job.adapt)
+
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from library.log import logger
+
+# Number of threads running the tasks: tasks are mostly waiting for sensors or for the display, a few threads are enough
+WORKERS = 4
+
+# First runs of the tasks are spread over this time (s), so that tasks with the same interval do not all run at once
+STAGGER_WINDOW = 1.0
+
+# Phases of the tasks are taken from a low-discrepancy sequence: they stay evenly spread whatever the number of tasks
+GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+
+class Job:
+    # Action of a job returns True if its run has changed the display, False if not, None if unknown
+    def __init__(self, name: str, interval: float, action: Callable[[], Optional[bool]], deadline: float,
+                 max_interval: float = 0):
+        self.name = name
+        self.base_interval = interval  # Time between two runs (s)
+        self.interval = interval  # Current time between two runs, longer than base_interval for stretched jobs
+        # Adaptive jobs are stretched up to this multiple of their interval (1 for fixed jobs)
+        self.max_stretch = max(int(max_interval // interval), 1)
+        self.action = action
+        self.deadline = deadline  # Time of the next run, on the scheduler clock
+        self.running = False  # Handed to the workers and not finished yet
+
+        self.runs = 0
+        self.skipped = 0  # Runs not done: previous run not finished yet, or scheduler late
+        self.overruns = 0  # Runs that took longer than the interval
+        self.avoided = 0  # Runs not done because the job was stretched
+        self.warned = False
+
+    def advance(self, now: float):
+        # Set the next deadline, on the same time grid. Deadlines already passed are skipped
+        missed = math.floor((now - self.deadline) / self.interval)
+        self.skipped += missed
+        self.deadline += (missed + 1) * self.interval
+        self.avoided += round(self.interval / self.base_interval) - 1
+
+    def finished(self, duration: float, changed: Optional[bool] = None):
+        self.running = False
+        self.runs += 1
+        if duration > self.interval:
+            self.overruns += 1
+            self.warn_overrun()
+        self.adapt(changed)
+
+    def adapt(self, changed: Optional[bool]):
+        # Adaptive jobs: the interval is doubled (up to the max. interval) after each run that has not changed the
+        # display, as sensor values stayed within the precision they are displayed with. It is back to the base
+        # interval after a run that has changed the display. Intervals stay multiple of the base interval, so that
+        # runs stay on the same time grid
+        if self.max_stretch == 1 or changed is None:
+            return
+        stretch = 1 if changed else min(2 * round(self.interval / self.base_interval), self.max_stretch)
+        self.interval = stretch * self.base_interval
+
+    def warn_overrun(self):
+        if not self.warned:
+            logger.warning("Task %s takes longer than its %gs interval, some of its refreshes are skipped"
+                           % (self.name, self.interval))
+            self.warned = True
+
+
+def stagger(index: int, interval: float, window: float = STAGGER_WINDOW) -> float:
+    # Delay of the first run of the index-th task
+    return (index * GOLDEN_RATIO) % 1.0 * min(interval, window)
+
+
+class PeriodicScheduler:
+    def __init__(self, workers: int = WORKERS, clock: Callable[[], float] = time.monotonic,
+                 stagger_window: float = STAGGER_WINDOW):
+        self.clock = clock
+        self.stagger_window = stagger_window
+        self.workers = workers
+        # Jobs to run now, taken by the worker threads. Workers are started when the first job is due
+        self.ready: queue.Queue = queue.Queue()
+        self.worker_threads: List[threading.Thread] = []
+
+        self.jobs: Dict[str, Job] = {}
+        # Jobs by deadline. The counter orders jobs with the same deadline by insertion order
+        self.heap: List[Tuple[float, int, Job]] = []
+        self.counter = itertools.count()
+
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+
+        # Condition to protect jobs, and to wake up the scheduler thread when a job is added or when stopping
+        self.condition = threading.Condition()
+
+    def add(self, name: str, interval: float, action: Callable[[], Optional[bool]], max_interval: float = 0) -> Job:
+        # Run action every interval seconds, from now on (once the scheduler is started).
+        # If max_interval is set, the job is adaptive: it is run less often while it does not change the display
+        with self.condition:
+            job = Job(name, interval, action, self.clock() + stagger(len(self.jobs), interval, self.stagger_window),
+                      max_interval)
+            self.jobs[name] = job
+            heapq.heappush(self.heap, (job.deadline, next(self.counter), job))
+            self.condition.notify()
+        return job
+
+    def start(self):
+        # Start the scheduler thread, if not started yet
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="Scheduler")
+                self.thread.start()
+
+    def run_pending(self) -> Optional[float]:
+        # Hand the jobs that are due to the workers. Returns the time until the next deadline, None if there is no job
+        with self.condition:
+            return self._run_pending()
+
+    def stop(self):
+        # Stop running jobs. Runs in progress are not interrupted, then the workers stop
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+            for _ in self.worker_threads:
+                self.ready.put(None)
+
+    def _run(self):
+        with self.condition:
+            while not self.stopping:
+                delay = self._run_pending()
+                self.condition.wait(delay)
+
+    def _work(self):
+        # Worker thread: run the jobs handed by the scheduler thread, until the scheduler is stopped
+        while True:
+            job = self.ready.get()
+            try:
+                if job is None:
+                    return
+                self._execute(job)
+            finally:
+                self.ready.task_done()
+
+    def _execute(self, job: Job):
+        start = self.clock()
+        changed = None
+        try:
+            changed = job.action()
+        except Exception:
+            # The task is run again at its next deadline, like if this run was skipped
+            logger.exception("Task %s failed" % job.name)
+        finally:
+            now = self.clock()
+            with self.condition:
+                job.finished(now - start, changed)
+                job.advance(now)
+                heapq.heappush(self.heap, (job.deadline, next(self.counter), job))
+                self.condition.notify()
+
+    # Internal methods below are called with the condition locked
+
+    def _run_pending(self) -> Optional[float]:
+        now = self.clock()
+        while self.heap and not self.stopping:
+            deadline, _, job = self.heap[0]
+            if deadline > now:
+                return deadline - now
+            # The job is back in the heap when its run is finished
+            heapq.heappop(self.heap)
+            job.running = True
+            if not self.worker_threads:
+                self._start_workers()
+            self.ready.put(job)
+        return None
+
+    def _start_workers(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name="Periodic_%d" % index)
+            thread.start()
+            self.worker_threads.append(thread)
+
+    def __str__(self):
+        with self.condition:
+            return f"{len(self.jobs)} tasks on {self.workers} threads, {jobs_summary(self.jobs.values())}"
+
+
+def jobs_summary(jobs) -> str:
+    return f"{sum(job.runs for job in jobs)} runs, {sum(job.skipped for job in jobs)} skipped, " \
+           f"{sum(job.overruns for job in jobs)} overruns, {sum(job.avoided for job in jobs)} avoided by adaptive intervals"
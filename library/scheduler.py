@@ -20,17 +20,29 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import sched
 import threading
-import time
 from datetime import timedelta
 from functools import wraps
 
 import library.config as config
+import library.sensors.snapshot as snapshot
 import library.stats as stats
+from library.display import display
+from library.async_runtime import AsyncRuntime
+from library.log import logger
+from library.periodic import PeriodicScheduler
 
 STOPPING = False
 
+# Periodic tasks are run by a single scheduler on a small pool of threads, or by a single asyncio event loop that also
+# sends requests to the display
+RUNTIME = config.CONFIG_DATA["config"].get("RUNTIME", "THREADS")
+jobs = AsyncRuntime() if RUNTIME == "ASYNCIO" else PeriodicScheduler()
+
+# Adaptive intervals: tasks whose refresh does not change the display are refreshed less often, down to once every
+# ADAPTIVE_MAX_INTERVAL seconds. 0 to always refresh tasks at their theme interval
+ADAPTIVE_MAX_INTERVAL = config.CONFIG_DATA["config"].get("ADAPTIVE_MAX_INTERVAL", 0)
+
 
 def async_job(threadname=None):
     """ wrapper to handle asynchronous threads """
@@ -50,156 +62,196 @@ def async_job(threadname=None):
     return decorator
 
 
-def schedule(interval):
-    """ wrapper to schedule asynchronous threads """
+def schedule(interval, priority=0, fetch=None, show=None, adaptive=True):
+    """ wrapper to schedule periodic tasks """
+    # With the asyncio runtime, tasks doing network requests give a fetch coroutine getting their data with async I/O,
+    # and a show function displaying this data, instead of running the task in a worker thread while it waits.
+    # Tasks displaying values that change with time rather than with the system activity (date, uptime) are not adaptive
 
     def decorator(func):
         """ Decorator to extend periodic """
 
-        def periodic(scheduler, periodic_interval, action, actionargs=()):
-            """ Wrap the scheduler with our periodic interval """
-            if not STOPPING:
-                # If the program is not stopping: re-schedule the task for future execution
-                scheduler.enter(periodic_interval, 1, periodic,
-                                (scheduler, periodic_interval, action, actionargs))
-            action(*actionargs)
+        def periodic(*data):
+            """ Run the task once, called by the scheduler at each interval. Returns True if the display has changed """
+            # Skip this refresh if the display link is overloaded and widgets with a higher priority need the bandwidth
+            if not display.lcd.governor.allow(func.__name__):
+                return None
+            # Areas changed by the task are sent to the display together when it is done.
+            # Sensors are read from a snapshot taken during the task, each OS query is done once
+            drawn = stats.widgets_drawn()
+            with display.lcd.Frame(task=func.__name__), snapshot.tick():
+                if data:
+                    show(*data)
+                else:
+                    func()
+            return stats.widgets_drawn() != drawn
 
         @wraps(func)
-        def wrap(
-                *args,
-                **kwargs
-        ):
-            """ Wrapper to create our schedule and run it at the appropriate time """
+        def wrap():
+            """ Add the task to the scheduler: it runs at the appropriate time from now on """
             if interval == 0:
                 return
-            scheduler = sched.scheduler(time.time, time.sleep)
-            periodic(scheduler, interval, func)
-            scheduler.run()
+            display.lcd.governor.register(func.__name__, interval, priority)
+            max_interval = ADAPTIVE_MAX_INTERVAL if adaptive else 0
+            if fetch is not None and isinstance(jobs, AsyncRuntime):
+                jobs.add(func.__name__, interval, periodic, fetch, max_interval=max_interval)
+            else:
+                jobs.add(func.__name__, interval, periodic, max_interval=max_interval)
+            jobs.start()
 
         return wrap
 
     return decorator
 
 
-@async_job("CPU_Percentage")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['PERCENTAGE'].get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['PERCENTAGE'].get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS']['CPU']['PERCENTAGE'].get("PRIORITY", 0))
 def CPUPercentage():
     """ Refresh the CPU Percentage """
     # logger.debug("Refresh CPU Percentage")
     stats.CPU.percentage()
 
 
-@async_job("CPU_Frequency")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['FREQUENCY'].get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['CORES'].get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS']['CPU']['CORES'].get("PRIORITY", 0))
+def CPUCores():
+    """ Refresh the CPU cores stats """
+    # logger.debug("Refresh CPU cores stats")
+    stats.CPU.cores()
+
+
+@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['FREQUENCY'].get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS']['CPU']['FREQUENCY'].get("PRIORITY", 0))
 def CPUFrequency():
     """ Refresh the CPU Frequency """
     # logger.debug("Refresh CPU Frequency")
     stats.CPU.frequency()
 
 
-@async_job("CPU_Load")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['LOAD'].get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['LOAD'].get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS']['CPU']['LOAD'].get("PRIORITY", 0))
 def CPULoad():
     """ Refresh the CPU Load """
     # logger.debug("Refresh CPU Load")
     stats.CPU.load()
 
 
-@async_job("CPU_Load")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['TEMPERATURE'].get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['TEMPERATURE'].get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS']['CPU']['TEMPERATURE'].get("PRIORITY", 0))
 def CPUTemperature():
     """ Refresh the CPU Temperature """
     # logger.debug("Refresh CPU Temperature")
     stats.CPU.temperature()
 
 
-@async_job("CPU_FanSpeed")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['FAN_SPEED'].get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS']['CPU']['FAN_SPEED'].get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS']['CPU']['FAN_SPEED'].get("PRIORITY", 0))
 def CPUFanSpeed():
     """ Refresh the CPU Fan Speed """
     # logger.debug("Refresh CPU Fan Speed")
     stats.CPU.fan_speed()
 
 
-@async_job("GPU_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('GPU', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('GPU', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('GPU', {}).get("PRIORITY", 0))
 def GpuStats():
     """ Refresh the GPU Stats """
     # logger.debug("Refresh GPU Stats")
     stats.Gpu.stats()
 
 
-@async_job("Memory_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('MEMORY', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('MEMORY', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('MEMORY', {}).get("PRIORITY", 0))
 def MemoryStats():
     # logger.debug("Refresh memory stats")
     stats.Memory.stats()
 
 
-@async_job("Disk_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('DISK', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('DISK', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('DISK', {}).get("PRIORITY", 0))
 def DiskStats():
     # logger.debug("Refresh disk stats")
     stats.Disk.stats()
 
 
-@async_job("Net_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('NET', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('NET', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('NET', {}).get("PRIORITY", 0))
 def NetStats():
     # logger.debug("Refresh net stats")
     stats.Net.stats()
 
 
-@async_job("Date_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('DATE', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('DATE', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('DATE', {}).get("PRIORITY", 0), adaptive=False)
 def DateStats():
     # logger.debug("Refresh date stats")
     stats.Date.stats()
 
 
-@async_job("SystemUptime_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('UPTIME', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('UPTIME', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('UPTIME', {}).get("PRIORITY", 0), adaptive=False)
 def SystemUptimeStats():
     # logger.debug("Refresh system uptime stats")
     stats.SystemUptime.stats()
 
 
-@async_job("Custom_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('CUSTOM', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('CUSTOM', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('CUSTOM', {}).get("PRIORITY", 0))
 def CustomStats():
     # print("Refresh custom stats")
     stats.Custom.stats()
 
 
-@async_job("Weather_Stats")
-@schedule(timedelta(seconds=max(300.0, config.THEME_DATA['STATS'].get('WEATHER', {}).get("INTERVAL", 0))).total_seconds())
+@schedule(timedelta(seconds=max(300.0, config.THEME_DATA['STATS'].get('WEATHER', {}).get("INTERVAL", 0))).total_seconds(),
+          config.THEME_DATA['STATS'].get('WEATHER', {}).get("PRIORITY", 0),
+          fetch=stats.Weather.fetch_async, show=stats.Weather.display)
 def WeatherStats():
     # logger.debug("Refresh Weather data")
     stats.Weather.stats()
 
 
-@async_job("Ping_Stats")
-@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('PING', {}).get("INTERVAL", 0)).total_seconds())
+@schedule(timedelta(seconds=config.THEME_DATA['STATS'].get('PING', {}).get("INTERVAL", 0)).total_seconds(),
+          config.THEME_DATA['STATS'].get('PING', {}).get("PRIORITY", 0),
+          fetch=stats.Ping.fetch_async, show=stats.Ping.display)
 def PingStats():
     # logger.debug("Refresh Ping data")
     stats.Ping.stats()
 
 
-@async_job("Queue_Handler")
-@schedule(timedelta(milliseconds=1).total_seconds())
 def QueueHandler():
-    # Do next action waiting in the queue
-    if STOPPING:
-        # Empty the action queue to allow program to exit cleanly
-        while not config.update_queue.empty():
-            f, args = config.update_queue.get()
-            f(*args)
+    # Start sending queued actions to the display
+    if isinstance(jobs, AsyncRuntime):
+        # Actions are executed by a task of the event loop
+        jobs.serve(config.update_queue)
+        jobs.start()
     else:
-        # Execute first action in the queue
-        f, args = config.update_queue.get()
-        if f:
-            f(*args)
+        QueueHandlerThread()
+
+
+@async_job("Queue_Handler")
+def QueueHandlerThread():
+    # Wait for actions to be queued and execute them in order, as soon as they arrive
+    while True:
+        config.update_queue.run_batch(config.update_queue.get_batch())
+
+        if STOPPING and config.update_queue.empty():
+            # The action queue has been emptied: program can exit cleanly
+            logger.debug("Update queue: %s" % config.update_queue.stats)
+            return
+
+
+def stop():
+    global STOPPING
+    STOPPING = True
+
+    # Wake up the queue handler in case it is waiting for actions. Queued before stopping the event loop, if any, so
+    # that its writer handles it before stopping
+    config.update_queue.put((None, None))
+
+    # Stop periodic tasks, runs in progress are finished. The event loop, if any, stops once the queue is empty
+    jobs.stop()
 
 
 def is_queue_empty() -> bool:
-    return config.update_queue.empty()
+    # Queue is considered empty once the last action has been executed, not just taken out of the queue
+    return config.update_queue.unfinished_tasks == 0
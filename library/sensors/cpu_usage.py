@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# turing-smart-screen-python - a Python system monitor and library for USB-C displays like Turing Smart Screen or XuanFang
+# https://github.com/mathoudebine/turing-smart-screen-python/
+#
+# Copyright (C) 2021 Matthieu Houdebine (mathoudebine)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This file computes the CPU usage without blocking: CPU times are read at each refresh, and the usage is computed
+# over the time elapsed since the previous refresh, instead of sleeping between two reads
+
+import threading
+import time
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+
+# Usage measured over a shorter time is too imprecise: the previous usage is returned instead (s)
+MIN_SAMPLE_PERIOD = 0.1
+
+Times = Union[float, np.ndarray]
+
+
+class CpuUsage:
+    # Usage of the whole CPU, or of each core if CPU times are arrays (one value per core)
+    def __init__(self, read_times: Callable[[], Tuple[Times, Times]], clock: Callable[[], float] = time.monotonic):
+        self.read_times = read_times  # Returns busy and total CPU time since boot
+        self.clock = clock
+        self.previous: Optional[Tuple[float, Times, Times]] = None  # Time of the previous sample, busy and total times
+        self.usage: Times = 0.0
+
+        # Mutex to protect samples in case multiple threads read the CPU usage
+        self.mutex = threading.Lock()
+
+    def percent(self) -> Times:
+        # CPU usage (%) since the previous call, or since boot for the first call
+        with self.mutex:
+            now = self.clock()
+            if self.previous is not None and now - self.previous[0] < MIN_SAMPLE_PERIOD:
+                return self.usage
+
+            busy, total = self.read_times()
+            busy, total = np.asarray(busy, dtype=np.float64), np.asarray(total, dtype=np.float64)
+            if self.previous is not None and np.shape(self.previous[2]) == total.shape:
+                previous_busy, previous_total = self.previous[1:]
+            else:
+                # First sample, or number of cores has changed
+                previous_busy, previous_total, self.usage = 0.0, 0.0, np.zeros(total.shape)
+            self.previous = (now, busy, total)
+
+            elapsed = total - previous_total
+            ratio = np.divide(busy - previous_busy, elapsed, out=np.zeros(total.shape), where=elapsed > 0)
+            # Rounded like psutil percentages. Usage is not updated if CPU times have not changed
+            usage = np.where(elapsed > 0, np.round(np.clip(ratio, 0.0, 1.0) * 100, 1), self.usage)
+            self.usage = float(usage) if usage.ndim == 0 else usage
+            return self.usage
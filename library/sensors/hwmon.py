@@ -0,0 +1,172 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# turing-smart-screen-python - a Python system monitor and library for USB-C displays like Turing Smart Screen or XuanFang
+# https://github.com/mathoudebine/turing-smart-screen-python/
+#
+# Copyright (C) 2021 Matthieu Houdebine (mathoudebine)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This file reads fan and temperature sensors from the Linux hwmon interface (/sys/class/hwmon).
+# Sensors are discovered once, then only their *_input files are read again: they are kept open and read with a
+# single pread, other attributes (name, label, min/max) do not change and are read only when sensors are discovered.
+# Sensors are discovered again periodically and when a sensor cannot be read anymore, in case of hotplug
+# Discovery is inspired of psutil/psutil/_pslinux.py:sensors_fans() and sensors_temperatures()
+
+import glob
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+HWMON_ROOT = "/sys/class/hwmon"
+
+# Sensors are discovered again after this time (s)
+RESCAN_INTERVAL = 60
+
+Fan = namedtuple('sfan', ['label', 'current', 'percent'])
+Temperature = namedtuple('shwtemp', ['label', 'current'])
+
+
+def read_attribute(path: str, fallback: Optional[str] = None) -> Optional[str]:
+    try:
+        with open(path, "rt") as file:
+            return file.read().strip()
+    except (IOError, OSError, UnicodeDecodeError):
+        return fallback
+
+
+class SensorInput:
+    # *_input file of a sensor, kept open to read its value again without opening the file
+    def __init__(self, base: str, unit: str, label: str):
+        self.unit = unit  # Name of the hwmon device (e.g. nct6798, coretemp)
+        self.label = label
+        self.fd = os.open(base + "_input", os.O_RDONLY)
+
+    def read(self) -> int:
+        # sysfs attributes are generated again when read from offset 0
+        return int(os.pread(self.fd, 32, 0))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FanInput(SensorInput):
+    def __init__(self, base: str, unit: str, label: str):
+        super().__init__(base, unit, label)
+        max_rpm = read_attribute(base + "_max")
+        min_rpm = read_attribute(base + "_min")
+        self.max_rpm = int(max_rpm) if max_rpm and max_rpm.isdigit() else 0
+        self.min_rpm = int(min_rpm) if min_rpm and min_rpm.isdigit() else 0  # Approximated: min fan speed is 0 RPM
+
+    def percent(self, current_rpm: int) -> int:
+        max_rpm = self.max_rpm
+        if not max_rpm:
+            # Real maximum speed not found
+            if current_rpm > 2200:
+                max_rpm = 3000  # AIO Pumps are usualy 3000 RPM
+            elif current_rpm > 1500:
+                max_rpm = 2200  # High speed fans are usualy 2200 RPM
+            else:
+                max_rpm = 1500  # Approximated: max fan speed is 1500 RPM
+        return int((current_rpm - self.min_rpm) / (max_rpm - self.min_rpm) * 100)
+
+
+class Hwmon:
+    def __init__(self, root: str = HWMON_ROOT, rescan_interval: float = RESCAN_INTERVAL):
+        self.root = root
+        self.rescan_interval = rescan_interval
+        self.fan_inputs: List[FanInput] = []
+        self.temperature_inputs: List[SensorInput] = []
+        self.scan_time: Optional[float] = None  # None when sensors must be discovered again
+
+        # Mutex to protect sensors lists, read by several periodic tasks
+        self.mutex = threading.Lock()
+
+    def fans(self) -> Dict[str, List[Fan]]:
+        # Fans speed, grouped by hwmon device name
+        fans = {}
+        for sensor, current_rpm in self._read("fan_inputs"):
+            try:
+                percent = sensor.percent(current_rpm)
+            except ZeroDivisionError:
+                continue
+            fans.setdefault(sensor.unit, []).append(Fan(sensor.label, current_rpm, percent))
+        return fans
+
+    def temperatures(self) -> Dict[str, List[Temperature]]:
+        # Temperatures (°C), grouped by hwmon device name
+        temperatures = {}
+        for sensor, value in self._read("temperature_inputs"):
+            temperatures.setdefault(sensor.unit, []).append(Temperature(sensor.label, value / 1000.0))
+        return temperatures
+
+    def scan(self):
+        # Discover sensors, and close the files of the previous ones
+        with self.mutex:
+            self._scan()
+
+    def _read(self, inputs: str) -> list:
+        # Read the values of fan_inputs or temperature_inputs. Files are not closed by another thread while read
+        with self.mutex:
+            if self.scan_time is None or time.monotonic() - self.scan_time >= self.rescan_interval:
+                self._scan()
+
+            values = []
+            for sensor in getattr(self, inputs):
+                try:
+                    values.append((sensor, sensor.read()))
+                except ValueError:
+                    # Sensor has no valid value for now
+                    continue
+                except OSError:
+                    # Device has been removed, or sensor is not readable anymore: look for sensors again next time
+                    self.scan_time = None
+            return values
+
+    # Internal methods below are called with the mutex locked
+
+    def _scan(self):
+        for sensor in self.fan_inputs + self.temperature_inputs:
+            sensor.close()
+
+        fan_bases = glob.glob(os.path.join(self.root, "hwmon*", "fan*_*"))
+        if not fan_bases:
+            # CentOS has an intermediate /device directory:
+            # https://github.com/giampaolo/psutil/issues/971
+            fan_bases = glob.glob(os.path.join(self.root, "hwmon*", "device", "fan*_*"))
+        temperature_bases = glob.glob(os.path.join(self.root, "hwmon*", "temp*_*"))
+        temperature_bases.extend(glob.glob(os.path.join(self.root, "hwmon*", "device", "temp*_*")))
+
+        self.fan_inputs = self._open(fan_bases, FanInput)
+        self.temperature_inputs = self._open(temperature_bases, SensorInput)
+        self.scan_time = time.monotonic()
+
+    @staticmethod
+    def _open(paths: List[str], sensor_class) -> list:
+        sensors = []
+        # Attributes of a sensor are named <base>_<attribute>, e.g. fan1_input
+        bases = set(os.path.join(os.path.dirname(path), os.path.basename(path).split("_")[0]) for path in paths)
+        for base in sorted(bases):
+            unit = read_attribute(os.path.join(os.path.dirname(base), "name"), fallback="")
+            label = read_attribute(base + "_label", fallback=None)
+            if label is None:
+                label = os.path.basename(base) if sensor_class is FanInput else ""
+            try:
+                sensors.append(sensor_class(base, unit, label))
+            except OSError:
+                # No *_input file for this sensor
+                continue
+        return sensors
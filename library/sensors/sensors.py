@@ -24,11 +24,13 @@
 from abc import ABC, abstractmethod
 from typing import Tuple
 
+import numpy as np
+
 
 class Cpu(ABC):
     @staticmethod
     @abstractmethod
-    def percentage(interval: float) -> float:
+    def percentage(interval: float) -> float:  # usage (%) since the previous call, without blocking for interval (s)
         pass
 
     @staticmethod
@@ -36,6 +38,16 @@ class Cpu(ABC):
     def frequency() -> float:
         pass
 
+    @staticmethod
+    @abstractmethod
+    def cores_percentage() -> np.ndarray:  # usage (%) of each core since the previous call
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def cores_frequency() -> np.ndarray:  # frequency (MHz) of each core
+        pass
+
     @staticmethod
     @abstractmethod
     def load() -> Tuple[float, float, float]:  # 1 / 5 / 15min avg (%)
@@ -30,11 +30,13 @@ from statistics import mean
 from typing import Tuple
 
 import clr  # Clr is from pythonnet package. Do not install clr package
+import numpy as np
 import psutil
 from win32api import *
 
 import library.sensors.sensors as sensors
 from library.log import logger
+from library.sensors.snapshot import query
 
 # Import LibreHardwareMonitor dll to Python
 lhm_dll = os.getcwd() + '\\external\\LibreHardwareMonitor\\LibreHardwareMonitorLib.dll'
@@ -90,6 +92,8 @@ for hardware in handle.Hardware:
         logger.info("Found Network interface: %s" % hardware.Name)
 
 
+# Hardware is updated once per refresh, even if several values are read from it (see snapshot.py)
+@query
 def get_hw_and_update(hwtype: Hardware.HardwareType, name: str = None) -> Hardware.Hardware:
     for hardware in handle.Hardware:
         if hardware.HardwareType == hwtype:
@@ -163,6 +167,7 @@ def get_gpu_name() -> str:
         return gpu_to_use
 
 
+@query
 def get_net_interface_and_update(if_name: str) -> Hardware.Hardware:
     for hardware in handle.Hardware:
         if hardware.HardwareType == Hardware.HardwareType.Network and hardware.Name == if_name:
@@ -173,6 +178,11 @@ def get_net_interface_and_update(if_name: str) -> Hardware.Hardware:
     return None
 
 
+@query
+def disk_usage(path: str):
+    return psutil.disk_usage(path)
+
+
 class Cpu(sensors.Cpu):
     @staticmethod
     def percentage(interval: float) -> float:
@@ -206,6 +216,34 @@ class Cpu(sensors.Cpu):
         # Frequencies reading is not supported on this CPU
         return math.nan
 
+    @staticmethod
+    def cores_percentage() -> np.ndarray:
+        loads = []
+        cpu = get_hw_and_update(Hardware.HardwareType.Cpu)
+        try:
+            for sensor in cpu.Sensors:
+                # One load sensor per core, or per thread of each core: "CPU Core #1 Thread #1"...
+                if sensor.SensorType == Hardware.SensorType.Load and str(sensor.Name).startswith(
+                        "CPU Core #") and sensor.Value is not None:
+                    loads.append(float(sensor.Value))
+        except:
+            pass
+        return np.array(loads)
+
+    @staticmethod
+    def cores_frequency() -> np.ndarray:
+        frequencies = []
+        cpu = get_hw_and_update(Hardware.HardwareType.Cpu)
+        try:
+            for sensor in cpu.Sensors:
+                # Keep only real core clocks, ignore effective core clocks
+                if sensor.SensorType == Hardware.SensorType.Clock and "Core #" in str(sensor.Name) and \
+                        "Effective" not in str(sensor.Name) and sensor.Value is not None:
+                    frequencies.append(float(sensor.Value))
+        except:
+            pass
+        return np.array(frequencies)
+
     @staticmethod
     def load() -> Tuple[float, float, float]:  # 1 / 5 / 15min avg (%):
         # Get this data from psutil because it is not available from LibreHardwareMonitor
@@ -454,15 +492,15 @@ class Memory(sensors.Memory):
 class Disk(sensors.Disk):
     @staticmethod
     def disk_usage_percent() -> float:
-        return psutil.disk_usage("/").percent
+        return disk_usage("/").percent
 
     @staticmethod
     def disk_used() -> int:  # In bytes
-        return psutil.disk_usage("/").used
+        return disk_usage("/").used
 
     @staticmethod
     def disk_free() -> int:  # In bytes
-        return psutil.disk_usage("/").free
+        return disk_usage("/").free
 
 
 class Net(sensors.Net):
@@ -0,0 +1,351 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# turing-smart-screen-python - a Python system monitor and library for USB-C displays like Turing Smart Screen or XuanFang
+# https://github.com/mathoudebine/turing-smart-screen-python/
+#
+# Copyright (C) 2021 Matthieu Houdebine (mathoudebine)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This file reads hardware sensors directly from Linux procfs/sysfs, without building psutil objects: files are kept
+# open and read again in the same buffer, and only the needed values are parsed. Useful on small hosts (e.g. SBC)
+# GPU stats still use Python libraries (GPUtil, pyamdgpuinfo)
+# For Linux platforms only
+
+import glob
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import library.sensors.sensors as sensors
+from library.log import logger
+from library.sensors.cpu_usage import CpuUsage
+from library.sensors.hwmon import Hwmon
+# GPU stats are read with Python libraries, like with PYTHON sensors
+from library.sensors.sensors_python import Gpu, is_cpu_fan
+from library.sensors.snapshot import query
+
+# hwmon devices of CPU temperature sensors, by order of preference: Intel, AMD, ARM, AMD with zenpower
+CPU_TEMPERATURE_SENSORS = ('coretemp', 'k10temp', 'cpu_thermal', 'zenpower')
+
+
+class ProcFile:
+    # procfs/sysfs file kept open, read again in the same buffer with a single pread
+    def __init__(self, path: str, size: int = 4096):
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buffer = bytearray(size)
+        self.length = 0
+
+    def read(self) -> "ProcFile":
+        # Content of these files is generated again when read from offset 0. Buffer grows if the content does not fit
+        self.length = os.preadv(self.fd, [self.buffer], 0)
+        while self.length == len(self.buffer):
+            self.buffer = bytearray(2 * len(self.buffer))
+            self.length = os.preadv(self.fd, [self.buffer], 0)
+        return self
+
+    def values(self, key: bytes, count: int = 1) -> List[int]:
+        # First integers of the line starting with key (leading spaces ignored), e.g. values(b"MemTotal:")
+        start = self.buffer.find(key, 0, self.length)
+        while start > 0 and self.buffer[start - 1] not in b" \n":
+            start = self.buffer.find(key, start + 1, self.length)
+        if start < 0:
+            raise KeyError(key)
+
+        end = self.buffer.find(b"\n", start, self.length)
+        return [int(value) for value in self.buffer[start + len(key):end if end >= 0 else self.length].split()[:count]]
+
+    def value(self) -> int:
+        # Content of a file holding a single integer, like sysfs attributes
+        return int(self.buffer[:self.length])
+
+
+class LinuxSystem:
+    # Reads the files of a Linux system, located under root. Another root is used for tests
+    def __init__(self, root: str = "/"):
+        self.root = root
+        self.files: Dict[str, ProcFile] = {}
+        self.cpufreq_files: Optional[List[ProcFile]] = None
+        self.hwmon = Hwmon(os.path.join(root, "sys/class/hwmon"))
+
+        self.cpu_usage = CpuUsage(self.cpu_times)
+        self.cores_usage = CpuUsage(self.cores_times)
+        # Time and network counters (bytes sent, bytes received) of the last measure of each interface
+        self.clock = time.monotonic
+        self.last_net_counters: Dict[str, Tuple[float, Tuple[int, int]]] = {}
+
+        # Mutex to protect files buffers, read by several periodic tasks
+        self.mutex = threading.Lock()
+
+    def read(self, path: str, size: int = 4096) -> ProcFile:
+        # Called with the mutex locked
+        file = self.files.get(path)
+        if file is None:
+            file = self.files[path] = ProcFile(os.path.join(self.root, path), size)
+        return file.read()
+
+    def cpu_times(self) -> Tuple[int, int]:
+        # Busy and total CPU time since boot (in USER_HZ), from the first line of /proc/stat:
+        # user nice system idle iowait irq softirq steal (guest time is already included in user time)
+        with self.mutex:
+            user, nice, kernel, idle, iowait, irq, softirq, steal = self.read("proc/stat").values(b"cpu ", 8)
+        busy = user + nice + kernel + irq + softirq + steal
+        return busy, busy + idle + iowait
+
+    def cores_times(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Busy and total CPU time of each core, from the lines following the first line of /proc/stat: cpu0, cpu1...
+        with self.mutex:
+            stat = self.read("proc/stat")
+            start = end = stat.buffer.index(b"\n", 0, stat.length) + 1
+            while stat.buffer.startswith(b"cpu", end):
+                end = stat.buffer.index(b"\n", end, stat.length) + 1
+            cores = stat.buffer.count(b"\n", start, end)
+            fields = bytes(stat.buffer[start:end]).split()
+
+        # All lines have the same number of fields: they are parsed at once into an array, one row per core
+        user, nice, kernel, idle, iowait, irq, softirq, steal = \
+            np.array(fields).reshape(cores, -1)[:, 1:9].astype(np.int64).T
+        busy = user + nice + kernel + irq + softirq + steal
+        return busy, busy + idle + iowait
+
+    def cores_frequency(self) -> np.ndarray:
+        # Current frequency of each core (MHz), from cpufreq or from /proc/cpuinfo if cpufreq is not available
+        with self.mutex:
+            if self.cpufreq_files is None:
+                paths = glob.glob(os.path.join(self.root, "sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_cur_freq"))
+                # Sorted by core number: cpu2 before cpu10
+                paths.sort(key=lambda path: int(os.path.basename(os.path.dirname(os.path.dirname(path)))[3:]))
+                self.cpufreq_files = [ProcFile(path, 32) for path in paths]
+            if self.cpufreq_files:
+                return np.array([file.read().value() for file in self.cpufreq_files]) / 1000
+
+            cpuinfo = self.read("proc/cpuinfo", 65536)
+            return np.array([float(line.split(b":")[1]) for line in cpuinfo.buffer[:cpuinfo.length].splitlines()
+                             if line.startswith(b"cpu MHz")])
+
+    def cpu_frequency(self) -> float:
+        # Average current frequency of all cores (MHz)
+        frequencies = self.cores_frequency()
+        return float(frequencies.mean()) if frequencies.size else math.nan
+
+    def load_average(self) -> Tuple[float, float, float]:
+        with self.mutex:
+            load = self.read("proc/loadavg", 128)
+            one, five, fifteen = load.buffer[:load.length].split()[:3]
+        return float(one), float(five), float(fifteen)
+
+    def memory(self) -> Tuple[int, int, int, int]:
+        # Total and available memory, total and free swap (bytes)
+        with self.mutex:
+            meminfo = self.read("proc/meminfo")
+            values = [meminfo.values(key)[0] * 1024
+                      for key in (b"MemTotal:", b"MemAvailable:", b"SwapTotal:", b"SwapFree:")]
+        return tuple(values)
+
+    def disk_usage(self, path: str) -> Tuple[int, int]:
+        # Used and free space (bytes) of a filesystem, like psutil.disk_usage(): free space is what users can use
+        stats = os.statvfs(os.path.join(self.root, path.lstrip("/")))
+        return (stats.f_blocks - stats.f_bfree) * stats.f_frsize, stats.f_bavail * stats.f_frsize
+
+    def net_counters(self, if_name: str) -> Optional[Tuple[int, int]]:
+        # Bytes sent and received by a network interface, None if it does not exist. In /proc/net/dev, interface name
+        # is followed by 8 received counters then 8 transmitted counters: bytes are the first value of each group
+        with self.mutex:
+            try:
+                counters = self.read("proc/net/dev").values(if_name.encode() + b":", 9)
+            except KeyError:
+                return None
+        return counters[8], counters[0]
+
+
+system = LinuxSystem()
+
+
+# Values used by several sensors are read once per refresh (see snapshot.py)
+@query
+def memory():
+    return system.memory()
+
+
+@query
+def disk_usage(path: str):
+    return system.disk_usage(path)
+
+
+def usage_percent(used: int, total: int) -> float:
+    # Rounded like psutil percentages
+    return round(used / total * 100, 1) if total > 0 else 0.0
+
+
+class Cpu(sensors.Cpu):
+    @staticmethod
+    def percentage(interval: float) -> float:
+        try:
+            # Usage since the previous refresh, without blocking
+            return system.cpu_usage.percent()
+        except:
+            return math.nan
+
+    @staticmethod
+    def frequency() -> float:
+        try:
+            return system.cpu_frequency()
+        except:
+            return math.nan
+
+    @staticmethod
+    def cores_percentage() -> np.ndarray:
+        try:
+            # Usage of each core since the previous refresh, from a single read of /proc/stat
+            return system.cores_usage.percent()
+        except:
+            return np.empty(0)
+
+    @staticmethod
+    def cores_frequency() -> np.ndarray:
+        try:
+            return system.cores_frequency()
+        except:
+            return np.empty(0)
+
+    @staticmethod
+    def load() -> Tuple[float, float, float]:  # 1 / 5 / 15min avg (%):
+        try:
+            return system.load_average()
+        except:
+            return math.nan, math.nan, math.nan
+
+    @staticmethod
+    def temperature() -> float:
+        try:
+            temperatures = system.hwmon.temperatures()
+            for name in CPU_TEMPERATURE_SENSORS:
+                if name in temperatures:
+                    return temperatures[name][0].current
+        except:
+            pass
+        return math.nan
+
+    @staticmethod
+    def fan_percent(fan_name: str = None) -> float:
+        try:
+            for name, entries in system.hwmon.fans().items():
+                for entry in entries:
+                    if fan_name is not None and fan_name == "%s/%s" % (name, entry.label):
+                        # Manually selected fan
+                        return entry.percent
+                    elif is_cpu_fan(entry.label) or is_cpu_fan(name):
+                        # Auto-detected fan
+                        return entry.percent
+        except:
+            pass
+
+        return math.nan
+
+
+class Memory(sensors.Memory):
+    @staticmethod
+    def swap_percent() -> float:
+        try:
+            _, _, swap_total, swap_free = memory()
+            return usage_percent(swap_total - swap_free, swap_total)
+        except:
+            return math.nan
+
+    @staticmethod
+    def virtual_percent() -> float:
+        try:
+            total, available, _, _ = memory()
+            return usage_percent(total - available, total)
+        except:
+            return math.nan
+
+    @staticmethod
+    def virtual_used() -> int:  # In bytes
+        try:
+            total, available, _, _ = memory()
+            return total - available
+        except:
+            return -1
+
+    @staticmethod
+    def virtual_free() -> int:  # In bytes
+        try:
+            _, available, _, _ = memory()
+            return available
+        except:
+            return -1
+
+
+class Disk(sensors.Disk):
+    @staticmethod
+    def disk_usage_percent() -> float:
+        try:
+            used, free = disk_usage("/")
+            return usage_percent(used, used + free)
+        except:
+            return math.nan
+
+    @staticmethod
+    def disk_used() -> int:  # In bytes
+        try:
+            return disk_usage("/")[0]
+        except:
+            return -1
+
+    @staticmethod
+    def disk_free() -> int:  # In bytes
+        try:
+            return disk_usage("/")[1]
+        except:
+            return -1
+
+
+class Net(sensors.Net):
+    @staticmethod
+    def stats(if_name, interval) -> Tuple[
+        int, int, int, int]:  # up rate (B/s), uploaded (B), dl rate (B/s), downloaded (B)
+        try:
+            upload_rate = 0
+            uploaded = 0
+            download_rate = 0
+            downloaded = 0
+
+            if if_name != "":
+                counters = system.net_counters(if_name)
+                now = system.clock()
+                if counters is not None:
+                    # Values stay at 0 until there is a previous measure for this interface. Rates are computed over
+                    # the time elapsed since this measure: it is longer than interval if refreshes were skipped or
+                    # stretched by adaptive intervals
+                    before = system.last_net_counters.get(if_name)
+                    if before is not None:
+                        before_time, (before_uploaded, before_downloaded) = before
+                        elapsed = now - before_time
+                        if elapsed <= 0:
+                            elapsed = interval
+                        uploaded, downloaded = counters
+                        upload_rate = (uploaded - before_uploaded) / elapsed
+                        download_rate = (downloaded - before_downloaded) / elapsed
+                    system.last_net_counters[if_name] = (now, counters)
+                else:
+                    logger.warning("Network interface '%s' not found. Check names in config.yaml." % if_name)
+
+            return upload_rate, uploaded, download_rate, downloaded
+        except:
+            return -1, -1, -1, -1
@@ -24,10 +24,11 @@
 import math
 import platform
 import sys
-from collections import namedtuple
+import time
 from enum import IntEnum, auto
 from typing import Tuple
 
+import numpy as np
 # Nvidia GPU
 import GPUtil
 # CPU & disk sensors
@@ -35,6 +36,9 @@ import psutil
 
 import library.sensors.sensors as sensors
 from library.log import logger
+from library.sensors.cpu_usage import CpuUsage
+from library.sensors.hwmon import Hwmon
+from library.sensors.snapshot import query
 
 # AMD GPU on Linux
 try:
@@ -49,6 +53,7 @@ except:
     pyadl = None
 
 PNIC_BEFORE = {}
+PNIC_BEFORE_TIME = {}  # Time of the measures in PNIC_BEFORE
 
 
 class GpuType(IntEnum):
@@ -59,60 +64,66 @@ class GpuType(IntEnum):
 
 DETECTED_GPU = GpuType.UNSUPPORTED
 
+# Fans and temperatures from Linux hwmon interface, discovered once and read again with a single pread per sensor
+hwmon = Hwmon()
 
-# Function inspired of psutil/psutil/_pslinux.py:sensors_fans()
-# Adapted to also get fan speed percentage instead of raw value
-def sensors_fans():
-    """Return hardware fans info (for CPU and other peripherals) as a
-    dict including hardware label and current speed.
-
-    Implementation notes:
-    - /sys/class/hwmon looks like the most recent interface to
-      retrieve this info, and this implementation relies on it
-      only (old distros will probably use something else)
-    - lm-sensors on Ubuntu 16.04 relies on /sys/class/hwmon
-    """
-    from psutil._common import bcat, cat
-    import collections, glob, os
-
-    ret = collections.defaultdict(list)
-    basenames = glob.glob('/sys/class/hwmon/hwmon*/fan*_*')
-    if not basenames:
-        # CentOS has an intermediate /device directory:
-        # https://github.com/giampaolo/psutil/issues/971
-        basenames = glob.glob('/sys/class/hwmon/hwmon*/device/fan*_*')
-
-    basenames = sorted(set([x.split('_')[0] for x in basenames]))
-    for base in basenames:
-        try:
-            current_rpm = int(bcat(base + '_input'))
 
-            try:
-                max_rpm = int(bcat(base + '_max'))
-            except:
-                max_rpm = False  # Real maximum speed not found
-            if not max_rpm:
-                if current_rpm > 2200:
-                    max_rpm = 3000  # AIO Pumps are usualy 3000 RPM
-                elif current_rpm > 1500:
-                    max_rpm = 2200  # High speed fans are usualy 2200 RPM
-                else:
-                    max_rpm = 1500  # Approximated: max fan speed is 1500 RPM
+def cpu_times(percpu: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    # Busy and total CPU time since boot, of each core if percpu, computed like psutil.cpu_percent().
+    # Guest time is already in user time
+    times = psutil.cpu_times(percpu=percpu)
+    fields = (times[0] if percpu else times)._fields
+    values = np.array(times, dtype=np.float64)
 
-            try:
-                min_rpm = int(bcat(base + '_min'))
-            except:
-                min_rpm = 0  # Approximated: min fan speed is 0 RPM
-            percent = int((current_rpm - min_rpm) / (max_rpm - min_rpm) * 100)
-        except (IOError, OSError) as err:
-            continue
-        unit_name = cat(os.path.join(os.path.dirname(base), 'name')).strip()
-        label = cat(base + '_label', fallback=os.path.basename(base)).strip()
+    def column(name):
+        return values[..., fields.index(name)] if name in fields else 0.0
+
+    total = values.sum(axis=-1) - column('guest') - column('guest_nice')
+    return total - column('idle') - column('iowait'), total
+
+
+cpu_usage = CpuUsage(cpu_times)
+cores_usage = CpuUsage(lambda: cpu_times(percpu=True))
+
+
+# OS queries, done once per refresh even if several values are derived from them (see snapshot.py)
+@query
+def virtual_memory():
+    return psutil.virtual_memory()
+
+
+@query
+def disk_usage(path: str):
+    return psutil.disk_usage(path)
+
+
+@query
+def net_io_counters():
+    return psutil.net_io_counters(pernic=True)
 
-        custom_sfan = namedtuple('sfan', ['label', 'current', 'percent'])
-        ret[unit_name].append(custom_sfan(label, current_rpm, percent))
 
-    return dict(ret)
+@query
+def sensors_temperatures():
+    # psutil walks all hwmon devices and reads all their attributes, it is only used where hwmon is not available
+    return hwmon.temperatures() or psutil.sensors_temperatures()
+
+
+@query
+def nvidia_gpus():
+    return GPUtil.getGPUs()
+
+
+@query
+def amd_gpu():
+    pyamdgpuinfo.detect_gpus()
+    return pyamdgpuinfo.get_gpu(0)
+
+
+@query
+def sensors_fans():
+    """Return hardware fans info (for CPU and other peripherals) as a
+    dict including hardware label, current speed and percentage."""
+    return hwmon.fans()
 
 
 def is_cpu_fan(label: str) -> bool:
@@ -123,7 +134,8 @@ class Cpu(sensors.Cpu):
     @staticmethod
     def percentage(interval: float) -> float:
         try:
-            return psutil.cpu_percent(interval=interval)
+            # Usage since the previous refresh: psutil.cpu_percent(interval) would block for the whole interval
+            return cpu_usage.percent()
         except:
             return math.nan
 
@@ -134,6 +146,20 @@ class Cpu(sensors.Cpu):
         except:
             return math.nan
 
+    @staticmethod
+    def cores_percentage() -> np.ndarray:
+        try:
+            return cores_usage.percent()
+        except:
+            return np.empty(0)
+
+    @staticmethod
+    def cores_frequency() -> np.ndarray:
+        try:
+            return np.array([frequency.current for frequency in psutil.cpu_freq(percpu=True)])
+        except:
+            return np.empty(0)
+
     @staticmethod
     def load() -> Tuple[float, float, float]:  # 1 / 5 / 15min avg (%):
         try:
@@ -145,7 +171,7 @@ class Cpu(sensors.Cpu):
     def temperature() -> float:
         cpu_temp = math.nan
         try:
-            sensors_temps = psutil.sensors_temperatures()
+            sensors_temps = sensors_temperatures()
             if 'coretemp' in sensors_temps:
                 # Intel CPU
                 cpu_temp = sensors_temps['coretemp'][0].current
@@ -246,16 +272,16 @@ class GpuNvidia(sensors.Gpu):
     def stats() -> Tuple[
         float, float, float, float, float]:  # load (%) / used mem (%) / used mem (Mb) / total mem (Mb) / temp (°C)
         # Unlike other sensors, Nvidia GPU with GPUtil pulls in all the stats at once
-        nvidia_gpus = GPUtil.getGPUs()
+        gpus = nvidia_gpus()
 
         try:
-            memory_used_all = [item.memoryUsed for item in nvidia_gpus]
+            memory_used_all = [item.memoryUsed for item in gpus]
             memory_used_mb = sum(memory_used_all) / len(memory_used_all)
         except:
             memory_used_mb = math.nan
 
         try:
-            memory_total_all = [item.memoryTotal for item in nvidia_gpus]
+            memory_total_all = [item.memoryTotal for item in gpus]
             memory_total_mb = sum(memory_total_all) / len(memory_total_all)
         except:
             memory_total_mb = math.nan
@@ -266,13 +292,13 @@ class GpuNvidia(sensors.Gpu):
             memory_percentage = math.nan
 
         try:
-            load_all = [item.load for item in nvidia_gpus]
+            load_all = [item.load for item in gpus]
             load = (sum(load_all) / len(load_all)) * 100
         except:
             load = math.nan
 
         try:
-            temperature_all = [item.temperature for item in nvidia_gpus]
+            temperature_all = [item.temperature for item in gpus]
             temperature = sum(temperature_all) / len(temperature_all)
         except:
             temperature = math.nan
@@ -317,18 +343,17 @@ class GpuAmd(sensors.Gpu):
         float, float, float, float, float]:  # load (%) / used mem (%) / used mem (Mb) / total mem (Mb) / temp (°C)
         if pyamdgpuinfo:
             # Unlike other sensors, AMD GPU with pyamdgpuinfo pulls in all the stats at once
-            pyamdgpuinfo.detect_gpus()
-            amd_gpu = pyamdgpuinfo.get_gpu(0)
+            gpu = amd_gpu()
 
             try:
-                memory_used_bytes = amd_gpu.query_vram_usage()
+                memory_used_bytes = gpu.query_vram_usage()
                 memory_used = memory_used_bytes / 1024 / 1024
             except:
                 memory_used_bytes = math.nan
                 memory_used = math.nan
 
             try:
-                memory_total_bytes = amd_gpu.memory_info["vram_size"]
+                memory_total_bytes = gpu.memory_info["vram_size"]
                 memory_total = memory_total_bytes / 1024 / 1024
             except:
                 memory_total_bytes = math.nan
@@ -340,26 +365,26 @@ class GpuAmd(sensors.Gpu):
                 memory_percentage = math.nan
 
             try:
-                load = amd_gpu.query_load() * 100
+                load = gpu.query_load() * 100
             except:
                 load = math.nan
 
             try:
-                temperature = amd_gpu.query_temperature()
+                temperature = gpu.query_temperature()
             except:
                 temperature = math.nan
 
             return load, memory_percentage, memory_used, memory_total, temperature
         elif pyadl:
-            amd_gpu = pyadl.ADLManager.getInstance().getDevices()[0]
+            gpu = pyadl.ADLManager.getInstance().getDevices()[0]
 
             try:
-                load = amd_gpu.getCurrentUsage()
+                load = gpu.getCurrentUsage()
             except:
                 load = math.nan
 
             try:
-                temperature = amd_gpu.getCurrentTemperature()
+                temperature = gpu.getCurrentTemperature()
             except:
                 temperature = math.nan
 
@@ -395,8 +420,7 @@ class GpuAmd(sensors.Gpu):
     def frequency() -> float:
         try:
             if pyamdgpuinfo:
-                pyamdgpuinfo.detect_gpus()
-                return pyamdgpuinfo.get_gpu(0).query_sclk() / 1000000
+                return amd_gpu().query_sclk() / 1000000
             elif pyadl:
                 return pyadl.ADLManager.getInstance().getDevices()[0].getCurrentEngineClock()
             else:
@@ -428,7 +452,7 @@ class Memory(sensors.Memory):
     @staticmethod
     def virtual_percent() -> float:
         try:
-            return psutil.virtual_memory().percent
+            return virtual_memory().percent
         except:
             return math.nan
 
@@ -437,7 +461,8 @@ class Memory(sensors.Memory):
         try:
             # Do not use psutil.virtual_memory().used: from https://psutil.readthedocs.io/en/latest/#memory
             # "It is calculated differently depending on the platform and designed for informational purposes only"
-            return psutil.virtual_memory().total - psutil.virtual_memory().available
+            memory = virtual_memory()
+            return memory.total - memory.available
         except:
             return -1
 
@@ -446,7 +471,7 @@ class Memory(sensors.Memory):
         try:
             # Do not use psutil.virtual_memory().free: from https://psutil.readthedocs.io/en/latest/#memory
             # "note that this doesn’t reflect the actual memory available (use available instead)."
-            return psutil.virtual_memory().available
+            return virtual_memory().available
         except:
             return -1
 
@@ -455,21 +480,21 @@ class Disk(sensors.Disk):
     @staticmethod
     def disk_usage_percent() -> float:
         try:
-            return psutil.disk_usage("/").percent
+            return disk_usage("/").percent
         except:
             return math.nan
 
     @staticmethod
     def disk_used() -> int:  # In bytes
         try:
-            return psutil.disk_usage("/").used
+            return disk_usage("/").used
         except:
             return -1
 
     @staticmethod
     def disk_free() -> int:  # In bytes
         try:
-            return psutil.disk_usage("/").free
+            return disk_usage("/").free
         except:
             return -1
 
@@ -480,7 +505,8 @@ class Net(sensors.Net):
         int, int, int, int]:  # up rate (B/s), uploaded (B), dl rate (B/s), downloaded (B)
         try:
             # Get current counters
-            pnic_after = psutil.net_io_counters(pernic=True)
+            pnic_after = net_io_counters()
+            now = time.monotonic()
 
             upload_rate = 0
             uploaded = 0
@@ -490,15 +516,21 @@ class Net(sensors.Net):
             if if_name != "":
                 if if_name in pnic_after:
                     try:
-                        upload_rate = (pnic_after[if_name].bytes_sent - PNIC_BEFORE[if_name].bytes_sent) / interval
+                        # Rates are computed over the time elapsed since the previous measure: it is longer than
+                        # interval if refreshes were skipped or stretched by adaptive intervals
+                        elapsed = now - PNIC_BEFORE_TIME[if_name]
+                        if elapsed <= 0:
+                            elapsed = interval
+                        upload_rate = (pnic_after[if_name].bytes_sent - PNIC_BEFORE[if_name].bytes_sent) / elapsed
                         uploaded = pnic_after[if_name].bytes_sent
-                        download_rate = (pnic_after[if_name].bytes_recv - PNIC_BEFORE[if_name].bytes_recv) / interval
+                        download_rate = (pnic_after[if_name].bytes_recv - PNIC_BEFORE[if_name].bytes_recv) / elapsed
                         downloaded = pnic_after[if_name].bytes_recv
                     except:
                         # Interface might not be in PNIC_BEFORE for now
                         pass
 
                     PNIC_BEFORE.update({if_name: pnic_after[if_name]})
+                    PNIC_BEFORE_TIME.update({if_name: now})
                 else:
                     logger.warning("Network interface '%s' not found. Check names in config.yaml." % if_name)
 
@@ -21,11 +21,16 @@
 # This file will use randomly generated data instead of real hardware sensors
 # For all platforms (Linux, Windows, macOS)
 
+import os
 import random
 from typing import Tuple
 
+import numpy as np
+
 import library.sensors.sensors as sensors
 
+CPU_CORES = os.cpu_count() or 8
+
 
 class Cpu(sensors.Cpu):
     @staticmethod
@@ -36,6 +41,14 @@ class Cpu(sensors.Cpu):
     def frequency() -> float:
         return random.uniform(800, 3400)
 
+    @staticmethod
+    def cores_percentage() -> np.ndarray:
+        return np.random.uniform(0, 100, CPU_CORES)
+
+    @staticmethod
+    def cores_frequency() -> np.ndarray:
+        return np.random.uniform(800, 3400, CPU_CORES)
+
     @staticmethod
     def load() -> Tuple[float, float, float]:  # 1 / 5 / 15min avg (%):
         return random.uniform(0, 100), random.uniform(0, 100), random.uniform(0, 100)
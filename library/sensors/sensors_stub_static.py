@@ -24,6 +24,8 @@
 
 from typing import Tuple
 
+import numpy as np
+
 import library.sensors.sensors as sensors
 
 # Define here global static values that will be applied to all sensors of the same type
@@ -32,6 +34,7 @@ TEMPERATURE_SENSOR_VALUE = 67.3
 
 # Define other sensors
 CPU_FREQ_MHZ = 2400.0
+CPU_CORES = 8
 DISK_TOTAL_SIZE_GB = 1000
 MEMORY_TOTAL_SIZE_GB = 64
 GPU_MEM_TOTAL_SIZE_GB = 32
@@ -49,6 +52,14 @@ class Cpu(sensors.Cpu):
     def frequency() -> float:
         return CPU_FREQ_MHZ
 
+    @staticmethod
+    def cores_percentage() -> np.ndarray:
+        return np.full(CPU_CORES, PERCENTAGE_SENSOR_VALUE)
+
+    @staticmethod
+    def cores_frequency() -> np.ndarray:
+        return np.full(CPU_CORES, CPU_FREQ_MHZ)
+
     @staticmethod
     def load() -> Tuple[float, float, float]:  # 1 / 5 / 15min avg (%):
         return PERCENTAGE_SENSOR_VALUE, PERCENTAGE_SENSOR_VALUE, PERCENTAGE_SENSOR_VALUE
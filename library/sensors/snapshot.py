@@ -0,0 +1,62 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# turing-smart-screen-python - a Python system monitor and library for USB-C displays like Turing Smart Screen or XuanFang
+# https://github.com/mathoudebine/turing-smart-screen-python/
+#
+# Copyright (C) 2021 Matthieu Houdebine (mathoudebine)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This file gives a snapshot of the hardware sensors for each refresh (tick) of the widgets: sensors classes derive
+# several values from the same OS query (e.g. used, free and total memory), within a tick each query is done only once
+# and its result is shared by all values
+
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+# Results of the queries done during the current tick of each thread, None outside a tick
+_local = threading.local()
+
+
+@contextmanager
+def tick():
+    # Queries done inside this context are done once, then their result is reused until the end of the context.
+    # Ticks can be nested, the snapshot lasts until the outermost one ends
+    if getattr(_local, "results", None) is not None:
+        yield
+        return
+
+    _local.results = {}
+    try:
+        yield
+    finally:
+        _local.results = None
+
+
+def query(function):
+    # Decorator for functions querying the OS: their result is part of the snapshot of the current tick.
+    # Outside a tick, the OS is queried on each call. Failed queries are not part of the snapshot
+    @wraps(function)
+    def wrapper(*args):
+        results = getattr(_local, "results", None)
+        if results is None:
+            return function(*args)
+
+        key = (function, args)
+        if key not in results:
+            results[key] = function(*args)
+        return results[key]
+
+    return wrapper
@@ -28,7 +28,7 @@ import math
 import os
 import platform
 import sys
-from typing import List
+import threading
 
 import babel.dates
 import requests
@@ -36,12 +36,18 @@ from ping3 import ping
 from psutil._common import bytes2human
 from uptime import uptime
 
+import library.async_io as async_io
 import library.config as config
 from library.display import display
+from library.history import HistoryStore
 from library.log import logger
 
 DEFAULT_HISTORY_SIZE = 10
 
+# Last values of the metrics displayed in line graphs, saved in HISTORY_DIR or in the systemd state directory if any
+HISTORY_DIR = config.CONFIG_DATA["config"].get("HISTORY_DIR", "") or os.environ.get("STATE_DIRECTORY", "")
+history = HistoryStore(os.path.join(config.MAIN_DIRECTORY, HISTORY_DIR) if HISTORY_DIR else None)
+
 ETH_CARD = config.CONFIG_DATA["config"].get("ETH", "")
 WLO_CARD = config.CONFIG_DATA["config"].get("WLO", "")
 HW_SENSORS = config.CONFIG_DATA["config"].get("HW_SENSORS", "AUTO")
@@ -62,6 +68,15 @@ elif HW_SENSORS == "LHM":
             sys.exit(0)
         except:
             os._exit(0)
+elif HW_SENSORS == "LINUX_NATIVE":
+    if platform.system() == 'Linux':
+        import library.sensors.sensors_linux as sensors
+    else:
+        logger.error("Linux native sensors are only available on Linux")
+        try:
+            sys.exit(0)
+        except:
+            os._exit(0)
 elif HW_SENSORS == "STUB":
     logger.warning("Stub sensors, not real HW sensors")
     import library.sensors.sensors_stub_random as sensors
@@ -90,6 +105,35 @@ def get_theme_file_path(name):
         return None
 
 
+# Parameters of the last drawing of each widget, to skip widgets whose displayed content has not changed
+last_rendered = {}  # { key=id(theme_data), value=(theme_data, parameters) }
+
+# Number of widgets drawn by each thread, to know if a refresh has changed the display (see adaptive intervals)
+drawn = threading.local()
+
+
+def widgets_drawn() -> int:
+    return getattr(drawn, "count", 0)
+
+
+def count_drawn_widget():
+    drawn.count = widgets_drawn() + 1
+
+
+def display_widget(theme_data, draw_function, **kwargs):
+    # Draw a widget, unless it is already displayed with the same parameters (text, value, colors, geometry...):
+    # unchanged widgets then cost no rendering and no serial traffic.
+    # Screen content is lost when the display is cleared or turned back on: all widgets are drawn again
+    parameters = (display.lcd.content_generation, draw_function, kwargs)
+    last = last_rendered.get(id(theme_data))
+    if last is not None and last[1] == parameters:
+        return
+    # theme_data is kept so that its id cannot be reused for another widget
+    last_rendered[id(theme_data)] = (theme_data, parameters)
+    count_drawn_widget()
+    draw_function(**kwargs)
+
+
 def display_themed_value(theme_data, value, min_size=0, unit=''):
     if not theme_data.get("SHOW", False):
         return
@@ -104,7 +148,8 @@ def display_themed_value(theme_data, value, min_size=0, unit=''):
     if theme_data.get("SHOW_UNIT", True) and unit:
         text += str(unit)
 
-    display.lcd.DisplayText(
+    display_widget(
+        theme_data, display.lcd.DisplayText,
         text=text,
         x=theme_data.get("X", 0),
         y=theme_data.get("Y", 0),
@@ -142,7 +187,8 @@ def display_themed_progress_bar(theme_data, value):
     if not theme_data.get("SHOW", False):
         return
 
-    display.lcd.DisplayProgressBar(
+    display_widget(
+        theme_data, display.lcd.DisplayProgressBar,
         x=theme_data.get("X", 0),
         y=theme_data.get("Y", 0),
         width=theme_data.get("WIDTH", 0),
@@ -171,7 +217,8 @@ def display_themed_radial_bar(theme_data, value, min_size=0, unit='', custom_tex
     else:
         text = ""
 
-    display.lcd.DisplayRadialProgressBar(
+    display_widget(
+        theme_data, display.lcd.DisplayRadialProgressBar,
         xc=theme_data.get("X", 0),
         yc=theme_data.get("Y", 0),
         radius=theme_data.get("RADIUS", 1),
@@ -217,12 +264,51 @@ def display_themed_temperature_radial_bar(theme_data, value):
     )
 
 
+def display_themed_bar_array(theme_data, values):
+    if not theme_data.get("SHOW", False):
+        return
+
+    display_widget(
+        theme_data, display.lcd.DisplayBarArray,
+        x=theme_data.get("X", 0),
+        y=theme_data.get("Y", 0),
+        width=theme_data.get("WIDTH", 0),
+        height=theme_data.get("HEIGHT", 0),
+        # Values are compared to the last displayed ones: a tuple is compared as a whole, unlike a NumPy array
+        values=tuple(values.tolist()),
+        min_value=theme_data.get("MIN_VALUE", 0),
+        max_value=theme_data.get("MAX_VALUE", 100),
+        columns=theme_data.get("COLUMNS", 0),
+        bar_color=theme_data.get("BAR_COLOR", (0, 0, 0)),
+        heatmap=theme_data.get("STYLE", "BARS") == "HEATMAP",
+        low_color=theme_data.get("LOW_COLOR", None),
+        background_color=theme_data.get("BACKGROUND_COLOR", (255, 255, 255)),
+        background_image=get_theme_file_path(theme_data.get("BACKGROUND_IMAGE", None))
+    )
+
+
+def display_themed_history_graph(theme_data, metric):
+    if not theme_data.get("SHOW", False):
+        return
+
+    # Display the last HISTORY_SIZE values of the metric, or its trend over the last TIME_WINDOW seconds
+    time_window = theme_data.get("TIME_WINDOW", 0)
+    if time_window:
+        values = history.window(metric, time_window, max_points=theme_data.get("WIDTH", 1))
+    else:
+        values = history.values(metric)
+
+    display_themed_line_graph(theme_data, values)
+
+
 def display_themed_line_graph(theme_data, values):
     if not theme_data.get("SHOW", False):
         return
 
     line_color = theme_data.get("LINE_COLOR", (0, 0, 0))
 
+    # Line graphs are drawn at each refresh: their values scroll even if the last value has not changed
+    count_drawn_widget()
     display.lcd.DisplayLineGraph(
         x=theme_data.get("X", 0),
         y=theme_data.get("Y", 0),
@@ -239,52 +325,34 @@ def display_themed_line_graph(theme_data, values):
         axis_font=config.FONTS_DIR + theme_data.get("AXIS_FONT", "roboto/Roboto-Black.ttf"),
         axis_font_size=theme_data.get("AXIS_FONT_SIZE", 10),
         background_color=theme_data.get("BACKGROUND_COLOR", (0, 0, 0)),
-        background_image=get_theme_file_path(theme_data.get("BACKGROUND_IMAGE", None))
+        background_image=get_theme_file_path(theme_data.get("BACKGROUND_IMAGE", None)),
+        scrolling=theme_data.get("SCROLLING", False)
     )
 
 
-def save_last_value(value: float, last_values: List[float], history_size: int):
-    # Initialize last values list the first time with given size
-    if len(last_values) != history_size:
-        last_values[:] = last_values_list(size=history_size)
-    # Store the value to the list that can then be used for line graph
-    last_values.append(value)
-    # Also remove the oldest value from list
-    last_values.pop(0)
-
-
-def last_values_list(size: int) -> List[float]:
-    return [math.nan] * size
-
-
 class CPU:
-    last_values_cpu_percentage = []
-    last_values_cpu_temperature = []
-    last_values_cpu_fan_speed = []
-    last_values_cpu_frequency = []
-
     @classmethod
     def percentage(cls):
         theme_data = config.THEME_DATA['STATS']['CPU']['PERCENTAGE']
         cpu_percentage = sensors.Cpu.percentage(
             interval=theme_data.get("INTERVAL", None)
         )
-        save_last_value(cpu_percentage, cls.last_values_cpu_percentage,
-                        theme_data['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("cpu_percentage", cpu_percentage,
+                     theme_data['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         # logger.debug(f"CPU Percentage: {cpu_percentage}")
 
         display_themed_progress_bar(theme_data['GRAPH'], cpu_percentage)
         display_themed_percent_radial_bar(theme_data['RADIAL'], cpu_percentage)
         display_themed_percent_value(theme_data['TEXT'], cpu_percentage)
-        display_themed_line_graph(theme_data['LINE_GRAPH'], cls.last_values_cpu_percentage)
+        display_themed_history_graph(theme_data['LINE_GRAPH'], "cpu_percentage")
 
     @classmethod
     def frequency(cls):
         freq_ghz = sensors.Cpu.frequency() / 1000
         theme_data = config.THEME_DATA['STATS']['CPU']['FREQUENCY']
 
-        save_last_value(freq_ghz, cls.last_values_cpu_frequency,
-                        theme_data['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("cpu_frequency", freq_ghz,
+                     theme_data['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
 
         display_themed_value(
             theme_data=theme_data['TEXT'],
@@ -299,7 +367,17 @@ class CPU:
             unit=" GHz",
             min_size=4
         )
-        display_themed_line_graph(theme_data['LINE_GRAPH'], cls.last_values_cpu_frequency)
+        display_themed_history_graph(theme_data['LINE_GRAPH'], "cpu_frequency")
+
+    @classmethod
+    def cores(cls):
+        theme_data = config.THEME_DATA['STATS']['CPU']['CORES']
+
+        # Sensors of all cores are read at once, only if they are displayed
+        if theme_data['PERCENTAGE']['BAR_ARRAY'].get("SHOW", False):
+            display_themed_bar_array(theme_data['PERCENTAGE']['BAR_ARRAY'], sensors.Cpu.cores_percentage())
+        if theme_data['FREQUENCY']['BAR_ARRAY'].get("SHOW", False):
+            display_themed_bar_array(theme_data['FREQUENCY']['BAR_ARRAY'], sensors.Cpu.cores_frequency())
 
     @classmethod
     def load(cls):
@@ -314,9 +392,9 @@ class CPU:
     @classmethod
     def temperature(cls):
         temperature = sensors.Cpu.temperature()
-        save_last_value(temperature, cls.last_values_cpu_temperature,
-                        config.THEME_DATA['STATS']['CPU']['TEMPERATURE']['LINE_GRAPH'].get("HISTORY_SIZE",
-                                                                                           DEFAULT_HISTORY_SIZE))
+        history.save("cpu_temperature", temperature,
+                     config.THEME_DATA['STATS']['CPU']['TEMPERATURE']['LINE_GRAPH'].get("HISTORY_SIZE",
+                                                                                        DEFAULT_HISTORY_SIZE))
 
         cpu_temp_text_data = config.THEME_DATA['STATS']['CPU']['TEMPERATURE']['TEXT']
         cpu_temp_radial_data = config.THEME_DATA['STATS']['CPU']['TEMPERATURE']['RADIAL']
@@ -336,7 +414,7 @@ class CPU:
         display_themed_temperature_value(cpu_temp_text_data, temperature)
         display_themed_progress_bar(cpu_temp_graph_data, temperature)
         display_themed_temperature_radial_bar(cpu_temp_radial_data, temperature)
-        display_themed_line_graph(cpu_temp_line_graph_data, cls.last_values_cpu_temperature)
+        display_themed_history_graph(cpu_temp_line_graph_data, "cpu_temperature")
 
     @classmethod
     def fan_speed(cls):
@@ -345,9 +423,9 @@ class CPU:
         else:
             fan_percent = sensors.Cpu.fan_percent()
 
-        save_last_value(fan_percent, cls.last_values_cpu_fan_speed,
-                        config.THEME_DATA['STATS']['CPU']['FAN_SPEED']['LINE_GRAPH'].get("HISTORY_SIZE",
-                                                                                         DEFAULT_HISTORY_SIZE))
+        history.save("cpu_fan_speed", fan_percent,
+                     config.THEME_DATA['STATS']['CPU']['FAN_SPEED']['LINE_GRAPH'].get("HISTORY_SIZE",
+                                                                                      DEFAULT_HISTORY_SIZE))
 
         cpu_fan_text_data = config.THEME_DATA['STATS']['CPU']['FAN_SPEED']['TEXT']
         cpu_fan_radial_data = config.THEME_DATA['STATS']['CPU']['FAN_SPEED']['RADIAL']
@@ -370,17 +448,10 @@ class CPU:
         display_themed_percent_value(cpu_fan_text_data, fan_percent)
         display_themed_progress_bar(cpu_fan_graph_data, fan_percent)
         display_themed_percent_radial_bar(cpu_fan_radial_data, fan_percent)
-        display_themed_line_graph(cpu_fan_line_graph_data, cls.last_values_cpu_fan_speed)
+        display_themed_history_graph(cpu_fan_line_graph_data, "cpu_fan_speed")
 
 
 class Gpu:
-    last_values_gpu_percentage = []
-    last_values_gpu_mem_percentage = []
-    last_values_gpu_temperature = []
-    last_values_gpu_fps = []
-    last_values_gpu_fan_speed = []
-    last_values_gpu_frequency = []
-
     @classmethod
     def stats(cls):
         load, memory_percentage, memory_used_mb, total_memory_mb, temperature = sensors.Gpu.stats()
@@ -390,18 +461,18 @@ class Gpu:
 
         theme_gpu_data = config.THEME_DATA['STATS']['GPU']
 
-        save_last_value(load, cls.last_values_gpu_percentage,
-                        theme_gpu_data['PERCENTAGE']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
-        save_last_value(memory_percentage, cls.last_values_gpu_mem_percentage,
-                        theme_gpu_data['MEMORY_PERCENT']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
-        save_last_value(temperature, cls.last_values_gpu_temperature,
-                        theme_gpu_data['TEMPERATURE']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
-        save_last_value(fps, cls.last_values_gpu_fps,
-                        theme_gpu_data['FPS']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
-        save_last_value(fan_percent, cls.last_values_gpu_fan_speed,
-                        theme_gpu_data['FAN_SPEED']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
-        save_last_value(freq_ghz, cls.last_values_gpu_frequency,
-                        theme_gpu_data['FREQUENCY']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("gpu_percentage", load,
+                     theme_gpu_data['PERCENTAGE']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("gpu_mem_percentage", memory_percentage,
+                     theme_gpu_data['MEMORY_PERCENT']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("gpu_temperature", temperature,
+                     theme_gpu_data['TEMPERATURE']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("gpu_fps", fps,
+                     theme_gpu_data['FPS']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("gpu_fan_speed", fan_percent,
+                     theme_gpu_data['FAN_SPEED']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("gpu_frequency", freq_ghz,
+                     theme_gpu_data['FREQUENCY']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
 
         ################################ for backward compatibility only
         gpu_mem_graph_data = theme_gpu_data['MEMORY']['GRAPH']
@@ -449,7 +520,7 @@ class Gpu:
         display_themed_progress_bar(gpu_percent_graph_data, load)
         display_themed_percent_radial_bar(gpu_percent_radial_data, load)
         display_themed_percent_value(gpu_percent_text_data, load)
-        display_themed_line_graph(gpu_percent_line_graph_data, cls.last_values_gpu_percentage)
+        display_themed_history_graph(gpu_percent_line_graph_data, "gpu_percentage")
 
         # GPU mem. usage (%)
         gpu_mem_percent_graph_data = theme_gpu_data['MEMORY_PERCENT']['GRAPH']
@@ -469,7 +540,7 @@ class Gpu:
         display_themed_progress_bar(gpu_mem_percent_graph_data, memory_percentage)
         display_themed_percent_radial_bar(gpu_mem_percent_radial_data, memory_percentage)
         display_themed_percent_value(gpu_mem_percent_text_data, memory_percentage)
-        display_themed_line_graph(gpu_mem_percent_line_graph_data, cls.last_values_gpu_mem_percentage)
+        display_themed_history_graph(gpu_mem_percent_line_graph_data, "gpu_mem_percentage")
 
         # GPU mem. absolute usage (M)
         gpu_mem_used_text_data = theme_gpu_data['MEMORY_USED']['TEXT']
@@ -520,7 +591,7 @@ class Gpu:
         display_themed_temperature_value(gpu_temp_text_data, temperature)
         display_themed_progress_bar(gpu_temp_graph_data, temperature)
         display_themed_temperature_radial_bar(gpu_temp_radial_data, temperature)
-        display_themed_line_graph(gpu_temp_line_graph_data, cls.last_values_gpu_temperature)
+        display_themed_history_graph(gpu_temp_line_graph_data, "gpu_temperature")
 
         # GPU FPS
         gpu_fps_text_data = theme_gpu_data['FPS']['TEXT']
@@ -551,7 +622,7 @@ class Gpu:
             min_size=4,
             unit=" FPS"
         )
-        display_themed_line_graph(gpu_fps_line_graph_data, cls.last_values_gpu_fps)
+        display_themed_history_graph(gpu_fps_line_graph_data, "gpu_fps")
 
         # GPU Fan Speed (%)
         gpu_fan_text_data = theme_gpu_data['FAN_SPEED']['TEXT']
@@ -572,7 +643,7 @@ class Gpu:
         display_themed_percent_value(gpu_fan_text_data, fan_percent)
         display_themed_progress_bar(gpu_fan_graph_data, fan_percent)
         display_themed_percent_radial_bar(gpu_fan_radial_data, fan_percent)
-        display_themed_line_graph(gpu_fan_line_graph_data, cls.last_values_gpu_fan_speed)
+        display_themed_history_graph(gpu_fan_line_graph_data, "gpu_fan_speed")
 
         # GPU Frequency (Ghz)
         gpu_freq_text_data = theme_gpu_data['FREQUENCY']['TEXT']
@@ -592,7 +663,7 @@ class Gpu:
             unit=" GHz",
             min_size=4
         )
-        display_themed_line_graph(gpu_freq_line_graph_data, cls.last_values_gpu_frequency)
+        display_themed_history_graph(gpu_freq_line_graph_data, "gpu_frequency")
 
     @staticmethod
     def is_available():
@@ -600,27 +671,24 @@ class Gpu:
 
 
 class Memory:
-    last_values_memory_swap = []
-    last_values_memory_virtual = []
-
     @classmethod
     def stats(cls):
         memory_stats_theme_data = config.THEME_DATA['STATS']['MEMORY']
 
         swap_percent = sensors.Memory.swap_percent()
-        save_last_value(swap_percent, cls.last_values_memory_swap,
-                        memory_stats_theme_data['SWAP']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("memory_swap", swap_percent,
+                     memory_stats_theme_data['SWAP']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         display_themed_progress_bar(memory_stats_theme_data['SWAP']['GRAPH'], swap_percent)
         display_themed_percent_radial_bar(memory_stats_theme_data['SWAP']['RADIAL'], swap_percent)
-        display_themed_line_graph(memory_stats_theme_data['SWAP']['LINE_GRAPH'], cls.last_values_memory_swap)
+        display_themed_history_graph(memory_stats_theme_data['SWAP']['LINE_GRAPH'], "memory_swap")
 
         virtual_percent = sensors.Memory.virtual_percent()
-        save_last_value(virtual_percent, cls.last_values_memory_virtual,
-                        memory_stats_theme_data['VIRTUAL']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("memory_virtual", virtual_percent,
+                     memory_stats_theme_data['VIRTUAL']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         display_themed_progress_bar(memory_stats_theme_data['VIRTUAL']['GRAPH'], virtual_percent)
         display_themed_percent_radial_bar(memory_stats_theme_data['VIRTUAL']['RADIAL'], virtual_percent)
         display_themed_percent_value(memory_stats_theme_data['VIRTUAL']['PERCENT_TEXT'], virtual_percent)
-        display_themed_line_graph(memory_stats_theme_data['VIRTUAL']['LINE_GRAPH'], cls.last_values_memory_virtual)
+        display_themed_history_graph(memory_stats_theme_data['VIRTUAL']['LINE_GRAPH'], "memory_virtual")
 
         display_themed_value(
             theme_data=memory_stats_theme_data['VIRTUAL']['USED'],
@@ -643,8 +711,6 @@ class Memory:
 
 
 class Disk:
-    last_values_disk_usage = []
-
     @classmethod
     def stats(cls):
         used = sensors.Disk.disk_used()
@@ -653,12 +719,12 @@ class Disk:
         disk_theme_data = config.THEME_DATA['STATS']['DISK']
 
         disk_usage_percent = sensors.Disk.disk_usage_percent()
-        save_last_value(disk_usage_percent, cls.last_values_disk_usage,
-                        disk_theme_data['USED']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("disk_usage", disk_usage_percent,
+                     disk_theme_data['USED']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         display_themed_progress_bar(disk_theme_data['USED']['GRAPH'], disk_usage_percent)
         display_themed_percent_radial_bar(disk_theme_data['USED']['RADIAL'], disk_usage_percent)
         display_themed_percent_value(disk_theme_data['USED']['PERCENT_TEXT'], disk_usage_percent)
-        display_themed_line_graph(disk_theme_data['USED']['LINE_GRAPH'], cls.last_values_disk_usage)
+        display_themed_history_graph(disk_theme_data['USED']['LINE_GRAPH'], "disk_usage")
 
         display_themed_value(
             theme_data=disk_theme_data['USED']['TEXT'],
@@ -681,42 +747,37 @@ class Disk:
 
 
 class Net:
-    last_values_wlo_upload = []
-    last_values_wlo_download = []
-    last_values_eth_upload = []
-    last_values_eth_download = []
-
     @classmethod
     def stats(cls):
         net_theme_data = config.THEME_DATA['STATS']['NET']
         interval = net_theme_data.get("INTERVAL", None)
         upload_wlo, uploaded_wlo, download_wlo, downloaded_wlo = sensors.Net.stats(WLO_CARD, interval)
 
-        save_last_value(upload_wlo, cls.last_values_wlo_upload,
-                        net_theme_data['WLO']['UPLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("wlo_upload", upload_wlo,
+                     net_theme_data['WLO']['UPLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         Net._show_themed_tax_rate(net_theme_data['WLO']['UPLOAD']['TEXT'], upload_wlo)
         Net._show_themed_total_data(net_theme_data['WLO']['UPLOADED']['TEXT'], uploaded_wlo)
-        display_themed_line_graph(net_theme_data['WLO']['UPLOAD']['LINE_GRAPH'], cls.last_values_wlo_upload)
+        display_themed_history_graph(net_theme_data['WLO']['UPLOAD']['LINE_GRAPH'], "wlo_upload")
 
-        save_last_value(download_wlo, cls.last_values_wlo_download,
-                        net_theme_data['WLO']['DOWNLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("wlo_download", download_wlo,
+                     net_theme_data['WLO']['DOWNLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         Net._show_themed_tax_rate(net_theme_data['WLO']['DOWNLOAD']['TEXT'], download_wlo)
         Net._show_themed_total_data(net_theme_data['WLO']['DOWNLOADED']['TEXT'], downloaded_wlo)
-        display_themed_line_graph(net_theme_data['WLO']['DOWNLOAD']['LINE_GRAPH'], cls.last_values_wlo_download)
+        display_themed_history_graph(net_theme_data['WLO']['DOWNLOAD']['LINE_GRAPH'], "wlo_download")
 
         upload_eth, uploaded_eth, download_eth, downloaded_eth = sensors.Net.stats(ETH_CARD, interval)
 
-        save_last_value(upload_eth, cls.last_values_eth_upload,
-                        net_theme_data['ETH']['UPLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("eth_upload", upload_eth,
+                     net_theme_data['ETH']['UPLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         Net._show_themed_tax_rate(net_theme_data['ETH']['UPLOAD']['TEXT'], upload_eth)
         Net._show_themed_total_data(net_theme_data['ETH']['UPLOADED']['TEXT'], uploaded_eth)
-        display_themed_line_graph(net_theme_data['ETH']['UPLOAD']['LINE_GRAPH'], cls.last_values_eth_upload)
+        display_themed_history_graph(net_theme_data['ETH']['UPLOAD']['LINE_GRAPH'], "eth_upload")
 
-        save_last_value(download_eth, cls.last_values_eth_download,
-                        net_theme_data['ETH']['DOWNLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("eth_download", download_eth,
+                     net_theme_data['ETH']['DOWNLOAD']['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         Net._show_themed_tax_rate(net_theme_data['ETH']['DOWNLOAD']['TEXT'], download_eth)
         Net._show_themed_total_data(net_theme_data['ETH']['DOWNLOADED']['TEXT'], downloaded_eth)
-        display_themed_line_graph(net_theme_data['ETH']['DOWNLOAD']['LINE_GRAPH'], cls.last_values_eth_download)
+        display_themed_history_graph(net_theme_data['ETH']['DOWNLOAD']['LINE_GRAPH'], "eth_download")
 
     @staticmethod
     def _show_themed_total_data(theme_data, amount):
@@ -845,88 +906,120 @@ class Custom:
 
 
 class Weather:
-    @staticmethod
-    def stats():
-        WEATHER_UNITS = {'metric': '°C', 'imperial': '°F', 'standard': '°K'}
+    # Weather data is fetched then displayed, so that the asyncio runtime can fetch it with async I/O (see scheduler.py)
+    UNITS = {'metric': '°C', 'imperial': '°F', 'standard': '°K'}
 
+    @staticmethod
+    def theme_data():
         weather_theme_data = config.THEME_DATA['STATS'].get('WEATHER', {})
-        wtemperature_theme_data = weather_theme_data.get('TEMPERATURE', {}).get('TEXT', {})
-        wfelt_theme_data = weather_theme_data.get('TEMPERATURE_FELT', {}).get('TEXT', {})
-        wupdatetime_theme_data = weather_theme_data.get('UPDATE_TIME', {}).get('TEXT', {})
-        wdescription_theme_data = weather_theme_data.get('WEATHER_DESCRIPTION', {}).get('TEXT', {})
-        whumidity_theme_data = weather_theme_data.get('HUMIDITY', {}).get('TEXT', {})
-
-        activate = True if wtemperature_theme_data.get("SHOW") or wfelt_theme_data.get(
-            "SHOW") or wupdatetime_theme_data.get("SHOW") or wdescription_theme_data.get(
-            "SHOW") or whumidity_theme_data.get("SHOW") else False
-
-        if activate:
-            temp = None
-            feel = None
-            time = None
-            humidity = None
-            if HW_SENSORS in ["STATIC", "STUB"]:
-                temp = "17.5°C"
-                feel = "(17.2°C)"
-                desc = "Cloudy"
-                time = "@15:33"
-                humidity = "45%"
-            else:
-                # API Parameters
-                lat = config.CONFIG_DATA['config'].get('WEATHER_LATITUDE', "")
-                lon = config.CONFIG_DATA['config'].get('WEATHER_LONGITUDE', "")
-                api_key = config.CONFIG_DATA['config'].get('WEATHER_API_KEY', "")
-                units = config.CONFIG_DATA['config'].get('WEATHER_UNITS', "metric")
-                lang = config.CONFIG_DATA['config'].get('WEATHER_LANGUAGE', "en")
-                deg = WEATHER_UNITS.get(units, '°?')
-                if api_key:
-                    url = f'https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&exclude=minutely,hourly,daily,alerts&appid={api_key}&units={units}&lang={lang}'
-                    try:
-                        response = requests.get(url)
-                        if response.status_code == 200:
-                            data = response.json()
-                            temp = f"{data['current']['temp']:.1f}{deg}"
-                            feel = f"({data['current']['feels_like']:.1f}{deg})"
-                            desc = data['current']['weather'][0]['description'].capitalize()
-                            humidity = f"{data['current']['humidity']:.0f}%"
-                            now = datetime.datetime.now()
-                            time = f"@{now.hour:02d}:{now.minute:02d}"
-                        else:
-                            logger.error(f"Error {response.status_code} fetching OpenWeatherMap API:")
-                            # logger.error(f"Response content: {response.content}")
-                            # logger.error(response.text)
-                            desc = response.json().get('message')
-                    except Exception as e:
-                        logger.error(f"Error fetching OpenWeatherMap API: {str(e)}")
-                        desc = "Error fetching OpenWeatherMap API"
-                else:
-                    logger.warning("No OpenWeatherMap API key provided in config.yaml")
-                    desc = "No OpenWeatherMap API key"
-
-        if activate:
-            # Display Temperature
-            display_themed_value(theme_data=wtemperature_theme_data, value=temp)
-            # Display Temperature Felt
-            display_themed_value(theme_data=wfelt_theme_data, value=feel)
-            # Display Update Time
-            display_themed_value(theme_data=wupdatetime_theme_data, value=time)
-            # Display Humidity
-            display_themed_value(theme_data=whumidity_theme_data, value=humidity)
-            # Display Weather Description (or error message)
-            display_themed_value(theme_data=wdescription_theme_data, value=desc)
+        return {name: weather_theme_data.get(name, {}).get('TEXT', {}) for name in
+                ('TEMPERATURE', 'TEMPERATURE_FELT', 'UPDATE_TIME', 'WEATHER_DESCRIPTION', 'HUMIDITY')}
+
+    @staticmethod
+    def activated() -> bool:
+        return any(theme_data.get("SHOW") for theme_data in Weather.theme_data().values())
+
+    @staticmethod
+    def request_url():
+        # OpenWeatherMap API URL, None if there is no API key
+        lat = config.CONFIG_DATA['config'].get('WEATHER_LATITUDE', "")
+        lon = config.CONFIG_DATA['config'].get('WEATHER_LONGITUDE', "")
+        api_key = config.CONFIG_DATA['config'].get('WEATHER_API_KEY', "")
+        units = config.CONFIG_DATA['config'].get('WEATHER_UNITS', "metric")
+        lang = config.CONFIG_DATA['config'].get('WEATHER_LANGUAGE', "en")
+        if not api_key:
+            return None
+        return f'https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&exclude=minutely,hourly,daily,alerts&appid={api_key}&units={units}&lang={lang}'
+
+    @staticmethod
+    def parse(status_code, data):
+        # Values to display from the API response: temperature, felt temperature, description, update time, humidity
+        if status_code != 200:
+            logger.error(f"Error {status_code} fetching OpenWeatherMap API:")
+            return None, None, (data or {}).get('message'), None, None
+
+        deg = Weather.UNITS.get(config.CONFIG_DATA['config'].get('WEATHER_UNITS', "metric"), '°?')
+        now = datetime.datetime.now()
+        return (f"{data['current']['temp']:.1f}{deg}",
+                f"({data['current']['feels_like']:.1f}{deg})",
+                data['current']['weather'][0]['description'].capitalize(),
+                f"@{now.hour:02d}:{now.minute:02d}",
+                f"{data['current']['humidity']:.0f}%")
+
+    @staticmethod
+    def static_values():
+        # Values without querying the API: fixed values for stub sensors, or error if there is no API key
+        if HW_SENSORS in ["STATIC", "STUB"]:
+            return "17.5°C", "(17.2°C)", "Cloudy", "@15:33", "45%"
+        logger.warning("No OpenWeatherMap API key provided in config.yaml")
+        return None, None, "No OpenWeatherMap API key", None, None
+
+    @staticmethod
+    def fetch():
+        if not Weather.activated():
+            return None
+        url = Weather.request_url()
+        if HW_SENSORS in ["STATIC", "STUB"] or not url:
+            return Weather.static_values()
+        try:
+            response = requests.get(url)
+            return Weather.parse(response.status_code, response.json())
+        except Exception as e:
+            logger.error(f"Error fetching OpenWeatherMap API: {str(e)}")
+            return None, None, "Error fetching OpenWeatherMap API", None, None
+
+    @staticmethod
+    async def fetch_async():
+        # Same as fetch(), with async I/O
+        if not Weather.activated():
+            return None
+        url = Weather.request_url()
+        if HW_SENSORS in ["STATIC", "STUB"] or not url:
+            return Weather.static_values()
+        try:
+            return Weather.parse(*await async_io.get_json(url))
+        except Exception as e:
+            logger.error(f"Error fetching OpenWeatherMap API: {str(e)}")
+            return None, None, "Error fetching OpenWeatherMap API", None, None
+
+    @staticmethod
+    def display(values):
+        if values is None:
+            return
+        temp, feel, desc, time, humidity = values
+        theme_data = Weather.theme_data()
+        # Display Temperature
+        display_themed_value(theme_data=theme_data['TEMPERATURE'], value=temp)
+        # Display Temperature Felt
+        display_themed_value(theme_data=theme_data['TEMPERATURE_FELT'], value=feel)
+        # Display Update Time
+        display_themed_value(theme_data=theme_data['UPDATE_TIME'], value=time)
+        # Display Humidity
+        display_themed_value(theme_data=theme_data['HUMIDITY'], value=humidity)
+        # Display Weather Description (or error message)
+        display_themed_value(theme_data=theme_data['WEATHER_DESCRIPTION'], value=desc)
+
+    @staticmethod
+    def stats():
+        Weather.display(Weather.fetch())
 
 
 class Ping:
-    last_values_ping = []
+    # Ping delay is fetched then displayed, so that the asyncio runtime can fetch it with async I/O (see scheduler.py)
+    @staticmethod
+    def fetch():
+        return ping(dest_addr=PING_DEST, unit="ms")
+
+    @staticmethod
+    async def fetch_async():
+        return await async_io.ping(PING_DEST)
 
     @classmethod
-    def stats(cls):
+    def display(cls, delay):
         theme_data = config.THEME_DATA['STATS']['PING']
 
-        delay = ping(dest_addr=PING_DEST, unit="ms")
-
-        save_last_value(delay, cls.last_values_ping,
-                        theme_data['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
+        history.save("ping", delay,
+                     theme_data['LINE_GRAPH'].get("HISTORY_SIZE", DEFAULT_HISTORY_SIZE))
         # logger.debug(f"Ping delay: {delay}ms")
 
         display_themed_progress_bar(theme_data['GRAPH'], delay)
@@ -942,4 +1035,8 @@ class Ping:
             unit="ms",
             min_size=6
         )
-        display_themed_line_graph(theme_data['LINE_GRAPH'], cls.last_values_ping)
+        display_themed_history_graph(theme_data['LINE_GRAPH'], "ping")
+
+    @classmethod
+    def stats(cls):
+        cls.display(cls.fetch())
@@ -50,6 +50,7 @@ try:
 
     from library.log import logger
     import library.scheduler as scheduler
+    import library.stats as stats
     from library.display import display
 
 except Exception as e:
@@ -95,11 +96,19 @@ if __name__ == "__main__":
 
         # Do not stop the program now in case data transmission was in progress
         # Instead, ask the scheduler to empty the action queue before stopping
-        scheduler.STOPPING = True
+        scheduler.stop()
 
         # Waiting for all pending request to be sent to display
         wait_for_empty_queue(5)
 
+        logger.debug("Serial writes: %s" % display.lcd.write_counters)
+        logger.debug("Bandwidth: %s" % display.lcd.governor)
+        logger.debug("Scheduler: %s" % scheduler.jobs)
+        logger.debug("Text cache: %s" % display.lcd.text_cache)
+
+        # Make sure line graphs history is written to disk
+        stats.history.flush()
+
         # Remove tray icon just before exit
         if tray_icon:
             tray_icon.visible = False
@@ -111,8 +120,16 @@ if __name__ == "__main__":
             os._exit(0)
 
 
+    signal_caught = False
+
     def on_signal_caught(signum, frame=None):
+        global signal_caught
         logger.info("Caught signal %d, exiting" % signum)
+        # Signal handler runs in the main thread, possibly in the middle of the previous handler while it holds the
+        # update queue lock: only the first signal stops the program
+        if signal_caught:
+            return
+        signal_caught = True
         clean_stop()
 
 
@@ -153,8 +170,9 @@ if __name__ == "__main__":
                     logger.info("Computer is resuming from sleep, display will turn on")
                     display.turn_on()
                     # Some models have troubles displaying back the previous bitmap after being turned off/on
-                    display.display_static_images()
-                    display.display_static_text()
+                    with display.lcd.Frame():
+                        display.display_static_images()
+                        display.display_static_text()
             else:
                 # For any other events, the program will stop
                 logger.info("Program will now exit")
@@ -202,34 +220,32 @@ if __name__ == "__main__":
     # Start serial queue handler
     scheduler.QueueHandler()
 
-    # Create all static images
-    display.display_static_images()
-
-    # Create all static texts
-    display.display_static_text()
+    # Create all static images and texts, sent to the display as a single frame
+    with display.lcd.Frame():
+        display.display_static_images()
+        display.display_static_text()
 
     # Wait for static images/text to be displayed before starting monitoring (to avoid filling the queue while waiting)
     wait_for_empty_queue(10)
 
-    # Start sensor scheduled reading. Avoid starting them all at the same time to optimize load
+    # Start sensor scheduled reading. The scheduler spreads their first runs to optimize load
     logger.info("Starting system monitoring")
-    import library.stats as stats
-
-    scheduler.CPUPercentage(); time.sleep(0.25)
-    scheduler.CPUFrequency(); time.sleep(0.25)
-    scheduler.CPULoad(); time.sleep(0.25)
-    scheduler.CPUTemperature(); time.sleep(0.25)
-    scheduler.CPUFanSpeed(); time.sleep(0.25)
+    scheduler.CPUPercentage()
+    scheduler.CPUCores()
+    scheduler.CPUFrequency()
+    scheduler.CPULoad()
+    scheduler.CPUTemperature()
+    scheduler.CPUFanSpeed()
     if stats.Gpu.is_available():
-        scheduler.GpuStats(); time.sleep(0.25)
-    scheduler.MemoryStats(); time.sleep(0.25)
-    scheduler.DiskStats(); time.sleep(0.25)
-    scheduler.NetStats(); time.sleep(0.25)
-    scheduler.DateStats(); time.sleep(0.25)
-    scheduler.SystemUptimeStats(); time.sleep(0.25)
-    scheduler.CustomStats(); time.sleep(0.25)
-    scheduler.WeatherStats(); time.sleep(0.25)
-    scheduler.PingStats(); time.sleep(0.25)
+        scheduler.GpuStats()
+    scheduler.MemoryStats()
+    scheduler.DiskStats()
+    scheduler.NetStats()
+    scheduler.DateStats()
+    scheduler.SystemUptimeStats()
+    scheduler.CustomStats()
+    scheduler.WeatherStats()
+    scheduler.PingStats()
 
     # OS-specific tasks
     if tray_icon and platform.system() == "Darwin":  # macOS-specific
@@ -279,3 +295,7 @@ if __name__ == "__main__":
 
         except Exception as e:
             logger.error("Exception while creating event window: %s" % str(e))
+
+    elif scheduler.RUNTIME == "ASYNCIO":
+        # Worker threads of the event loop do not accept work anymore once the main thread has ended: wait for the loop
+        scheduler.jobs.wait()
@@ -1,5 +1,5 @@
 import os
-from unittest.mock import Mock
+from unittest.mock import Mock, call
 import unittest
 
 # Set the environment variable to any non-empty string when running the tests
@@ -13,6 +13,10 @@ RECORD_GOLDEN = bool(os.getenv("RECORD_GOLDEN"))
 BENCHMARK = bool(os.getenv("BENCHMARK"))
 
 class MockSerial(Mock):
+    def write(self, data):
+        # Record a copy of the data: bitmaps are serialized in buffers that are reused once written
+        self.mock_calls.append(call.write(bytes(data)))
+
     def expect_golden(self, tc: unittest.TestCase, fn: str):
         golden_dir = os.path.join(os.path.dirname(__file__), "golden")
         full_path = os.path.join(golden_dir, fn + ".txt")
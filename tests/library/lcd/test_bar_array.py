@@ -0,0 +1,84 @@
+import timeit
+import unittest
+
+import numpy as np
+
+from library.lcd.bar_array import BarArrayLayout
+from .serial_mock import BENCHMARK
+from .test_progress_bar import RecordingPatchLcdCommRevA
+
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+
+
+class TestBarArrayLayout(unittest.TestCase):
+    def test_cells_separated_by_gaps(self):
+        layout = BarArrayLayout(width=11, height=4, count=3, columns=0)
+        # Columns of 3, 4 and 4 pixels, the last pixel of the first two columns is a gap
+        self.assertEqual(layout.index[0].tolist(), [0, 0, 3, 1, 1, 1, 3, 2, 2, 2, 2])
+        self.assertEqual(layout.cell_heights.tolist(), [4, 4, 4, 0])
+
+    def test_grid_with_empty_cells(self):
+        layout = BarArrayLayout(width=8, height=8, count=3, columns=2)
+        self.assertEqual((layout.rows, layout.columns), (2, 2))
+        # Last cell of the second row has no value
+        self.assertEqual(layout.index[:, 0].tolist(), [0, 0, 0, 3, 2, 2, 2, 2])
+        self.assertEqual(layout.index[7].tolist(), [2, 2, 2, 3, 3, 3, 3, 3])
+
+    def test_small_cells_without_gaps(self):
+        layout = BarArrayLayout(width=4, height=2, count=4, columns=0)
+        self.assertEqual(layout.index[0].tolist(), [0, 1, 2, 3])
+        self.assertTrue(layout.inside.all())
+
+    def test_bars_grow_from_bottom(self):
+        layout = BarArrayLayout(width=2, height=4, count=2, columns=0)
+        background = np.zeros((4, 2, 4), dtype=np.uint8)
+        pixels = layout.draw(background, np.array([0.5, 1.0]), RED)
+        self.assertEqual(pixels[:, :, 0].tolist(), [[0, 255], [0, 255], [255, 255], [255, 255]])
+        self.assertFalse(background.any())
+
+    def test_heatmap(self):
+        layout = BarArrayLayout(width=2, height=1, count=2, columns=0)
+        pixels = layout.draw(np.zeros((1, 2, 4), dtype=np.uint8), np.array([0.0, 0.5]), RED, low_color=BLUE)
+        self.assertEqual(pixels[0].tolist(), [[0, 0, 255, 255], [128, 0, 128, 255]])
+
+    def test_invalid_ratios(self):
+        layout = BarArrayLayout(width=3, height=2, count=3, columns=0)
+        pixels = layout.draw(np.zeros((2, 3, 4), dtype=np.uint8), np.array([np.nan, -1, 2]), RED)
+        self.assertEqual(pixels[:, :, 0].tolist(), [[0, 0, 255], [0, 0, 255]])
+
+
+class TestDisplayBarArray(unittest.TestCase):
+    def test_bars_on_background_color(self):
+        lcd = RecordingPatchLcdCommRevA()
+        lcd.DisplayBarArray(10, 20, 8, 10, [0, 50, 100], columns=0, bar_color=RED, background_color=BLUE)
+        pixels = np.asarray(lcd.patch)
+        self.assertEqual(pixels.shape, (10, 8, 4))
+        self.assertEqual(pixels[:, 0, :3].tolist(), [list(BLUE)] * 10)
+        self.assertEqual(pixels[:, 3, :3].tolist(), [list(BLUE)] * 5 + [list(RED)] * 5)
+        self.assertEqual(pixels[:, 6, :3].tolist(), [list(RED)] * 10)
+
+    def test_heatmap_from_background_color(self):
+        lcd = RecordingPatchLcdCommRevA()
+        lcd.DisplayBarArray(0, 0, 2, 2, [1000, 3000], min_value=1000, max_value=3000, bar_color=RED, heatmap=True,
+                            background_color=BLUE)
+        self.assertEqual(np.asarray(lcd.patch)[0, :, :3].tolist(), [list(BLUE), list(RED)])
+
+    def test_no_values(self):
+        lcd = RecordingPatchLcdCommRevA()
+        lcd.patch = None
+        lcd.DisplayBarArray(0, 0, 10, 10, [])
+        self.assertIsNone(lcd.patch)
+
+
+@unittest.skipUnless(BENCHMARK, "set BENCHMARK=1 to run benchmarks")
+class BenchmarkBarArray(unittest.TestCase):
+    def test_benchmark_cores_count(self):
+        # Drawing cost depends on the widget size, not on the number of cores
+        lcd = RecordingPatchLcdCommRevA()
+        for cores in [4, 16, 64, 256]:
+            values = np.random.uniform(0, 100, cores)
+            for heatmap in [False, True]:
+                duration = timeit.timeit(lambda: lcd.DisplayBarArray(10, 20, 300, 100, values, columns=16,
+                                                                      bar_color=RED, heatmap=heatmap), number=200)
+                print(f"\n{cores} cores{' heatmap' if heatmap else ''} 300x100: {duration / 200 * 1000000:.0f} us/update")
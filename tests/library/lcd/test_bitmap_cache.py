@@ -0,0 +1,88 @@
+import os
+import unittest
+
+from PIL import Image, ImageDraw
+
+from library.lcd.bitmap_cache import BitmapCache
+
+from .test_framebuffer import RecordingLcdCommRevA
+
+
+class TestBitmapCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = BitmapCache(1000)
+        bitmap = Image.new("RGB", (10, 10))
+        self.assertIsNone(cache.get("a"))
+
+        cache.put("a", bitmap, 1, 2)
+        self.assertEqual(cache.get("a"), (bitmap, 1, 2))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = BitmapCache(1000)
+        for key in "abc":
+            cache.put(key, Image.new("RGB", (10, 10)), 0, 0)  # 300 bytes each
+        cache.get("a")
+        cache.put("d", Image.new("RGB", (10, 10)), 0, 0)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.bytes, 900)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_too_big_bitmap_is_not_cached(self):
+        cache = BitmapCache(1000)
+        cache.put("a", Image.new("RGB", (100, 100)), 0, 0)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.bytes, 0)
+
+
+class TestDisplayTextCache(unittest.TestCase):
+    def test_repeated_text_is_not_rendered_again(self):
+        lcd = RecordingLcdCommRevA()
+        lcd.DisplayText("42%", 10, 10)
+        lcd.DisplayText("43%", 10, 10)
+        lcd.DisplayText("42%", 10, 10)
+        self.assertEqual((lcd.text_cache.hits, lcd.text_cache.misses), (1, 2))
+
+        # Cached text is displayed the same way as a rendered one
+        reference = RecordingLcdCommRevA()
+        reference.DisplayText("42%", 10, 10)
+        self.assertEqual(lcd.displayed[0], reference.displayed[0])
+        self.assertTrue((lcd.shadow_framebuffer.pixels == reference.shadow_framebuffer.pixels).all())
+
+
+class TestDisplayTextOnBackground(unittest.TestCase):
+    background = os.path.join(os.path.dirname(__file__), "..", "..", "..", "res", "themes", "3.5inchTheme2",
+                              "background.png")
+
+    def test_text_is_drawn_on_background_area(self):
+        lcd = RecordingLcdCommRevA()
+        lcd.DisplayText("42%", 100, 200, font_size=30, font_color=(255, 0, 0), background_image=self.background)
+        x, y, width, height = lcd.displayed[0]
+
+        # Same as drawing the text on the whole background
+        reference = Image.open(self.background).convert("RGBA")
+        d = ImageDraw.Draw(reference)
+        d.text((100, 200), "42%", font=lcd.open_font(
+            "./res/fonts/roboto-mono/RobotoMono-Regular.ttf", 30), fill=(255, 0, 0), anchor="la")
+        expected = reference.crop((x, y, x + width, y + height))
+        self.assertEqual(lcd.shadow_framebuffer.crop((x, y, x + width, y + height)).tobytes(), expected.tobytes())
+
+
+class TestRadialLayerCache(unittest.TestCase):
+    def draw(self, lcd, value):
+        lcd.DisplayRadialProgressBar(100, 100, 50, 10, value=value, angle_start=30, angle_end=330, angle_sep=5,
+                                     angle_steps=10, bar_color=(255, 0, 0), draw_bar_background=True,
+                                     bar_background_color=(50, 50, 50), bar_decoration="Ellipse")
+
+    def test_static_layer_is_drawn_once(self):
+        lcd = RecordingLcdCommRevA()
+        self.draw(lcd, 20)
+        self.draw(lcd, 75)
+        self.assertEqual((lcd.radial_layer_cache.hits, lcd.radial_layer_cache.misses), (1, 1))
+
+        # Bar drawn on the cached layer is the same as a bar drawn from scratch
+        reference = RecordingLcdCommRevA()
+        self.draw(reference, 75)
+        self.assertTrue((lcd.shadow_framebuffer.pixels == reference.shadow_framebuffer.pixels).all())
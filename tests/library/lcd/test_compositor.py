@@ -0,0 +1,23 @@
+import unittest
+
+from library.lcd.compositor import merge_boxes
+
+
+class TestMergeBoxes(unittest.TestCase):
+    def test_close_boxes_are_merged(self):
+        self.assertEqual(merge_boxes([(0, 0, 40, 20), (42, 0, 80, 20)]), [(0, 0, 80, 20)])
+
+    def test_distant_boxes_are_kept(self):
+        boxes = [(0, 0, 40, 20), (200, 300, 240, 320)]
+        self.assertEqual(sorted(merge_boxes(boxes)), boxes)
+
+    def test_merges_are_chained(self):
+        boxes = [(0, 0, 10, 10), (12, 0, 22, 10), (24, 0, 34, 10), (36, 0, 46, 10)]
+        self.assertEqual(merge_boxes(boxes), [(0, 0, 46, 10)])
+
+    def test_merge_can_be_refused(self):
+        boxes = [(0, 0, 40, 20), (42, 0, 80, 20)]
+        self.assertEqual(sorted(merge_boxes(boxes, can_merge=lambda box: False)), boxes)
+
+    def test_empty_boxes_are_ignored(self):
+        self.assertEqual(merge_boxes([(0, 0, 0, 10), (5, 5, 10, 10)]), [(5, 5, 10, 10)])
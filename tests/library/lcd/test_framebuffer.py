@@ -0,0 +1,184 @@
+import threading
+import unittest
+
+from PIL import Image
+
+from library.lcd.framebuffer import ShadowFramebuffer
+from library.lcd.lcd_comm_rev_a import LcdCommRevA, Orientation
+from library.lcd.update_queue import UpdateQueue
+
+from .serial_mock import new_testing_serial
+from .sample_image import generate_sample_image
+
+
+class RecordingLcdCommRevA(LcdCommRevA):
+    def openSerial(self):
+        self.lcd_serial = new_testing_serial()
+        self.displayed = []
+
+    def DisplayPILImage(self, image, x=0, y=0, image_width=0, image_height=0):
+        self.displayed.append((x, y, image.size[0], image.size[1]))
+        LcdCommRevA.DisplayPILImage(self, image, x, y, image_width, image_height)
+
+
+class PanelLcdCommRevA(RecordingLcdCommRevA):
+    # Queued bitmaps are painted on an image of the panel when the queue is run
+    def __init__(self):
+        RecordingLcdCommRevA.__init__(self, update_queue=UpdateQueue())
+        self.panel = Image.new("RGB", (self.get_width(), self.get_height()))
+
+    def DisplayPILImage(self, image, x=0, y=0, image_width=0, image_height=0):
+        self.displayed.append((x, y, image.size[0], image.size[1]))
+        with self.Transaction(region=(x, y, image.size[0], image.size[1])):
+            self.SendRequest(self.panel.paste, [image.copy(), (x, y)])
+
+    def run_queue(self):
+        while not self.update_queue.empty():
+            f, args = self.update_queue.get()
+            if f:
+                f(*args)
+
+
+class TestShadowFramebuffer(unittest.TestCase):
+    def test_unknown_content_is_sent_entirely(self):
+        shadow = ShadowFramebuffer(320, 480)
+        image = generate_sample_image(100, 50)
+
+        self.assertEqual(shadow.update(image, 10, 20), [(0, 0, 100, 50)])
+
+    def test_same_content_is_not_sent(self):
+        shadow = ShadowFramebuffer(320, 480)
+        image = generate_sample_image(100, 50)
+        shadow.update(image, 10, 20)
+
+        self.assertEqual(shadow.update(image.copy(), 10, 20), [])
+
+    def test_only_changed_area_is_sent(self):
+        shadow = ShadowFramebuffer(320, 480)
+        image = generate_sample_image(100, 50)
+        shadow.update(image, 10, 20)
+
+        image = image.copy()
+        image.putpixel((30, 12), (1, 2, 3))
+        image.putpixel((35, 14), (1, 2, 3))
+        self.assertEqual(shadow.update(image, 10, 20), [(30, 12, 36, 15)])
+
+    def test_distant_changes_are_sent_separately(self):
+        shadow = ShadowFramebuffer(320, 480)
+        image = Image.new("RGB", (100, 100), (255, 255, 255))
+        shadow.update(image, 0, 0)
+
+        image = image.copy()
+        image.putpixel((5, 2), (0, 0, 0))
+        image.putpixel((90, 95), (0, 0, 0))
+        self.assertEqual(shadow.update(image, 0, 0), [(5, 2, 6, 3), (90, 95, 91, 96)])
+
+    def test_invalidate(self):
+        shadow = ShadowFramebuffer(320, 480)
+        image = generate_sample_image(100, 50)
+        shadow.update(image, 10, 20)
+        shadow.invalidate()
+
+        self.assertEqual(shadow.update(image, 10, 20), [(0, 0, 100, 50)])
+
+
+class TestDisplayPatch(unittest.TestCase):
+    def test_unchanged_text_is_not_sent(self):
+        lcd = RecordingLcdCommRevA()
+        lcd.DisplayText("42%", 10, 10)
+        self.assertEqual(len(lcd.displayed), 1)
+
+        lcd.DisplayText("42%", 10, 10)
+        self.assertEqual(len(lcd.displayed), 1)
+
+    def test_changed_text_sends_changed_area_only(self):
+        lcd = RecordingLcdCommRevA()
+        lcd.DisplayText("142%", 10, 10)
+        full_x, full_y, full_width, full_height = lcd.displayed[0]
+
+        lcd.DisplayText("143%", 10, 10)
+        x, y, width, height = lcd.displayed[1]
+        self.assertGreater(x, full_x)
+        self.assertLess(width, full_width)
+
+    def test_orientation_change_invalidates_content(self):
+        lcd = RecordingLcdCommRevA()
+        lcd.DisplayText("42%", 10, 10)
+        lcd.SetOrientation(Orientation.PORTRAIT)
+
+        lcd.DisplayText("42%", 10, 10)
+        self.assertEqual(len(lcd.displayed), 2)
+
+
+class TestFrame(unittest.TestCase):
+    def test_close_changes_are_sent_as_one_bitmap(self):
+        lcd = RecordingLcdCommRevA()
+        lcd.DisplayPatch(Image.new("RGB", (100, 20), (255, 255, 255)), 0, 0)
+
+        with lcd.Frame():
+            lcd.DisplayText("1", 0, 0, font_size=10, background_color=(255, 255, 255))
+            lcd.DisplayText("2", 30, 0, font_size=10, background_color=(255, 255, 255))
+        self.assertEqual(len(lcd.displayed), 2)
+        x, y, width, height = lcd.displayed[1]
+        self.assertLess(x, 10)
+        self.assertGreater(x + width, 30)
+
+    def test_unknown_content_is_not_merged(self):
+        lcd = RecordingLcdCommRevA()
+        with lcd.Frame():
+            lcd.DisplayText("1", 0, 0, font_size=10)
+            lcd.DisplayText("2", 30, 0, font_size=10)
+        self.assertEqual(len(lcd.displayed), 2)
+
+    def test_nested_frames(self):
+        lcd = RecordingLcdCommRevA()
+        lcd.DisplayPatch(Image.new("RGB", (100, 20), (255, 255, 255)), 0, 0)
+
+        with lcd.Frame():
+            with lcd.Frame():
+                lcd.DisplayText("1", 0, 0, font_size=10, background_color=(255, 255, 255))
+            self.assertEqual(len(lcd.displayed), 1)
+            lcd.DisplayText("2", 30, 0, font_size=10, background_color=(255, 255, 255))
+        self.assertEqual(len(lcd.displayed), 2)
+
+    def test_concurrent_frames(self):
+        # Frame of thread A is merged in a box covering the widget of thread B. B changes its widget after A has cut its
+        # box from the shadow framebuffer: A's box, with the old widget of B, must not be sent after B's widget
+        lcd = PanelLcdCommRevA()
+        lcd.DisplayPatch(Image.new("RGB", (100, 20), (255, 255, 255)), 0, 0)
+        lcd.run_queue()
+
+        shadow = lcd.shadow_framebuffer
+        crop = shadow.crop
+        cropped = threading.Event()
+        b_done = threading.Event()
+
+        def crop_then_wait(box):
+            image = crop(box)
+            if threading.current_thread().name == "A":
+                cropped.set()
+                b_done.wait(0.5)
+            return image
+
+        shadow.crop = crop_then_wait
+
+        def frame_a():
+            with lcd.Frame():
+                lcd.DisplayPatch(Image.new("RGB", (10, 10), (255, 0, 0)), 0, 0)
+                lcd.DisplayPatch(Image.new("RGB", (10, 10), (255, 0, 0)), 30, 0)
+
+        def frame_b():
+            cropped.wait(5)
+            lcd.DisplayPatch(Image.new("RGB", (10, 10), (0, 0, 255)), 15, 0)
+            b_done.set()
+
+        threads = [threading.Thread(target=frame_a, name="A"), threading.Thread(target=frame_b, name="B")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertIn((0, 0, 40, 10), lcd.displayed)
+
+        lcd.run_queue()
+        self.assertEqual(lcd.panel.getpixel((20, 5)), (0, 0, 255))
+        self.assertEqual(lcd.panel.getpixel((5, 5)), (255, 0, 0))
@@ -0,0 +1,60 @@
+import unittest
+
+from library.lcd.governor import BandwidthGovernor, MIN_RUN_RATIO
+
+from .test_lcd_comm import QueuedLcdCommRevA
+from .sample_image import generate_sample_image
+
+
+def run_count(governor, task, refreshes=100):
+    return len([i for i in range(refreshes) if governor.allow(task)])
+
+
+class TestBandwidthGovernor(unittest.TestCase):
+    def governor(self, clock_bytes=5000, graph_bytes=20000):
+        # Link carries 10 kB/s, clock and graph are refreshed every second
+        governor = BandwidthGovernor(budget_ratio=1.0)
+        governor.register("clock", 1, priority=1)
+        governor.register("graph", 1, priority=0)
+        governor.record_transfer(10000, 1.0)
+        governor.record_frame("clock", clock_bytes)
+        governor.record_frame("graph", graph_bytes)
+        return governor
+
+    def test_no_limit_before_throughput_is_measured(self):
+        governor = BandwidthGovernor()
+        governor.register("graph", 1)
+        governor.record_frame("graph", 1000000)
+        self.assertEqual(run_count(governor, "graph"), 100)
+
+    def test_throughput(self):
+        governor = BandwidthGovernor()
+        governor.record_transfer(1000, 0.1)
+        self.assertIsNone(governor.throughput)
+
+        governor.record_transfer(4000, 0.4)
+        self.assertAlmostEqual(governor.throughput, 10000)
+
+    def test_no_limit_within_budget(self):
+        governor = self.governor(graph_bytes=4000)
+        self.assertFalse(governor.oversubscribed)
+        self.assertEqual(run_count(governor, "graph"), 100)
+
+    def test_lower_priority_is_degraded_first(self):
+        governor = self.governor()
+        self.assertTrue(governor.oversubscribed)
+        self.assertEqual(run_count(governor, "clock"), 100)
+        # Graph gets the 5 kB/s left by the clock
+        self.assertEqual(run_count(governor, "graph"), 25)
+        self.assertEqual(governor.tasks["graph"].skipped, 75)
+
+    def test_degraded_task_still_runs(self):
+        governor = self.governor(clock_bytes=10000)
+        self.assertEqual(run_count(governor, "graph"), 100 * MIN_RUN_RATIO)
+
+    def test_frame_bytes_are_recorded(self):
+        lcd = QueuedLcdCommRevA()
+        lcd.governor.register("graph", 1)
+        with lcd.Frame(task="graph"):
+            lcd.DisplayPatch(generate_sample_image(100, 50), 10, 20)
+        self.assertEqual(lcd.governor.tasks["graph"].frame_bytes, 6 + 100 * 50 * 2)
@@ -0,0 +1,119 @@
+import math
+import queue
+import unittest
+from unittest.mock import patch
+
+from library.lcd.lcd_comm_rev_a import LcdCommRevA
+from library.lcd.update_queue import UpdateQueue
+
+from .serial_mock import new_testing_serial, BENCHMARK
+from .sample_image import generate_sample_image
+
+
+class QueuedLcdCommRevA(LcdCommRevA):
+    def __init__(self, update_queue=None):
+        LcdCommRevA.__init__(self, update_queue=update_queue or queue.Queue())
+
+    def openSerial(self):
+        self.lcd_serial = new_testing_serial()
+
+    def run_queue(self):
+        while not self.update_queue.empty():
+            f, args = self.update_queue.get()
+            if f:
+                f(*args)
+
+    def written(self):
+        return [args[0] for method, args, _ in self.lcd_serial.mock_calls if method == "write"]
+
+
+@unittest.skipIf(BENCHMARK, "serial writes are not recorded in benchmark mode")
+class TestTransaction(unittest.TestCase):
+    def test_bitmap_is_queued_as_one_request(self):
+        lcd = QueuedLcdCommRevA()
+        lcd.DisplayPILImage(generate_sample_image(100, 50), 10, 20)
+        self.assertEqual(lcd.update_queue.qsize(), 1)
+
+        # Bitmap data is written from its buffer without being copied, after the command
+        lcd.run_queue()
+        self.assertEqual([len(line) for line in lcd.written()], [6, 100 * 50 * 2])
+
+    def test_bitmap_lines_are_flushed_on_macos(self):
+        lcd = QueuedLcdCommRevA()
+        with patch("platform.system", return_value="Darwin"):
+            lcd.DisplayPILImage(generate_sample_image(100, 50), 10, 20)
+            lcd.run_queue()
+        calls = [method for method, _, _ in lcd.lcd_serial.mock_calls if method in ("write", "flush")]
+        self.assertEqual(calls, ["write", "flush"] * (1 + math.ceil(100 * 50 * 2 / (320 * 8))))
+
+    def test_requests_outside_transaction_are_queued_separately(self):
+        lcd = QueuedLcdCommRevA()
+        lcd.SendLine(b"\x01")
+        lcd.SendLine(b"\x02")
+        self.assertEqual(lcd.update_queue.qsize(), 2)
+
+        lcd.run_queue()
+        self.assertEqual(lcd.written(), [b"\x01", b"\x02"])
+
+    def test_nested_transactions(self):
+        lcd = QueuedLcdCommRevA()
+        with lcd.Transaction():
+            lcd.SendLine(b"\x01")
+            with lcd.Transaction():
+                lcd.SendLine(b"\x02")
+            lcd.SendLine(b"\x03")
+        self.assertEqual(lcd.update_queue.qsize(), 1)
+
+        lcd.run_queue()
+        self.assertEqual(lcd.written(), [b"\x01\x02\x03"])
+
+    def test_other_requests_keep_their_order(self):
+        lcd = QueuedLcdCommRevA()
+        calls = []
+        with lcd.Transaction():
+            lcd.SendLine(b"\x01")
+            lcd.SendLine(b"\x02")
+            lcd.SendRequest(lambda: calls.append(len(lcd.written())), [])
+            lcd.SendLine(b"\x03")
+
+        lcd.run_queue()
+        self.assertEqual(calls, [1])
+        self.assertEqual(lcd.written(), [b"\x01\x02", b"\x03"])
+
+    def test_write_counters(self):
+        lcd = QueuedLcdCommRevA()
+        lcd.DisplayPILImage(generate_sample_image(100, 50), 10, 20)
+        lcd.DisplayPILImage(generate_sample_image(10, 10), 10, 20)
+        lcd.run_queue()
+
+        self.assertEqual(lcd.write_counters.frames, 2)
+        self.assertEqual(lcd.write_counters.writes, 4)
+        self.assertEqual(lcd.write_counters.writes_per_frame(), 2)
+        self.assertEqual(lcd.write_counters.bytes_per_write(), (6 + 100 * 50 * 2 + 6 + 10 * 10 * 2) / 4)
+
+    def test_pending_update_is_superseded(self):
+        lcd = QueuedLcdCommRevA(UpdateQueue())
+        lcd.DisplayText("41%", 10, 10)
+        lcd.DisplayText("42%", 10, 10)
+        lcd.DisplayText("52%", 10, 10)
+        self.assertEqual(lcd.update_queue.stats.superseded, 2)
+
+        # One bitmap: its command and its data
+        lcd.run_queue()
+        self.assertEqual(len(lcd.written()), 2)
+
+        # Only the last update is sent, but it must cover the area of the superseded ones
+        reference = QueuedLcdCommRevA()
+        reference.DisplayText("52%", 10, 10)
+        reference.run_queue()
+        self.assertEqual(lcd.written(), reference.written())
+
+    def test_superseded_update_releases_its_buffer(self):
+        lcd = QueuedLcdCommRevA(UpdateQueue())
+        lcd.DisplayText("41%", 10, 10)
+        lcd.DisplayText("42%", 10, 10)
+        lcd.DisplayText("52%", 10, 10)
+
+        # Bitmap buffers of the superseded updates go back to the pool too
+        lcd.run_queue()
+        self.assertEqual(len(lcd.buffer_pool.free_buffers), 3)
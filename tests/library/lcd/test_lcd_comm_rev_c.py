@@ -1,12 +1,20 @@
 import unittest
 
-from library.lcd.lcd_comm_rev_c import LcdCommRevC, Orientation
+from library.lcd.lcd_comm_rev_c import LcdCommRevC, Orientation, SubRevision, Count
 
 from .serial_mock import new_testing_serial
 from .sample_image import generate_sample_image
 
 
 class MockedLcdCommRevC(LcdCommRevC):
+    def __init__(self, rom_version: int = 87):
+        LcdCommRevC.__init__(self)
+        # Normally detected from the answer of the display to the HELLO command (see InitializeComm)
+        self.sub_revision = SubRevision.REV_5INCH
+        self.rom_version = rom_version
+        # Updates are numbered: start from the same number in each test
+        Count.Start = 0
+
     def openSerial(self):
         self.lcd_serial = new_testing_serial()
 
@@ -82,3 +90,19 @@ class TestLcdCommRevC(unittest.TestCase):
         lcd.DisplayPILImage(sample_img_landscape, x=10, y=20, image_width=100, image_height=200)
 
         lcd.expect_golden(self, "rev_c_display_pil_image_patch_reverse_landscape")
+
+    def test_display_small_pil_image_patch(self):
+        # Image data smaller than the 250-byte packets
+        lcd = MockedLcdCommRevC()
+        lcd.SetOrientation(orientation=Orientation.LANDSCAPE)
+        lcd.DisplayPILImage(sample_img_landscape, x=10, y=20, image_width=10, image_height=5)
+
+        lcd.expect_golden(self, "rev_c_display_small_pil_image_patch")
+
+    def test_display_pil_image_patch_bgra(self):
+        # Recent ROM versions use 4-byte BGRA pixels instead of compressed 3-byte BGRA
+        lcd = MockedLcdCommRevC(rom_version=89)
+        lcd.SetOrientation(orientation=Orientation.LANDSCAPE)
+        lcd.DisplayPILImage(sample_img_landscape, x=10, y=20, image_width=100, image_height=200)
+
+        lcd.expect_golden(self, "rev_c_display_pil_image_patch_bgra")
@@ -0,0 +1,54 @@
+import math
+import random
+import unittest
+
+import numpy as np
+
+from .test_progress_bar import RecordingPatchLcdCommRevA
+
+
+class TestScrollingLineGraph(unittest.TestCase):
+    def compare_with_full_redraw(self, width, history_size, line_width, autoscale=False, graph_axis=True):
+        random.seed(width + history_size + line_width)
+        lcd = RecordingPatchLcdCommRevA()
+        reference = RecordingPatchLcdCommRevA()
+        values = [math.nan] * history_size
+        for i in range(history_size * 3):
+            values = values[1:] + [random.uniform(20, 80) if i % 7 else 150]
+            args = dict(x=10, y=20, width=width, height=50, values=values, autoscale=autoscale,
+                        line_color=(255, 0, 0), line_width=line_width, graph_axis=graph_axis,
+                        background_color=(0, 0, 40))
+            lcd.DisplayLineGraph(scrolling=True, **args)
+            reference.DisplayLineGraph(**args)
+            self.assertTrue(np.array_equal(np.asarray(lcd.patch.convert("RGBA")),
+                                           np.asarray(reference.patch.convert("RGBA"))), (i, args))
+
+    def test_same_as_full_redraw(self):
+        for line_width in [1, 2, 3]:
+            self.compare_with_full_redraw(100, 10, line_width)
+            self.compare_with_full_redraw(100, 50, line_width, graph_axis=False)
+
+    def test_same_as_full_redraw_with_small_step(self):
+        # Step of 1 pixel, smaller than the line width: line pixels clipped at the right edge come into the graph
+        for line_width in [2, 3, 4]:
+            self.compare_with_full_redraw(100, 100, line_width)
+            self.compare_with_full_redraw(100, 50, line_width, graph_axis=False)
+
+    def test_same_as_full_redraw_with_fractional_step(self):
+        self.compare_with_full_redraw(133, 10, 2)
+
+    def test_same_as_full_redraw_with_autoscale(self):
+        self.compare_with_full_redraw(100, 20, 2, autoscale=True)
+
+    def test_only_new_segment_is_sent_while_history_fills(self):
+        lcd = RecordingPatchLcdCommRevA()
+        lcd.DisplayLineGraph(10, 20, 100, 50, values=[math.nan] * 8 + [50, 50], line_color=(255, 0, 0),
+                             graph_axis=False, scrolling=True)
+        plot = lcd.line_graphs[(10, 20, 100, 50)]
+        before = np.asarray(plot.mask).copy()
+
+        lcd.DisplayLineGraph(10, 20, 100, 50, values=[math.nan] * 7 + [50, 50, 60], line_color=(255, 0, 0),
+                             graph_axis=False, scrolling=True)
+        changed_columns = np.flatnonzero((np.asarray(plot.mask) != before).any(axis=0))
+        self.assertGreaterEqual(changed_columns.min(), 9)
+        self.assertLessEqual(changed_columns.max(), 21)
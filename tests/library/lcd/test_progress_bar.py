@@ -0,0 +1,73 @@
+import copy
+import os
+import timeit
+import unittest
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .serial_mock import BENCHMARK
+from .test_framebuffer import RecordingLcdCommRevA
+
+BACKGROUND = os.path.join(os.path.dirname(__file__), "..", "..", "..", "res", "themes", "3.5inchTheme2",
+                          "background.png")
+
+
+def reference_progress_bar(x, y, width, height, value, bar_color, bar_outline, background_color, background_image):
+    # Progress bar drawn with PIL, as DisplayProgressBar used to do (background_image is a loaded image)
+    if background_image is None:
+        bar_image = Image.new('RGB', (width, height), background_color)
+    else:
+        bar_image = copy.copy(background_image).crop(box=(x, y, x + width, y + height))
+    bar_filled_width = (value / 100 * width) - 1
+    if bar_filled_width < 0:
+        bar_filled_width = 0
+    draw = ImageDraw.Draw(bar_image)
+    draw.rectangle([0, 0, bar_filled_width, height - 1], fill=bar_color, outline=bar_color)
+    if bar_outline:
+        draw.rectangle([0, 0, width - 1, height - 1], fill=None, outline=bar_color)
+    return bar_image
+
+
+class RecordingPatchLcdCommRevA(RecordingLcdCommRevA):
+    def DisplayPatch(self, image, x=0, y=0):
+        self.patch = image
+
+
+class TestProgressBar(unittest.TestCase):
+    def test_same_as_drawn_with_pil(self):
+        lcd = RecordingPatchLcdCommRevA()
+        for width, height in [(1, 5), (7, 3), (100, 12)]:
+            for bar_outline in [False, True]:
+                for background_image in [None, BACKGROUND]:
+                    for value in [0, 1, 5, 33, 50, 99, 100]:
+                        args = dict(x=10, y=20, width=width, height=height, value=value, bar_color=(255, 0, 0),
+                                    bar_outline=bar_outline, background_color=(0, 0, 255),
+                                    background_image=background_image)
+                        lcd.DisplayProgressBar(**args)
+                        if background_image:
+                            args["background_image"] = Image.open(background_image)
+                        expected = reference_progress_bar(**args).convert("RGBA")
+                        self.assertTrue(np.array_equal(np.asarray(lcd.patch.convert("RGBA")), np.asarray(expected)),
+                                        args)
+
+
+@unittest.skipUnless(BENCHMARK, "set BENCHMARK=1 to run benchmarks")
+class BenchmarkProgressBar(unittest.TestCase):
+    def benchmark(self, name, fn, width, height, number=200):
+        duration = timeit.timeit(lambda: [fn(value) for value in range(0, 100, 10)], number=number) / number / 10
+        print(f"\n{name} {width}x{height}: {duration * 1000000:.0f} us/update")
+
+    def test_benchmark_progress_bar(self):
+        lcd = RecordingPatchLcdCommRevA()
+        background = Image.open(BACKGROUND)
+        background.load()
+        for width, height in [(50, 5), (200, 20), (300, 60)]:
+            for background_image in [None, BACKGROUND]:
+                suffix = " on background" if background_image else ""
+                self.benchmark("PIL drawing" + suffix, lambda value: reference_progress_bar(
+                    10, 20, width, height, value, (255, 0, 0), True, (0, 0, 255), background if background_image else None),
+                               width, height)
+                self.benchmark("DisplayProgressBar" + suffix, lambda value: lcd.DisplayProgressBar(
+                    10, 20, width, height, value=value, bar_color=(255, 0, 0), bar_outline=True,
+                    background_color=(0, 0, 255), background_image=background_image), width, height)
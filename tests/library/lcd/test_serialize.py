@@ -0,0 +1,128 @@
+import timeit
+import unittest
+
+from PIL import Image
+
+from library.lcd.serialize import image_to_RGB565, image_to_BGR, image_to_BGRA, image_to_compressed_BGRA, \
+    BufferPool, chunked, join_chunks, joined_chunks_size, merge_views
+
+from .serial_mock import BENCHMARK
+from .sample_image import generate_sample_image
+
+
+def reference_image_to_compressed_BGRA(image: Image.Image) -> (bytes, int):
+    # Original per-pixel implementation, used as a reference for the vectorized one
+    compressed_bgra = bytearray()
+    image_data = image.convert("RGBA").load()
+    for h in range(image.height):
+        for w in range(image.width):
+            pixel = image_data[w, h]
+            a = pixel[3] >> 4
+            compressed_bgra.append(pixel[2] & 0xFC | a >> 2)
+            compressed_bgra.append(pixel[1] & 0xFC | a & 2)
+            compressed_bgra.append(pixel[0])
+    return bytes(compressed_bgra), 3
+
+
+def generate_sample_image_with_alpha(width, height):
+    img = generate_sample_image(width, height).convert("RGBA")
+    alpha = Image.linear_gradient("L").resize((width, height))
+    img.putalpha(alpha)
+    return img
+
+
+class TestSerialize(unittest.TestCase):
+    def test_compressed_bgra_rgb_image(self):
+        img = generate_sample_image(37, 23)
+        self.assertEqual(image_to_compressed_BGRA(img), reference_image_to_compressed_BGRA(img))
+
+    def test_compressed_bgra_rgba_image(self):
+        img = generate_sample_image_with_alpha(64, 48)
+        self.assertEqual(image_to_compressed_BGRA(img), reference_image_to_compressed_BGRA(img))
+
+    def test_compressed_bgra_palette_image(self):
+        img = generate_sample_image(20, 10).convert("P")
+        self.assertEqual(image_to_compressed_BGRA(img), reference_image_to_compressed_BGRA(img))
+
+    def test_serialize_in_buffer(self):
+        img = generate_sample_image_with_alpha(37, 23)
+        buffer = bytearray(37 * 23 * 4 + 10)
+
+        self.assertEqual(image_to_RGB565(img, "big", out=buffer), image_to_RGB565(img, "big"))
+        self.assertEqual(image_to_RGB565(img, "little", out=buffer), image_to_RGB565(img, "little"))
+        self.assertEqual(image_to_BGR(img, out=buffer), image_to_BGR(img))
+        self.assertEqual(image_to_BGRA(img, out=buffer), image_to_BGRA(img))
+        self.assertEqual(image_to_compressed_BGRA(img, out=buffer), image_to_compressed_BGRA(img))
+
+    def test_chunked(self):
+        self.assertEqual([bytes(c) for c in chunked(b"abcdefg", 3)], [b"abc", b"def", b"g"])
+
+    def test_merge_views(self):
+        buffer = bytearray(b"abcdefg")
+        first, second, third = chunked(memoryview(buffer)[:6], 2)
+        self.assertEqual(bytes(merge_views(merge_views(first, second), third)), b"abcdef")
+        self.assertIs(merge_views(first, second).obj, buffer)
+        # Not consecutive, or not in the same buffer
+        self.assertIsNone(merge_views(first, third))
+        self.assertIsNone(merge_views(second, first))
+        self.assertIsNone(merge_views(first, memoryview(bytearray(b"cd"))))
+        self.assertIsNone(merge_views(first, b"cd"))
+
+    def test_join_chunks(self):
+        for size in [1, 62, 63, 64, 126, 127, 500]:
+            data = bytes(i % 256 for i in range(size))
+            for chunk_size, header, separator in [(63, b"\x50", b""), (249, b"", b"\x00"), (10, b"ab", b"cde")]:
+                expected = separator.join(header + c for c in chunked(data, chunk_size))
+                self.assertEqual(joined_chunks_size(size, chunk_size, len(header), len(separator)), len(expected))
+
+                buffer = bytearray(len(expected))
+                joined = join_chunks(data, chunk_size, out=buffer, header=header, separator=separator)
+                self.assertEqual(joined, expected)
+
+
+class TestBufferPool(unittest.TestCase):
+    def test_released_buffer_is_reused(self):
+        pool = BufferPool()
+        buffer = pool.acquire(100)
+        pool.release(buffer)
+
+        self.assertIs(pool.acquire(50).obj, buffer.obj)
+        self.assertIsNot(pool.acquire(50).obj, buffer.obj)
+
+    def test_smallest_fitting_buffer_is_used(self):
+        pool = BufferPool()
+        small, big = pool.acquire(10), pool.acquire(1000)
+        pool.release(big)
+        pool.release(small)
+
+        self.assertIs(pool.acquire(5).obj, small.obj)
+        self.assertIs(pool.acquire(20).obj, big.obj)
+        self.assertEqual(len(pool.acquire(2000)), 2000)
+
+    def test_free_buffers_are_limited(self):
+        pool = BufferPool(max_free_buffers=2)
+        buffers = [pool.acquire(size) for size in (10, 30, 20)]
+        for buffer in buffers:
+            pool.release(buffer)
+
+        self.assertEqual(sorted(len(b) for b in pool.free_buffers), [20, 30])
+
+
+@unittest.skipUnless(BENCHMARK, "set BENCHMARK environment variable to run serialization benchmarks")
+class BenchmarkSerialize(unittest.TestCase):
+    def benchmark(self, name, fn, img, number):
+        duration = timeit.timeit(lambda: fn(img), number=number) / number
+        print(f"\n{name} {img.size[0]}x{img.size[1]}: {duration * 1000000:.0f} us")
+
+    def test_benchmark_serialize(self):
+        # A text widget and a full 5" screen
+        for width, height in [(100, 30), (480, 800)]:
+            img = generate_sample_image_with_alpha(width, height)
+            self.benchmark("image_to_RGB565", lambda i: image_to_RGB565(i, "little"), img, 50)
+            self.benchmark("image_to_BGR", image_to_BGR, img, 50)
+            self.benchmark("image_to_BGRA", image_to_BGRA, img, 50)
+            self.benchmark("image_to_compressed_BGRA", image_to_compressed_BGRA, img, 50)
+            buffer = bytearray(width * height * 4)
+            self.benchmark("image_to_RGB565 (buffer)", lambda i: image_to_RGB565(i, "little", out=buffer), img, 50)
+            self.benchmark("image_to_BGRA (buffer)", lambda i: image_to_BGRA(i, out=buffer), img, 50)
+            self.benchmark("reference_image_to_compressed_BGRA", reference_image_to_compressed_BGRA, img, 1)
@@ -0,0 +1,84 @@
+import threading
+import time
+import unittest
+
+from library.lcd.update_queue import UpdateQueue
+
+
+class TestUpdateQueue(unittest.TestCase):
+    def test_batch_contains_all_requests_in_order(self):
+        update_queue = UpdateQueue()
+        for i in range(5):
+            update_queue.put((print, [i]))
+
+        self.assertEqual(update_queue.get_batch(), [(print, [i]) for i in range(5)])
+        self.assertTrue(update_queue.empty())
+
+    def test_batch_is_empty_after_timeout(self):
+        update_queue = UpdateQueue()
+        self.assertEqual(update_queue.get_batch(timeout=0.01), [])
+        self.assertEqual(update_queue.stats.batches, 0)
+
+    def test_waiting_worker_is_woken_up(self):
+        update_queue = UpdateQueue()
+        batches = []
+        worker = threading.Thread(target=lambda: batches.append(update_queue.get_batch(timeout=5)))
+        worker.start()
+
+        time.sleep(0.05)
+        update_queue.put((print, ["hello"]))
+        worker.join()
+        self.assertEqual(batches, [[(print, ["hello"])]])
+
+    def test_stats(self):
+        update_queue = UpdateQueue()
+        update_queue.put((print, [1]))
+        update_queue.put((print, [2]))
+        time.sleep(0.02)
+        update_queue.get_batch()
+        update_queue.put((print, [3]))
+        update_queue.get()
+
+        stats = update_queue.stats
+        self.assertEqual(stats.requests, 3)
+        self.assertEqual(stats.batches, 1)
+        self.assertEqual(stats.max_depth, 2)
+        self.assertGreaterEqual(stats.max_wait, 0.02)
+        self.assertLess(stats.average_wait(), stats.max_wait)
+
+    def test_covered_region_update_is_superseded(self):
+        update_queue = UpdateQueue()
+        update_queue.put_region_update((print, [1]), (10, 10, 20, 20))
+        update_queue.put_region_update((print, [2]), (0, 0, 5, 5))
+        update_queue.put_region_update((print, [3]), (5, 5, 30, 30))
+
+        self.assertEqual(update_queue.get_batch(), [(None, None), (print, [2]), (print, [3])])
+        self.assertEqual(update_queue.stats.superseded, 1)
+
+    def test_superseded_region_update_is_replaced(self):
+        update_queue = UpdateQueue()
+        update_queue.put_region_update((print, [1]), (10, 10, 20, 20), (print, ["release 1"]))
+        update_queue.put_region_update((print, [2]), (10, 10, 20, 20), (print, ["release 2"]))
+        update_queue.put_region_update((print, [3]), (10, 10, 20, 20), (print, ["release 3"]))
+
+        # The replacement of a superseded update is not superseded again
+        self.assertEqual(update_queue.pending_regions(), [(10, 10, 20, 20)])
+        self.assertEqual(update_queue.get_batch(), [(print, ["release 1"]), (print, ["release 2"]), (print, [3])])
+        self.assertEqual(update_queue.stats.superseded, 2)
+
+    def test_partially_covered_region_update_is_kept(self):
+        update_queue = UpdateQueue()
+        update_queue.put_region_update((print, [1]), (10, 10, 20, 20))
+        update_queue.put_region_update((print, [2]), (10, 10, 20, 19))
+
+        self.assertEqual(update_queue.get_batch(), [(print, [1]), (print, [2])])
+        self.assertEqual(update_queue.pending_regions(), [])
+
+    def test_other_requests_are_barriers(self):
+        update_queue = UpdateQueue()
+        update_queue.put_region_update((print, [1]), (10, 10, 20, 20))
+        update_queue.put((print, ["command"]))
+        update_queue.put_region_update((print, [2]), (10, 10, 20, 20))
+
+        self.assertEqual(update_queue.pending_regions(), [(10, 10, 20, 20), (10, 10, 20, 20)])
+        self.assertEqual(len([f for f, _ in update_queue.get_batch() if f]), 3)
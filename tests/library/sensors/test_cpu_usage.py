@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from library.sensors.cpu_usage import CpuUsage
+
+
+class FakeCpu:
+    def __init__(self):
+        self.busy = 20.0
+        self.total = 100.0
+        self.now = 0.0
+        self.reads = 0
+
+    def run(self, duration: float, busy_ratio: float):
+        self.now += duration
+        self.busy += duration * busy_ratio
+        self.total += duration
+
+    def read_times(self):
+        self.reads += 1
+        return self.busy, self.total
+
+
+class TestCpuUsage(unittest.TestCase):
+    def setUp(self):
+        self.cpu = FakeCpu()
+        self.usage = CpuUsage(self.cpu.read_times, clock=lambda: self.cpu.now)
+
+    def test_first_sample_is_since_boot(self):
+        self.assertEqual(self.usage.percent(), 20.0)
+
+    def test_usage_since_previous_sample(self):
+        self.usage.percent()
+        self.cpu.run(1, 0.5)
+        self.assertEqual(self.usage.percent(), 50.0)
+        self.cpu.run(2, 0.25)
+        self.assertEqual(self.usage.percent(), 25.0)
+
+    def test_too_close_samples(self):
+        self.usage.percent()
+        self.cpu.run(1, 0.5)
+        self.usage.percent()
+        self.cpu.run(0.01, 1)
+        self.assertEqual(self.usage.percent(), 50.0)
+        self.assertEqual(self.cpu.reads, 2)
+
+    def test_counters_not_updated(self):
+        self.usage.percent()
+        self.cpu.now += 1
+        self.assertEqual(self.usage.percent(), 20.0)
+
+    def test_usage_of_each_core(self):
+        times = [(np.array([20, 50]), np.array([100, 100])), (np.array([70, 50]), np.array([200, 200]))]
+        clock = iter(range(10))
+        usage = CpuUsage(lambda: times.pop(0), clock=lambda: next(clock))
+        self.assertEqual(usage.percent().tolist(), [20.0, 50.0])
+        # Second core counters not updated, e.g. core is offline: its previous usage is kept
+        times[0] = (np.array([70, 50]), np.array([200, 100]))
+        self.assertEqual(usage.percent().tolist(), [50.0, 50.0])
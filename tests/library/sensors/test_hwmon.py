@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from library.sensors.hwmon import Fan, Hwmon, Temperature
+
+
+class FakeSysfs:
+    # hwmon directory tree with regular files instead of sysfs attributes
+    def __init__(self):
+        self.root = tempfile.mkdtemp()
+
+    def write(self, path: str, value):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Files are rewritten in place, like sysfs attributes that keep their inode
+        with open(path, "r+" if os.path.exists(path) else "w") as file:
+            file.truncate()
+            file.write(f"{value}\n")
+
+    def remove(self, path: str):
+        shutil.rmtree(os.path.join(self.root, path))
+
+    def cleanup(self):
+        shutil.rmtree(self.root)
+
+
+class TestHwmon(unittest.TestCase):
+    def setUp(self):
+        self.sysfs = FakeSysfs()
+        self.sysfs.write("hwmon0/name", "nct6798")
+        self.sysfs.write("hwmon0/fan1_input", 1200)
+        self.sysfs.write("hwmon0/fan1_label", "CPU FAN")
+        self.sysfs.write("hwmon0/fan2_input", 900)
+        self.sysfs.write("hwmon0/fan2_min", 300)
+        self.sysfs.write("hwmon0/fan2_max", 1800)
+        self.sysfs.write("hwmon1/name", "coretemp")
+        self.sysfs.write("hwmon1/temp1_input", 45000)
+        self.sysfs.write("hwmon1/temp1_label", "Package id 0")
+        self.sysfs.write("hwmon1/temp1_crit", 100000)
+        self.hwmon = Hwmon(self.sysfs.root)
+
+    def tearDown(self):
+        self.hwmon.scan()
+        for sensor in self.hwmon.fan_inputs + self.hwmon.temperature_inputs:
+            sensor.close()
+        self.sysfs.cleanup()
+
+    def test_fans(self):
+        self.assertEqual(self.hwmon.fans(), {"nct6798": [Fan("CPU FAN", 1200, 80), Fan("fan2", 900, 40)]})
+
+    def test_temperatures(self):
+        self.assertEqual(self.hwmon.temperatures(), {"coretemp": [Temperature("Package id 0", 45.0)]})
+
+    def test_only_inputs_are_read_again(self):
+        self.hwmon.fans()
+        self.sysfs.write("hwmon0/fan1_input", 600)
+        self.sysfs.write("hwmon0/fan1_label", "Other label")
+        self.sysfs.write("hwmon0/fan3_input", 1000)
+        self.assertEqual(self.hwmon.fans()["nct6798"][0], Fan("CPU FAN", 600, 40))
+        self.assertEqual(len(self.hwmon.fans()["nct6798"]), 2)
+
+    def test_periodic_rescan(self):
+        self.hwmon.rescan_interval = 0
+        self.hwmon.fans()
+        self.sysfs.write("hwmon2/name", "amdgpu")
+        self.sysfs.write("hwmon2/fan1_input", 2000)
+        self.assertEqual(self.hwmon.fans()["amdgpu"], [Fan("fan1", 2000, 90)])
+
+    def test_unreadable_sensor_triggers_rescan(self):
+        self.hwmon.fans()
+        # Reading a directory fails like reading the attribute of a removed device
+        sensor = self.hwmon.fan_inputs[0]
+        os.close(sensor.fd)
+        sensor.fd = os.open(self.sysfs.root, os.O_RDONLY)
+        self.sysfs.remove("hwmon0")
+        self.sysfs.write("hwmon3/name", "nct6798")
+        self.sysfs.write("hwmon3/fan1_input", 1000)
+
+        self.assertEqual(self.hwmon.fans(), {"nct6798": [Fan("fan2", 900, 40)]})
+        self.assertEqual(self.hwmon.fans(), {"nct6798": [Fan("fan1", 1000, 66)]})
+
+    def test_invalid_value_is_skipped(self):
+        self.sysfs.write("hwmon0/fan1_input", "")
+        self.assertEqual([fan.label for fan in self.hwmon.fans()["nct6798"]], ["fan2"])
+
+    def test_no_hwmon(self):
+        self.assertEqual(Hwmon(os.path.join(self.sysfs.root, "missing")).fans(), {})
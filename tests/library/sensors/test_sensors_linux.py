@@ -0,0 +1,118 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import library.sensors.sensors_linux as sensors_linux
+from library.sensors.sensors_linux import LinuxSystem, ProcFile
+
+LINUX_ROOT = os.path.join(os.path.dirname(__file__), "linux_root")
+
+
+class TestProcFile(unittest.TestCase):
+    def setUp(self):
+        self.file = ProcFile(os.path.join(LINUX_ROOT, "proc/net/dev"), size=16)
+
+    def tearDown(self):
+        os.close(self.file.fd)
+
+    def test_buffer_grows(self):
+        self.file.read()
+        self.assertEqual(self.file.length, os.path.getsize(os.path.join(LINUX_ROOT, "proc/net/dev")))
+
+    def test_values_of_a_line(self):
+        self.file.read()
+        self.assertEqual(self.file.values(b"eth0:", 9)[0::8], [200000, 100000])
+        with self.assertRaises(KeyError):
+            self.file.values(b"eth1:")
+
+
+class TestSensorsLinux(unittest.TestCase):
+    # Sensors read from a copy of the fixture root, that tests can modify
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        shutil.copytree(LINUX_ROOT, self.root, dirs_exist_ok=True)
+        self.system = sensors_linux.system
+        sensors_linux.system = LinuxSystem(self.root)
+
+    def tearDown(self):
+        for file in list(sensors_linux.system.files.values()) + (sensors_linux.system.cpufreq_files or []):
+            os.close(file.fd)
+        sensors_linux.system.hwmon.scan()
+        sensors_linux.system = self.system
+        shutil.rmtree(self.root)
+
+    def write(self, path: str, content: str):
+        # Files are rewritten in place, like procfs files that are kept open
+        with open(os.path.join(self.root, path), "r+") as file:
+            file.truncate()
+            file.write(content)
+
+    def test_cpu_percentage(self):
+        clock = iter(range(10))
+        sensors_linux.system.cpu_usage.clock = lambda: next(clock)
+        # Since boot for the first measure: 5668 busy / 9390 total
+        self.assertEqual(sensors_linux.Cpu.percentage(None), 60.4)
+        self.write("proc/stat", "cpu  4755 356 584 3749 23 23 0 0 0 0\n")
+        self.assertEqual(sensors_linux.Cpu.percentage(None), 50.0)
+
+    def test_cpu_frequency(self):
+        self.assertEqual(sensors_linux.Cpu.frequency(), 2000.0)
+
+    def test_cores_percentage(self):
+        clock = iter(range(10))
+        sensors_linux.system.cores_usage.clock = lambda: next(clock)
+        # Since boot for the first measure: 2833 busy / 4693 total, 2835 busy / 4697 total
+        self.assertEqual(sensors_linux.Cpu.cores_percentage().tolist(), [60.4, 60.4])
+        self.write("proc/stat", "cpu  4755 356 584 3749 23 23 0 0 0 0\n"
+                                "cpu0 2402 178 292 1849 11 11 0 0 0 0\n"
+                                "cpu1 2353 178 292 1900 12 12 0 0 0 0\n"
+                                "intr 114930548 113199788 3 0\n")
+        self.assertEqual(sensors_linux.Cpu.cores_percentage().tolist(), [100.0, 0.0])
+
+    def test_cores_frequency(self):
+        self.assertEqual(sensors_linux.Cpu.cores_frequency().tolist(), [1800.0, 2200.0])
+
+    def test_cpu_load(self):
+        self.assertEqual(sensors_linux.Cpu.load(), (0.52, 0.58, 0.59))
+
+    def test_cpu_temperature_and_fan(self):
+        self.assertEqual(sensors_linux.Cpu.temperature(), 52.0)
+        self.assertEqual(sensors_linux.Cpu.fan_percent(), 80)
+        self.assertEqual(sensors_linux.Cpu.fan_percent("nct6798/SYS FAN"), 50)
+
+    def test_memory(self):
+        self.assertEqual(sensors_linux.Memory.virtual_percent(), 25.0)
+        self.assertEqual(sensors_linux.Memory.virtual_used(), 2000000 * 1024)
+        self.assertEqual(sensors_linux.Memory.virtual_free(), 6000000 * 1024)
+        self.assertEqual(sensors_linux.Memory.swap_percent(), 25.0)
+
+    def test_disk(self):
+        stats = os.statvfs(self.root)
+        self.assertEqual(sensors_linux.Disk.disk_free(), stats.f_bavail * stats.f_frsize)
+        self.assertEqual(sensors_linux.Disk.disk_used(), (stats.f_blocks - stats.f_bfree) * stats.f_frsize)
+
+    def test_net(self):
+        clock = iter(range(0, 10, 2))
+        sensors_linux.system.clock = lambda: next(clock)
+        # Values are known from the second measure
+        self.assertEqual(sensors_linux.Net.stats("eth0", 2), (0, 0, 0, 0))
+        self.write("proc/net/dev", "  eth0:  300000 0 0 0 0 0 0 0   120000 0 0 0 0 0 0 0\n")
+        self.assertEqual(sensors_linux.Net.stats("eth0", 2), (10000, 120000, 50000, 300000))
+        self.assertEqual(sensors_linux.Net.stats("", 2), (0, 0, 0, 0))
+
+    def test_net_rate_of_stretched_refresh(self):
+        # Refresh interval is 2s, but the task has been stretched to 8s by adaptive intervals
+        clock = iter([0, 8])
+        sensors_linux.system.clock = lambda: next(clock)
+        sensors_linux.Net.stats("eth0", 2)
+        self.write("proc/net/dev", "  eth0:  300000 0 0 0 0 0 0 0   120000 0 0 0 0 0 0 0\n")
+        self.assertEqual(sensors_linux.Net.stats("eth0", 2), (2500, 120000, 12500, 300000))
+
+    def test_missing_files(self):
+        sensors_linux.system = LinuxSystem(os.path.join(self.root, "missing"))
+        self.assertTrue(math.isnan(sensors_linux.Cpu.percentage(None)))
+        self.assertTrue(math.isnan(sensors_linux.Memory.virtual_percent()))
+        self.assertEqual(sensors_linux.Memory.virtual_used(), -1)
+        self.assertEqual(sensors_linux.Cpu.cores_percentage().size, 0)
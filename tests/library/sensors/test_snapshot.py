@@ -0,0 +1,132 @@
+import os
+import platform
+import threading
+import timeit
+import unittest
+from unittest import mock
+
+import psutil
+
+import library.sensors.sensors_python as sensors_python
+from library.sensors import snapshot
+
+BENCHMARK = os.environ.get("BENCHMARK")
+
+
+class CountingQuery:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        if args == ("fail",):
+            raise OSError("query failed")
+        return self.calls
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.counter = CountingQuery()
+        self.query = snapshot.query(self.counter)
+
+    def test_outside_tick_queries_each_time(self):
+        self.assertEqual([self.query(), self.query()], [1, 2])
+
+    def test_tick_queries_once(self):
+        with snapshot.tick():
+            self.assertEqual([self.query(), self.query(), self.query("/")], [1, 1, 2])
+            self.assertEqual(self.query("/"), 2)
+        with snapshot.tick():
+            self.assertEqual(self.query(), 3)
+
+    def test_nested_ticks_share_snapshot(self):
+        with snapshot.tick():
+            self.query()
+            with snapshot.tick():
+                self.assertEqual(self.query(), 1)
+            self.assertEqual(self.query(), 1)
+        self.assertEqual(self.query(), 2)
+
+    def test_failed_query_is_not_kept(self):
+        with snapshot.tick():
+            for _ in range(2):
+                with self.assertRaises(OSError):
+                    self.query("fail")
+        self.assertEqual(self.counter.calls, 2)
+
+    def test_threads_have_their_own_snapshot(self):
+        results = []
+        with snapshot.tick():
+            self.query()
+            thread = threading.Thread(target=lambda: results.append(self.query()))
+            thread.start()
+            thread.join()
+        self.assertEqual(results, [2])
+
+
+def memory_tick():
+    # Memory values read by stats.Memory.stats() at each refresh
+    return (sensors_python.Memory.swap_percent(), sensors_python.Memory.virtual_percent(),
+            sensors_python.Memory.virtual_used(), sensors_python.Memory.virtual_free(),
+            sensors_python.Memory.virtual_free() + sensors_python.Memory.virtual_used())
+
+
+def disk_tick():
+    # Disk values read by stats.Disk.stats() at each refresh
+    return (sensors_python.Disk.disk_used(), sensors_python.Disk.disk_free(),
+            sensors_python.Disk.disk_usage_percent())
+
+
+class TestSensorsPython(unittest.TestCase):
+    def test_memory_is_queried_once_per_tick(self):
+        with mock.patch.object(psutil, "virtual_memory", wraps=psutil.virtual_memory) as virtual_memory:
+            with snapshot.tick():
+                used, free = sensors_python.Memory.virtual_used(), sensors_python.Memory.virtual_free()
+                total = sensors_python.Memory.virtual_free() + sensors_python.Memory.virtual_used()
+            self.assertEqual(virtual_memory.call_count, 1)
+            self.assertEqual(used + free, total)
+
+    def test_disk_is_queried_once_per_tick(self):
+        with mock.patch.object(psutil, "disk_usage", wraps=psutil.disk_usage) as disk_usage:
+            with snapshot.tick():
+                disk_tick()
+            self.assertEqual(disk_usage.call_count, 1)
+
+
+def read_syscalls() -> int:
+    with open("/proc/self/io") as file:
+        return int(next(line for line in file if line.startswith("syscr:")).split()[1])
+
+
+@unittest.skipUnless(BENCHMARK, "set BENCHMARK=1 to run benchmarks")
+@unittest.skipUnless(platform.system() == "Linux", "read syscalls are counted from /proc/self/io")
+class BenchmarkSnapshot(unittest.TestCase):
+    def benchmark(self, name, fn, number=1000):
+        # OS queries done through psutil, and read syscalls they cost (statvfs for disks is not a read)
+        queries = [mock.patch.object(psutil, query, wraps=getattr(psutil, query))
+                   for query in ("virtual_memory", "swap_memory", "disk_usage")]
+        mocks = [query.start() for query in queries]
+        try:
+            # Reading the syscalls counter also costs syscalls: this overhead is measured and removed
+            overhead = -(read_syscalls() - read_syscalls())
+            start = read_syscalls()
+            duration = timeit.timeit(fn, number=number) / number
+            syscalls = (read_syscalls() - start - overhead) / number
+        finally:
+            for query in queries:
+                query.stop()
+        calls = sum(query.call_count for query in mocks) / number
+        print(f"\n{name}: {calls:.0f} psutil queries/tick, {syscalls:.1f} read syscalls/tick, "
+              f"{duration * 1000000:.0f} us/tick")
+
+    def test_benchmark_sensors_python(self):
+        def in_tick(fn):
+            def run():
+                with snapshot.tick():
+                    fn()
+
+            return run
+
+        for name, fn in [("Memory", memory_tick), ("Disk", disk_tick)]:
+            self.benchmark(name + " without snapshot", fn)
+            self.benchmark(name + " with snapshot", in_tick(fn))
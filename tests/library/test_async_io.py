@@ -0,0 +1,51 @@
+import asyncio
+import struct
+import unittest
+
+from library.async_io import echo_request, get_json, icmp_checksum, is_echo_reply
+
+
+class TestPing(unittest.TestCase):
+    def test_checksum(self):
+        # Checksum of a packet including its checksum is 0
+        packet = echo_request(0x1234, 7, b"abc")
+        self.assertEqual(icmp_checksum(packet), 0)
+        self.assertEqual(packet[:2], b"\x08\x00")
+
+    def test_echo_reply(self):
+        reply = struct.pack("!BBHHH", 0, 0, 0, 0x4321, 7) + b"abc"
+        self.assertTrue(is_echo_reply(reply, 7))
+        self.assertFalse(is_echo_reply(reply, 8))
+        # Reply after an IP header of 20 bytes (macOS)
+        self.assertTrue(is_echo_reply(b"\x45" + bytes(19) + reply, 7))
+        self.assertFalse(is_echo_reply(echo_request(0x4321, 7, b"abc"), 7))
+
+
+class TestGetJson(unittest.TestCase):
+    def get_json(self, response: bytes):
+        requests = []
+
+        async def handle(reader, writer):
+            requests.append(await reader.readuntil(b"\r\n\r\n"))
+            writer.write(response)
+            await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            async with server:
+                port = server.sockets[0].getsockname()[1]
+                return await get_json(f"http://127.0.0.1:{port}/data/3.0?lat=1&lon=2")
+
+        result = asyncio.run(run())
+        return result, requests[0]
+
+    def test_response(self):
+        (status, data), request = self.get_json(b'HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n\r\n'
+                                                b'{"current": {"temp": 17.5}}')
+        self.assertEqual((status, data), (200, {"current": {"temp": 17.5}}))
+        self.assertTrue(request.startswith(b"GET /data/3.0?lat=1&lon=2 HTTP/1.0\r\n"))
+
+    def test_error_response(self):
+        (status, data), _ = self.get_json(b'HTTP/1.0 401 Unauthorized\r\n\r\n{"message": "Invalid API key"}')
+        self.assertEqual((status, data), (401, {"message": "Invalid API key"}))
@@ -0,0 +1,77 @@
+import threading
+import unittest
+
+from library.async_runtime import AsyncRuntime
+from library.lcd.update_queue import UpdateQueue
+
+
+class TestAsyncRuntime(unittest.TestCase):
+    def setUp(self):
+        self.runtime = AsyncRuntime(workers=2, stagger_window=0.01)
+
+    def tearDown(self):
+        self.runtime.stop()
+        self.runtime.wait()
+
+    def test_periodic_jobs(self):
+        done = threading.Event()
+        runs = []
+
+        def action():
+            runs.append(threading.current_thread().name)
+            if len(runs) == 3:
+                done.set()
+
+        job = self.runtime.add("job", 0.01, action)
+        self.runtime.start()
+        self.assertTrue(done.wait(5))
+        # Actions are run by the worker threads, not by the event loop
+        self.assertTrue(all(name.startswith("Blocking") for name in runs))
+        self.assertGreaterEqual(job.runs, 2)
+
+    def test_fetched_data_is_given_to_action(self):
+        received = []
+        done = threading.Event()
+
+        async def fetch():
+            return 42
+
+        self.runtime.add("fetch", 10, lambda data: (received.append(data), done.set()), fetch)
+        self.runtime.start()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(received, [42])
+
+    def test_queue_is_emptied_before_stopping(self):
+        update_queue = UpdateQueue()
+        sent = []
+        self.runtime.serve(update_queue)
+        self.runtime.start()
+        for i in range(5):
+            update_queue.put((sent.append, [i]))
+        self.runtime.stop()
+        self.runtime.wait()
+        self.assertEqual(sent, list(range(5)))
+        self.assertEqual(update_queue.unfinished_tasks, 0)
+        self.assertFalse(self.runtime.thread.is_alive())
+
+    def test_run_in_progress_is_sent_before_stopping(self):
+        update_queue = UpdateQueue()
+        sent = []
+        running = threading.Event()
+        stopped = threading.Event()
+
+        def action():
+            # Still running when the runtime is stopped: its request is queued once the writer has been asked to stop
+            running.set()
+            stopped.wait(5)
+            update_queue.put((sent.append, ["run"]))
+
+        self.runtime.serve(update_queue)
+        self.runtime.add("job", 10, action)
+        self.runtime.start()
+        self.assertTrue(running.wait(5))
+        self.runtime.stop()
+        stopped.set()
+        self.runtime.wait()
+        self.assertEqual(sent, ["run"])
+        self.assertEqual(update_queue.unfinished_tasks, 0)
@@ -0,0 +1,223 @@
+import math
+import os
+import struct
+import tempfile
+import unittest
+import weakref
+from unittest.mock import patch
+
+import numpy as np
+
+import library.history as history_module
+from library.history import FILE_EXTENSION, FILE_VERSION, DownsampledHistory, HistoryStore, RingBuffer, decimate
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_values_are_oldest_first(self):
+        buffer = RingBuffer(4)
+        self.assertTrue(np.isnan(buffer.values()).all())
+
+        for value in range(1, 7):
+            buffer.append(value)
+        self.assertEqual(buffer.values().tolist(), [3, 4, 5, 6])
+
+    def test_partial_history(self):
+        buffer = RingBuffer(4)
+        buffer.append(1)
+        buffer.append(2)
+        values = buffer.values().tolist()
+        self.assertTrue(math.isnan(values[0]) and math.isnan(values[1]))
+        self.assertEqual(values[2:], [1, 2])
+
+    def test_values_are_a_read_only_view(self):
+        buffer = RingBuffer(4)
+        values = buffer.values()
+        self.assertIs(values.base, buffer.data)
+        with self.assertRaises(ValueError):
+            values[0] = 1
+
+    def test_resize_keeps_recent_values(self):
+        buffer = RingBuffer(4)
+        for value in range(1, 5):
+            buffer.append(value)
+        self.assertEqual(buffer.resized(2).values().tolist(), [3, 4])
+        self.assertEqual(buffer.resized(5).values().tolist()[1:], [1, 2, 3, 4])
+
+
+class TestHistoryStore(unittest.TestCase):
+    def test_save(self):
+        history = HistoryStore()
+        for value in range(5):
+            history.save("cpu", value, 3)
+        history.save("gpu", 42, 3)
+        self.assertEqual(history.values("cpu").tolist(), [2, 3, 4])
+        self.assertEqual(history.values("gpu").tolist()[-1], 42)
+
+    def test_values_are_not_changed_by_next_saves(self):
+        history = HistoryStore()
+        for value in range(3):
+            history.save("cpu", value, 3)
+        values = history.values("cpu")
+        history.save("cpu", 3, 3)
+        self.assertEqual(values.tolist(), [0, 1, 2])
+
+    def test_history_size_change(self):
+        history = HistoryStore()
+        for value in range(5):
+            history.save("cpu", value, 3)
+        history.save("cpu", 5, 4)
+        self.assertEqual(history.values("cpu").tolist(), [2, 3, 4, 5])
+
+
+class TestDownsampledHistory(unittest.TestCase):
+    def test_buckets(self):
+        tier = DownsampledHistory(60, 10)
+        for now, value in [(0, 10), (30, 20), (60, 5), (90, 7), (120, 1)]:
+            tier.add(value, now)
+
+        min_values, max_values, mean_values = tier.values(3)
+        self.assertEqual(min_values.tolist(), [10, 5, 1])
+        self.assertEqual(max_values.tolist(), [20, 7, 1])
+        self.assertEqual(mean_values.tolist(), [15, 6, 1])
+
+    def test_missing_buckets_are_nan(self):
+        tier = DownsampledHistory(60, 10)
+        tier.add(10, 0)
+        tier.add(20, 180)
+
+        self.assertTrue(np.isnan(tier.values(3)[2][1]))
+        self.assertEqual(tier.values(4)[2][[0, 3]].tolist(), [10, 20])
+
+
+class TestDecimate(unittest.TestCase):
+    def test_few_values_are_kept(self):
+        values = np.arange(10.0)
+        self.assertIs(decimate(values, values, values, 10), values)
+
+    def test_min_max_of_groups(self):
+        min_values = np.arange(100.0)
+        max_values = min_values + 0.5
+        decimated = decimate(min_values, max_values, min_values, 10)
+        self.assertEqual(decimated.tolist(), [0, 19.5, 20, 39.5, 40, 59.5, 60, 79.5, 80, 99.5])
+
+
+class TestTimeWindow(unittest.TestCase):
+    def test_window_is_bounded_by_max_points(self):
+        history = HistoryStore()
+        for now in range(0, 2 * 3600, 5):
+            history.save("cpu", now % 100, 10, now=now)
+
+        # One value per minute over the last hour
+        self.assertEqual(history.window("cpu", 3600, 200).size, 60)
+        self.assertEqual(history.window("cpu", 3600, 20).size, 20)
+        # One value per 15 minutes over the last day, only the last 2 hours have values
+        values = history.window("cpu", 24 * 3600, 200)
+        self.assertEqual(values.size, 96)
+        self.assertEqual(np.count_nonzero(~np.isnan(values)), 8)
+
+    def test_short_window_uses_raw_values(self):
+        history = HistoryStore()
+        for now in range(0, 600, 2):
+            history.save("cpu", now, 100, now=now)
+
+        # 30 raw values over the last minute, instead of the 1-minute bucket being filled
+        self.assertEqual(history.window("cpu", 60, 200).tolist(), list(range(540, 600, 2)))
+        # Min and max of groups of raw values when there are too many of them
+        self.assertEqual(history.window("cpu", 60, 10).tolist(), [540, 550, 552, 562, 564, 574, 576, 586, 588, 598])
+        # History not full yet
+        history.save("gpu", 1, 100, now=0)
+        history.save("gpu", 2, 100, now=30)
+        self.assertEqual(history.window("gpu", 60, 200).tolist(), [1, 2])
+        # Raw values only cover 200s: 1-minute buckets are used
+        self.assertEqual(history.window("cpu", 300, 200).size, 5)
+
+
+class TestHistoryFiles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cpu" + FILE_EXTENSION)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_history_is_reloaded(self):
+        history = HistoryStore(self.directory.name)
+        for value in range(5):
+            history.save("cpu", value, 3, now=value * 60)
+        history.flush()
+
+        reloaded = HistoryStore(self.directory.name)
+        reloaded.save("cpu", 5, 3, now=5 * 60)
+        self.assertEqual(reloaded.values("cpu").tolist(), [3, 4, 5])
+        self.assertEqual(reloaded.window("cpu", 6 * 60, max_points=10).tolist(), [0, 1, 2, 3, 4, 5])
+
+    def test_stopped_time_is_nan(self):
+        history = HistoryStore(self.directory.name)
+        history.save("cpu", 1, 3, now=0)
+
+        reloaded = HistoryStore(self.directory.name)
+        reloaded.save("cpu", 2, 3, now=3 * 60)
+        values = reloaded.window("cpu", 4 * 60, max_points=10).tolist()
+        self.assertEqual(values[0], 1)
+        self.assertTrue(math.isnan(values[1]) and math.isnan(values[2]))
+        self.assertEqual(values[3], 2)
+
+    def test_history_size_change_keeps_values(self):
+        history = HistoryStore(self.directory.name)
+        for value in range(5):
+            history.save("cpu", value, 3, now=value * 60)
+        # Views on the previous file are still valid
+        previous = history.values("cpu")
+
+        reloaded = HistoryStore(self.directory.name)
+        reloaded.save("cpu", 5, 4, now=5 * 60)
+        self.assertEqual(reloaded.values("cpu").tolist(), [2, 3, 4, 5])
+        self.assertEqual(reloaded.window("cpu", 6 * 60, max_points=10).tolist(), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(previous.tolist(), [2, 3, 4])
+
+    def test_file_is_closed_before_resize(self):
+        history = HistoryStore(self.directory.name)
+        history.save("cpu", 1, 3)
+        mapped = weakref.ref(history.files["cpu"])
+        closed = []
+
+        def write_history_file(*args):
+            closed.append(mapped() is None)
+            write(*args)
+
+        write = history_module._write_history_file
+        with patch("library.history._write_history_file", write_history_file):
+            history.save("cpu", 2, 4)
+        self.assertEqual(closed, [True])
+        self.assertEqual(history.values("cpu").tolist()[-2:], [1, 2])
+
+    def test_failure_only_affects_its_metric(self):
+        # Another program has created a directory where the history file of the GPU should be
+        os.mkdir(os.path.join(self.directory.name, "gpu" + FILE_EXTENSION))
+        history = HistoryStore(self.directory.name)
+        history.save("gpu", 1, 3)
+        history.save("cpu", 2, 3)
+        self.assertEqual(list(history.files), ["cpu"])
+        self.assertEqual(history.values("gpu").tolist()[-1], 1)
+
+    def test_invalid_file_is_reset(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a history file")
+
+        history = HistoryStore(self.directory.name)
+        history.save("cpu", 1, 3)
+        self.assertEqual(history.values("cpu").tolist()[-1], 1)
+        self.assertTrue(np.isnan(history.values("cpu")[:-1]).all())
+
+    def test_other_version_is_reset(self):
+        history = HistoryStore(self.directory.name)
+        history.save("cpu", 1, 3)
+        history.flush()
+        with open(self.path, "r+b") as file:
+            file.seek(4)
+            file.write(struct.pack("<I", FILE_VERSION + 1))
+
+        reloaded = HistoryStore(self.directory.name)
+        reloaded.save("cpu", 2, 3)
+        self.assertEqual(reloaded.values("cpu").tolist()[-1], 2)
+        self.assertTrue(np.isnan(reloaded.values("cpu")[:-1]).all())
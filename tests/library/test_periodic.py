@@ -0,0 +1,123 @@
+import threading
+import unittest
+
+from library.periodic import PeriodicScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPeriodicScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = PeriodicScheduler(workers=2, clock=self.clock, stagger_window=1.0)
+        self.runs = []
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def recorder(self, changed):
+        # Action recording its runs, and telling if it has changed the display
+        def action():
+            self.runs.append(self.clock.now)
+            return next(changed)
+
+        return action
+
+    def add(self, name, interval, action=None):
+        return self.scheduler.add(name, interval, action or (lambda: self.runs.append((name, self.clock.now))))
+
+    def run_until(self, end, step=0.1):
+        # Call the scheduler like its thread would, waiting for each run to finish
+        while self.clock.now < end - 1e-9:
+            self.scheduler.run_pending()
+            self.scheduler.ready.join()
+            self.clock.now = round(self.clock.now + step, 6)
+
+    def test_first_runs_are_staggered(self):
+        jobs = [self.add("job%d" % i, 2) for i in range(5)]
+        phases = sorted(job.deadline - self.clock.now for job in jobs)
+        self.assertEqual(phases[0], 0)
+        self.assertTrue(all(phase < 1.0 for phase in phases))
+        self.assertTrue(all(b - a > 0.1 for a, b in zip(phases, phases[1:])))
+
+    def test_deadlines_do_not_drift(self):
+        # Each run takes 0.3s: deadlines stay on the 1s grid
+        def slow():
+            self.runs.append(self.clock.now)
+            self.clock.now += 0.3
+
+        self.add("slow", 1, slow)
+        self.run_until(105)
+        self.assertEqual([round(run - self.runs[0], 6) for run in self.runs], [0, 1, 2, 3, 4])
+
+    def test_missed_deadlines_are_skipped(self):
+        job = self.add("job", 1)
+        self.run_until(101)
+        # Computer sleeping for 10s: the task runs once, then on its usual grid
+        self.clock.now += 10
+        self.run_until(113)
+        self.assertEqual([now for _, now in self.runs], [100, 111, 112])
+        self.assertEqual(job.skipped, 10)
+
+    def test_overrun_skips_runs(self):
+        release = threading.Event()
+        job = self.add("blocked", 1, release.wait)
+        self.scheduler.run_pending()
+        self.clock.now += 1
+        self.scheduler.run_pending()
+        self.clock.now += 1
+        self.scheduler.run_pending()
+        release.set()
+        self.scheduler.ready.join()
+        self.assertEqual((job.runs, job.skipped), (1, 2))
+
+    def test_long_run_is_an_overrun(self):
+        def slow():
+            self.clock.now += 1.5
+
+        job = self.add("slow", 1, slow)
+        self.run_until(101)
+        self.assertEqual((job.runs, job.overruns), (1, 1))
+
+    def test_failed_run(self):
+        def fail():
+            raise ValueError()
+
+        job = self.add("fail", 1, fail)
+        self.run_until(102)
+        self.assertEqual((job.runs, job.running), (2, False))
+
+    def test_adaptive_interval_is_stretched(self):
+        # Display does not change: interval doubles up to 8s, on the 1s grid
+        job = self.scheduler.add("adaptive", 1, self.recorder(iter(lambda: False, None)), max_interval=8.5)
+        self.run_until(125)
+        self.assertEqual(self.runs, [100, 102, 106, 114, 122])
+        self.assertEqual(job.avoided, 1 + 3 + 7 + 7 + 7)
+
+    def test_adaptive_interval_back_to_base(self):
+        self.scheduler.add("adaptive", 1, self.recorder(iter([False, False, False, True, False, False])),
+                           max_interval=10)
+        self.run_until(118)
+        self.assertEqual(self.runs, [100, 102, 106, 114, 115, 117])
+
+    def test_fixed_interval_without_change(self):
+        job = self.scheduler.add("fixed", 1, self.recorder(iter(lambda: False, None)))
+        self.run_until(104)
+        self.assertEqual((len(self.runs), job.avoided), (4, 0))
+
+    def test_scheduler_thread(self):
+        scheduler = PeriodicScheduler(workers=2)
+        done = threading.Event()
+        scheduler.add("job", 0.01, done.set)
+        scheduler.start()
+        self.assertTrue(done.wait(5))
+        scheduler.stop()
+        for thread in [scheduler.thread] + scheduler.worker_threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())